@@ -1,8 +1,10 @@
 from openai import OpenAI
-from instructor import from_openai
 from pydantic import BaseModel, Field
 from typing import List
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
 
 class FinancialAnalysis(BaseModel):
     summary: str = Field(description="Resumo em 2-3 frases")
@@ -22,20 +24,25 @@ REGRAS:
 4. Seja preciso e conservador"""
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
+    @traced("agent.analysis")
     async def analyze(self, context: str, question: str) -> FinancialAnalysis:
-        analysis = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=FinancialAnalysis,
-            messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": f"Contexto:\n{context}\n\nPergunta:\n{question}"
-                }
-            ],
-            temperature=0.1
-        )
+        with LLM_INFLIGHT.track_inprogress(agent="analysis"):
+            analysis, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=FinancialAnalysis,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": f"Contexto:\n{context}\n\nPergunta:\n{question}"
+                    }
+                ],
+                temperature=0.1
+            )
+        record_usage("analysis", "gpt-4.1", completion.usage)
 
         return analysis
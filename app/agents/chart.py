@@ -1,8 +1,11 @@
 from openai import OpenAI
-from instructor import from_openai
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
+from app.services.query_analyzer import QueryAnalysis, get_query_analyzer
 
 
 class ChartData(BaseModel):
@@ -75,69 +78,51 @@ class ChartAgent:
     """Agente especializado em criar gráficos com dados dos portfolios"""
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
-    async def generate_chart(self, data_context: str, user_intent: str) -> ChartSpecification:
+    @traced("agent.chart")
+    async def generate_chart(
+        self,
+        data_context: str,
+        user_intent: str,
+        analysis: Optional[QueryAnalysis] = None
+    ) -> ChartSpecification:
         """
         Gera especificação de gráfico.
-        Usa dados fixos para garantir precisão.
+        Usa dados fixos para garantir precisão. Portfolio e série vêm da
+        QueryAnalysis do request (ou de uma análise local de user_intent).
         """
-        intent_lower = user_intent.lower()
-
-        # Detectar portfolio
-        is_p01 = any(x in intent_lower for x in ["01", "portfolio 1", "portfólio 1", "p01", "primeiro"])
-        is_p02 = any(x in intent_lower for x in ["02", "portfolio 2", "portfólio 2", "p02", "segundo"])
-
-        # Se não especificou, tentar detectar pelo contexto
-        if not is_p01 and not is_p02:
-            if "1" in user_intent and "2" not in user_intent:
-                is_p01 = True
-            elif "2" in user_intent and "1" not in user_intent:
-                is_p02 = True
-            else:
-                is_p01 = True  # Default P01
-
-        # Detectar tipo de gráfico
-        is_withdrawal = any(word in intent_lower for word in
-            ["retirada", "saque", "saída", "outflow", "withdrawal", "resgate"])
-
-        is_patrimonio = any(word in intent_lower for word in
-            ["patrimônio", "patrimonio", "evolução", "evolucao", "valor", "ativo",
-             "líquido", "liquido", "asset", "net asset", "wealth", "dinheiro",
-             "capital", "montante", "saldo", "total", "período", "periodo"])
-
-        is_retorno = any(word in intent_lower for word in
-            ["retorno", "return", "performance", "twr", "rendimento", "ganho", "perda anual"])
+        if analysis is None:
+            analysis = get_query_analyzer().analyze(user_intent)
 
-        is_performance_cumulativa = any(word in intent_lower for word in
-            ["cumulativ", "acumulad", "cumulative", "total performance"])
+        # Sem portfolio explícito (ou pedindo os dois): Portfolio 01
+        portfolio = analysis.portfolio or "01"
+        metric = analysis.chart_metric
 
         # =====================================================
         # PORTFOLIO 01
         # =====================================================
-        if is_p01 and not is_p02:
-            if is_withdrawal:
+        if portfolio == "01":
+            if metric == "withdrawals":
                 return self._create_p01_withdrawal_chart()
-            elif is_retorno and not is_performance_cumulativa:
+            elif metric == "returns":
                 return self._create_p01_retornos_chart()
-            elif is_patrimonio:
-                return self._create_p01_patrimonio_chart()
             else:
-                # Default: patrimônio
+                # Default: patrimônio (P01 não tem série cumulativa)
                 return self._create_p01_patrimonio_chart()
 
         # =====================================================
         # PORTFOLIO 02
         # =====================================================
-        if is_p02 and not is_p01:
-            if is_withdrawal:
+        if portfolio == "02":
+            if metric == "withdrawals":
                 return self._create_p02_withdrawal_chart()
-            elif is_performance_cumulativa:
+            elif metric == "cumulative":
                 return self._create_p02_performance_cumulativa_chart()
-            elif is_retorno:
+            elif metric == "returns":
                 return self._create_p02_retornos_chart()
-            elif is_patrimonio:
-                return self._create_p02_patrimonio_chart()
             else:
                 # Default: patrimônio
                 return self._create_p02_patrimonio_chart()
@@ -292,14 +277,16 @@ class ChartAgent:
 Crie gráficos com dados ANO A ANO, nunca agrupe períodos.
 Use valores absolutos (positivos) para gráficos."""
 
-        chart_spec = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=ChartSpecification,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Dados: {data_context}\n\nObjetivo: {user_intent}"}
-            ],
-            temperature=0.1
-        )
+        with LLM_INFLIGHT.track_inprogress(agent="chart"):
+            chart_spec, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=ChartSpecification,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Dados: {data_context}\n\nObjetivo: {user_intent}"}
+                ],
+                temperature=0.1
+            )
+        record_usage("chart", "gpt-4.1", completion.usage)
 
         return chart_spec
@@ -3,11 +3,13 @@ Agente de Contexto - Especializado em contextualização histórica.
 """
 from typing import Dict, List, Any, Optional
 from openai import OpenAI
-from instructor import from_openai
 from pydantic import BaseModel, Field
 
 from app.models.chunks import ChunkCategory
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
 
 
 class HistoricalEvent(BaseModel):
@@ -71,8 +73,11 @@ Responda em português, de forma didática e acessível.
 """
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
+    @traced("agent.context")
     async def get_context(
         self,
         query: str,
@@ -82,15 +87,17 @@ Responda em português, de forma didática e acessível.
 
         formatted_context = self._format_context(context)
 
-        response = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=HistoricalContext,
-            messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
-                {"role": "user", "content": query}
-            ],
-            temperature=0.3
-        )
+        with LLM_INFLIGHT.track_inprogress(agent="context"):
+            response, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=HistoricalContext,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0.3
+            )
+        record_usage("context", "gpt-4.1", completion.usage)
 
         return response
 
@@ -3,12 +3,14 @@ Agente Forense - Especializado em análise de má conduta e violações.
 """
 from typing import Dict, List, Any, Optional
 from openai import OpenAI
-from instructor import from_openai
 from pydantic import BaseModel, Field
 import os
 
 from app.models.chunks import ChunkCategory
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
 
 
 class ViolationAnalysis(BaseModel):
@@ -78,8 +80,11 @@ DOCUMENTOS DISPONÍVEIS:
 """
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
+    @traced("agent.forensic")
     async def analyze(
         self,
         query: str,
@@ -91,15 +96,17 @@ DOCUMENTOS DISPONÍVEIS:
         formatted_context = self._format_context(context)
 
         # Chamar LLM com structured output
-        response = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=ViolationAnalysis,
-            messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
-                {"role": "user", "content": query}
-            ],
-            temperature=0.1
-        )
+        with LLM_INFLIGHT.track_inprogress(agent="forensic"):
+            response, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=ViolationAnalysis,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0.1
+            )
+        record_usage("forensic", "gpt-4.1", completion.usage)
 
         return response
 
@@ -3,10 +3,13 @@ Orchestrator Agent - Roteamento inteligente de queries para agentes especializad
 Versão atualizada com suporte a agentes forenses.
 """
 from openai import OpenAI
-from typing import List
-from instructor import from_openai
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
+from app.services.query_analyzer import QueryAnalysis
 
 
 class AgentDecision(BaseModel):
@@ -115,19 +118,32 @@ IMPORTANTE:
 """
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
-    def decide_agents(self, user_query: str) -> AgentDecision:
-        """Decide quais agentes usar para uma query"""
-        decision = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=AgentDecision,
-            messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {"role": "user", "content": f"Pergunta do usuário: {user_query}"}
-            ],
-            temperature=0.1
-        )
+    @traced("agent.orchestrator")
+    def decide_agents(self, user_query: str, analysis: Optional[QueryAnalysis] = None) -> AgentDecision:
+        """
+        Decide quais agentes usar para uma query.
+        analysis (QueryAnalyzer) entra no prompt como dica de roteamento.
+        """
+        user_content = f"Pergunta do usuário: {user_query}"
+        hint = analysis.routing_hint() if analysis else ""
+        if hint:
+            user_content = f"{user_content}\n\n{hint}"
+
+        with LLM_INFLIGHT.track_inprogress(agent="orchestrator"):
+            decision, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=AgentDecision,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
+                ],
+                temperature=0.1
+            )
+        record_usage("orchestrator", "gpt-4.1", completion.usage)
 
         return decision
 
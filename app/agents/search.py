@@ -7,10 +7,12 @@ HIERARQUIA DE CONHECIMENTO:
 3. CONTEXT, CLIENT, UBS_OFFICIAL - Fontes terciárias (quando solicitado)
 """
 from typing import Dict, Optional, List
-import cohere
-from app.services.embedding_service import EmbeddingService
+from app.services.embedding_service import EmbeddingService, trim_results
+from app.services.chunk_metadata import SearchFilters
 from app.models.chunks import ChunkCategory
 from app.core.config import settings
+from app.core.telemetry import current_span, set_attributes, span, traced
+from app.core.metrics import LLM_INFLIGHT
 import os
 
 
@@ -29,7 +31,11 @@ class SearchAgent:
     def __init__(self, embedding_service: EmbeddingService):
         self.embedding_service = embedding_service
         cohere_key = os.getenv("COHERE_API_KEY")
-        self.cohere_client = cohere.Client(cohere_key) if cohere_key else None
+        self.cohere_client = None
+        if cohere_key:
+            import cohere  # só quando o rerank está configurado
+
+            self.cohere_client = cohere.Client(cohere_key)
 
     async def search(
         self,
@@ -45,12 +51,13 @@ class SearchAgent:
 
         if use_rerank and self.cohere_client and initial_results["documents"]:
             try:
-                reranked = self.cohere_client.rerank(
-                    model="rerank-multilingual-v2.0",
-                    query=query,
-                    documents=initial_results["documents"],
-                    top_n=n_results
-                )
+                with LLM_INFLIGHT.track_inprogress(agent="rerank"):
+                    reranked = self.cohere_client.rerank(
+                        model="rerank-multilingual-v2.0",
+                        query=query,
+                        documents=initial_results["documents"],
+                        top_n=n_results
+                    )
 
                 reranked_docs = []
                 reranked_metadata = []
@@ -114,10 +121,14 @@ class SearchAgent:
         n_primary: int = 8,
         n_secondary: int = 3,
         include_tertiary: bool = False,
-        use_rerank: bool = True
+        use_rerank: bool = True,
+        search_filters: Optional[SearchFilters] = None,
+        fallback_filters: Optional[SearchFilters] = None
     ) -> Dict[ChunkCategory, Dict]:
         """
-        Busca hierárquica com prioridade.
+        Busca hierárquica com prioridade (restrita a search_filters, se informado).
+        Se o recorte não deixar nenhum documento, repete a busca com
+        fallback_filters (por padrão, sem filtro).
 
         1. SEMPRE busca primeiro em COMPLETE_ANALYSIS (fonte principal)
         2. Complementa com FACTS e FORENSIC (dados específicos)
@@ -125,15 +136,49 @@ class SearchAgent:
 
         Esta é a busca RECOMENDADA para todas as queries.
         """
+        with span("search.hierarchical", search__tertiary=include_tertiary,
+                  search__rerank=bool(use_rerank and self.cohere_client)) as current:
+            results = self._search_hierarchical(
+                query, n_primary, n_secondary, include_tertiary, use_rerank, search_filters
+            )
+            found = any(r.get("documents") for r in results.values())
+            if not found and search_filters is not None and fallback_filters != search_filters:
+                print(f"⚠️ Nenhum documento com o recorte {search_filters}, repetindo a busca sem ele")
+                current.set_attribute("search.filter_fallback", True)
+                results = self._search_hierarchical(
+                    query, n_primary, n_secondary, include_tertiary, use_rerank, fallback_filters
+                )
+            current.set_attribute("search.documents", sum(len(r.get("documents", [])) for r in results.values()))
+        return results
+
+    def _search_hierarchical(
+        self,
+        query: str,
+        n_primary: int,
+        n_secondary: int,
+        include_tertiary: bool,
+        use_rerank: bool,
+        search_filters: Optional[SearchFilters]
+    ) -> Dict[ChunkCategory, Dict]:
         results = {}
+        rerank_factor = 2 if use_rerank else 1
 
-        # 1. FONTE PRINCIPAL - COMPLETE_ANALYSIS (prioridade máxima)
-        primary_results = self.embedding_service.search_collection(
-            category=self.PRIMARY_SOURCE,
-            query=query,
-            n_results=n_primary * 2 if use_rerank else n_primary
+        # Uma única busca (um embedding) para todas as fontes; as secundárias pedem
+        # o máximo possível e são cortadas depois de avaliar a fonte principal
+        n_by_category = {self.PRIMARY_SOURCE: n_primary * rerank_factor}
+        for category in self.SECONDARY_SOURCES:
+            n_by_category[category] = n_secondary * rerank_factor
+        if include_tertiary:
+            for category in self.TERTIARY_SOURCES:
+                n_by_category[category] = 2  # Poucos resultados de contexto adicional
+
+        raw_results = self.embedding_service.search_categories(
+            query, n_by_category, search_filters=search_filters
         )
 
+        # 1. FONTE PRINCIPAL - COMPLETE_ANALYSIS (prioridade máxima)
+        primary_results = raw_results[self.PRIMARY_SOURCE]
+
         if use_rerank and self.cohere_client and primary_results.get("documents"):
             primary_results = self._rerank_single(query, primary_results, n_primary)
 
@@ -147,11 +192,7 @@ class SearchAgent:
         adjusted_n = n_secondary if not primary_has_context else max(1, n_secondary // 2)
 
         for category in self.SECONDARY_SOURCES:
-            cat_results = self.embedding_service.search_collection(
-                category=category,
-                query=query,
-                n_results=adjusted_n * 2 if use_rerank else adjusted_n
-            )
+            cat_results = trim_results(raw_results[category], adjusted_n * rerank_factor)
 
             if use_rerank and self.cohere_client and cat_results.get("documents"):
                 cat_results = self._rerank_single(query, cat_results, adjusted_n)
@@ -161,15 +202,11 @@ class SearchAgent:
         # 3. FONTES TERCIÁRIAS (opcional)
         if include_tertiary:
             for category in self.TERTIARY_SOURCES:
-                cat_results = self.embedding_service.search_collection(
-                    category=category,
-                    query=query,
-                    n_results=2  # Poucos resultados de contexto adicional
-                )
-                results[category] = cat_results
+                results[category] = raw_results[category]
 
         return results
 
+    @traced("search.rerank")
     def _rerank_single(
         self,
         query: str,
@@ -179,28 +216,35 @@ class SearchAgent:
         """Aplica reranking a um único resultado"""
         docs = results.get("documents", [])
         metas = results.get("metadatas", [])
+        ids = results.get("ids", [])
 
         if not docs:
             return results
 
         try:
-            reranked = self.cohere_client.rerank(
-                model="rerank-multilingual-v2.0",
-                query=query,
-                documents=docs,
-                top_n=min(top_n, len(docs))
-            )
+            with LLM_INFLIGHT.track_inprogress(agent="rerank"):
+                reranked = self.cohere_client.rerank(
+                    model="rerank-multilingual-v2.0",
+                    query=query,
+                    documents=docs,
+                    top_n=min(top_n, len(docs))
+                )
+            set_attributes(current_span(), rerank__model="rerank-multilingual-v2.0", search__documents=len(docs))
 
             reranked_docs = []
             reranked_metas = []
+            reranked_ids = []
 
             for result in reranked.results:
                 idx = result.index
                 reranked_docs.append(docs[idx])
                 if idx < len(metas):
                     reranked_metas.append(metas[idx])
+                if idx < len(ids):
+                    reranked_ids.append(ids[idx])
 
             return {
+                "ids": reranked_ids,
                 "documents": reranked_docs,
                 "metadatas": reranked_metas,
                 "reranked": True
@@ -247,29 +291,35 @@ class SearchAgent:
         for category, cat_results in results.items():
             docs = cat_results.get("documents", [])
             metas = cat_results.get("metadatas", [])
+            ids = cat_results.get("ids", [])
 
             if not docs:
                 reranked_results[category] = cat_results
                 continue
 
             try:
-                reranked = self.cohere_client.rerank(
-                    model="rerank-multilingual-v2.0",
-                    query=query,
-                    documents=docs,
-                    top_n=min(top_n, len(docs))
-                )
+                with LLM_INFLIGHT.track_inprogress(agent="rerank"):
+                    reranked = self.cohere_client.rerank(
+                        model="rerank-multilingual-v2.0",
+                        query=query,
+                        documents=docs,
+                        top_n=min(top_n, len(docs))
+                    )
 
                 reranked_docs = []
                 reranked_metas = []
+                reranked_ids = []
 
                 for result in reranked.results:
                     idx = result.index
                     reranked_docs.append(docs[idx])
                     if idx < len(metas):
                         reranked_metas.append(metas[idx])
+                    if idx < len(ids):
+                        reranked_ids.append(ids[idx])
 
                 reranked_results[category] = {
+                    "ids": reranked_ids,
                     "documents": reranked_docs,
                     "metadatas": reranked_metas,
                     "reranked": True
@@ -3,11 +3,13 @@ Agente de Timeline - Especializado em criar cronologias de eventos.
 """
 from typing import Dict, List, Any, Optional
 from openai import OpenAI
-from instructor import from_openai
 from pydantic import BaseModel, Field
 
 from app.models.chunks import ChunkCategory
 from app.core.config import settings
+from app.core.telemetry import traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import record_usage
 
 
 class TimelineEvent(BaseModel):
@@ -76,8 +78,11 @@ Responda em português.
 """
 
     def __init__(self):
+        from instructor import from_openai
+
         self.client = from_openai(OpenAI(api_key=settings.OPENAI_API_KEY))
 
+    @traced("agent.timeline")
     async def create_timeline(
         self,
         query: str,
@@ -87,15 +92,17 @@ Responda em português.
 
         formatted_context = self._format_context(context)
 
-        response = self.client.chat.completions.create(
-            model="gpt-4.1",
-            response_model=Timeline,
-            messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
-                {"role": "user", "content": query}
-            ],
-            temperature=0.2
-        )
+        with LLM_INFLIGHT.track_inprogress(agent="timeline"):
+            response, completion = self.client.chat.completions.create_with_completion(
+                model="gpt-4.1",
+                response_model=Timeline,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT.format(context=formatted_context)},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0.2
+            )
+        record_usage("timeline", "gpt-4.1", completion.usage)
 
         return response
 
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from app.schemas.chat import ChatRequest, ChatResponse, ConversationResponse, ConversationWithMessages
-from app.services.embedding_service import EmbeddingService
 from app.services.multi_agent_service import MultiAgentChatService
-from app.core.dependencies import get_current_active_user
+from app.services.service_container import ServiceContainer
+from app.services.chunk_metadata import SearchFilters
+from app.services.usage_store import check_budget, persist_usage, usage_report, user_budget_exceeded
+from app.core.config import settings
+from app.core.dependencies import get_current_active_user, get_current_dev_user, get_chat_service, get_services
+from app.core.metrics import LLM_INFLIGHT, SSE_CONNECTIONS, stage_summary
+from app.core.profiling import profile_path, start_profiler
+from app.core.telemetry import span
 from app.models import User, Conversation, Message, get_db
 from sqlalchemy.sql import func
 from sse_starlette.sse import EventSourceResponse
@@ -17,89 +24,103 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Singleton
-embedding_service = None
-chat_service = None
+BUDGET_EXCEEDED_DETAIL = "Orçamento diário de uso excedido"
 
-def get_services():
-    global embedding_service, chat_service
-    if chat_service is None:
-        embedding_service = EmbeddingService()
-        chat_service = MultiAgentChatService(embedding_service)
-    return chat_service
+# Span (etapa) de cada agente; os demais usam "agent.<nome>"
+AGENT_STAGES = {"search": "search.hierarchical"}
+
+
+def _budget_blocked(db: Session, user: User) -> bool:
+    return settings.USAGE_ENFORCE_BUDGET and user_budget_exceeded(db, user.id)
+
+
+def _wants_profile(profile: bool, x_profile: Optional[str], user: User) -> bool:
+    """?profile=true ou X-Profile: 1; só usuários dev (403 para os demais)"""
+    requested = profile or (x_profile is not None and x_profile.strip().lower() not in ("", "0", "false", "no"))
+    if not requested:
+        return False
+    get_current_dev_user(user)
+    return settings.PROFILING_ENABLED
 
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
     conversation_id: Optional[int] = None,
+    profile: bool = False,
+    x_profile: Optional[str] = Header(default=None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    service: MultiAgentChatService = Depends(get_chat_service)
 ):
     """Endpoint com multi-agente (requer autenticacao)"""
+    if _budget_blocked(db, current_user):
+        raise HTTPException(status_code=429, detail=BUDGET_EXCEEDED_DETAIL)
+
+    profiler = start_profiler("chat") if _wants_profile(profile, x_profile, current_user) else None
     try:
         # Criar ou buscar conversa
-        if conversation_id:
-            conversation = db.query(Conversation).filter(
-                Conversation.id == conversation_id,
-                Conversation.user_id == current_user.id
-            ).first()
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversa não encontrada")
-        else:
-            # Nova conversa - usar primeira mensagem como título
-            conversation = Conversation(
-                user_id=current_user.id,
-                title=request.message[:50]
-            )
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-
-        # Salvar mensagem do usuário
-        user_message = Message(
-            conversation_id=conversation.id,
-            role="user",
-            content=request.message
-        )
-        db.add(user_message)
-        db.flush()
-
-        # Processar query
-        service = get_services()
+        with span("chat.load_conversation", chat__new_conversation=conversation_id is None):
+            if conversation_id:
+                conversation = db.query(Conversation).filter(
+                    Conversation.id == conversation_id,
+                    Conversation.user_id == current_user.id
+                ).first()
+                if not conversation:
+                    raise HTTPException(status_code=404, detail="Conversa não encontrada")
+            else:
+                # Nova conversa - usar primeira mensagem como título
+                conversation = Conversation(
+                    user_id=current_user.id,
+                    title=request.message[:50]
+                )
+                db.add(conversation)
+                db.commit()
+                db.refresh(conversation)
 
-        # Adicionar date_range à query se fornecido
-        query = request.message
-        if request.date_range:
-            date_context = f"\n[CONTEXTO: Análise limitada ao período de {request.date_range.start_year} a {request.date_range.end_year}]"
-            query = query + date_context
+            # Salvar mensagem do usuário
+            user_message = Message(
+                conversation_id=conversation.id,
+                role="user",
+                content=request.message
+            )
+            db.add(user_message)
+            db.flush()
 
+        # Processar query (date_range/portfolio viram filtros de metadata na busca)
         result = await service.process_query(
-            query=query,
-            conversation_history=[msg.model_dump() for msg in request.conversation_history]
+            query=request.message,
+            conversation_history=[msg.model_dump() for msg in request.conversation_history],
+            search_filters=SearchFilters.from_date_range(request.date_range, request.portfolio)
         )
 
         # Salvar resposta do assistente
-        assistant_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=result["response"],
-            tokens_used=result.get("tokens_used", 0),
-            sources=result.get("sources", []),
-            chart_data=result.get("chart"),
-            agents_used=result.get("agents_used", [])
-        )
-        db.add(assistant_message)
+        with span("chat.persist", chat__conversation_id=conversation.id):
+            assistant_message = Message(
+                conversation_id=conversation.id,
+                role="assistant",
+                content=result["response"],
+                tokens_used=result.get("tokens_used", 0),
+                sources=result.get("sources", []),
+                chart_data=result.get("chart"),
+                agents_used=result.get("agents_used", [])
+            )
+            db.add(assistant_message)
+            db.flush()
+            persist_usage(db, result.get("usage"), current_user.id, conversation.id, assistant_message.id)
 
-        # Atualizar contadores
-        conversation.message_count += 2
-        conversation.tokens_used += result.get("tokens_used", 0)
-        conversation.updated_at = func.now()
+            # Atualizar contadores
+            conversation.message_count += 2
+            conversation.tokens_used += result.get("tokens_used", 0)
+            conversation.updated_at = func.now()
 
-        db.commit()
+            db.commit()
+        check_budget(db, current_user.id)
 
         # Adicionar conversation_id na resposta
         response_data = ChatResponse(**result)
         response_data.conversation_id = conversation.id
+        if profiler is not None:
+            response_data.profile = profiler.stop(conversation_id=conversation.id)
 
         return response_data
 
@@ -111,19 +132,33 @@ async def chat(
         logger.error(f"Error in chat endpoint: {e}")
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 @router.post("/stream")
 async def chat_stream(
     request: ChatRequest,
     conversation_id: Optional[int] = None,
+    profile: bool = False,
+    x_profile: Optional[str] = Header(default=None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    service: MultiAgentChatService = Depends(get_chat_service)
 ):
     """Endpoint SSE que mostra o 'pensamento' da IA em tempo real"""
+    profiling = _wants_profile(profile, x_profile, current_user)
 
     async def event_generator():
+        SSE_CONNECTIONS.inc()
+        # Iniciado dentro do gerador: é a task do stream que executa o pipeline
+        profiler = start_profiler("chat_stream") if profiling else None
         try:
+            if _budget_blocked(db, current_user):
+                yield {"event": "error", "data": json.dumps({"error": BUDGET_EXCEEDED_DETAIL})}
+                return
+
             # Criar ou buscar conversa
             if conversation_id:
                 conversation = db.query(Conversation).filter(
@@ -151,19 +186,15 @@ async def chat_stream(
             db.add(user_message)
             db.flush()
 
-            service = get_services()
-
-            # Preparar query
-            query = request.message
-            if request.date_range:
-                date_context = f"\n[CONTEXTO: Análise limitada ao período de {request.date_range.start_year} a {request.date_range.end_year}]"
-                query = query + date_context
+            # Recorte do request (período/portfolio) vira filtro de metadata
+            search_filters = SearchFilters.from_date_range(request.date_range, request.portfolio)
 
             # Processar com streaming de eventos
             result = None
             async for event in service.process_query_streaming(
-                query=query,
-                conversation_history=[msg.model_dump() for msg in request.conversation_history]
+                query=request.message,
+                conversation_history=[msg.model_dump() for msg in request.conversation_history],
+                search_filters=search_filters
             ):
                 sse_event = {"event": event["type"], "data": json.dumps(event["data"])}
                 logger.info(f"[SSE] Sending: {sse_event}")
@@ -175,52 +206,105 @@ async def chat_stream(
 
             # Salvar resposta se tivermos resultado
             if result:
-                assistant_message = Message(
-                    conversation_id=conversation.id,
-                    role="assistant",
-                    content=result.get("response", ""),
-                    tokens_used=result.get("tokens_used", 0),
-                    sources=result.get("sources", []),
-                    chart_data=result.get("chart"),
-                    agents_used=result.get("agents_used", [])
-                )
-                db.add(assistant_message)
-
-                conversation.message_count += 2
-                conversation.tokens_used += result.get("tokens_used", 0)
-                conversation.updated_at = func.now()
-
-                db.commit()
+                with span("chat.persist", chat__conversation_id=conversation.id):
+                    assistant_message = Message(
+                        conversation_id=conversation.id,
+                        role="assistant",
+                        content=result.get("response", ""),
+                        tokens_used=result.get("tokens_used", 0),
+                        sources=result.get("sources", []),
+                        chart_data=result.get("chart"),
+                        agents_used=result.get("agents_used", [])
+                    )
+                    db.add(assistant_message)
+                    db.flush()
+                    persist_usage(db, result.get("usage"), current_user.id, conversation.id, assistant_message.id)
+
+                    conversation.message_count += 2
+                    conversation.tokens_used += result.get("tokens_used", 0)
+                    conversation.updated_at = func.now()
+
+                    db.commit()
+                check_budget(db, current_user.id)
 
                 # Enviar ID da conversa
                 yield {"event": "conversation", "data": json.dumps({"id": conversation.id})}
 
+            if profiler is not None:
+                report = profiler.stop(conversation_id=conversation.id)
+                yield {"event": "profile", "data": json.dumps(report, default=str)}
+
         except Exception as e:
             db.rollback()
             logger.error(f"Error in stream: {e}")
             yield {"event": "error", "data": json.dumps({"error": str(e)})}
+        finally:
+            SSE_CONNECTIONS.dec()
+            if profiler is not None:
+                profiler.stop()
 
     return EventSourceResponse(event_generator())
 
 
+@router.get("/admin/usage")
+async def usage_admin(
+    days: int = 7,
+    current_user: User = Depends(get_current_dev_user),
+    db: Session = Depends(get_db)
+):
+    """Tokens e custo por dia, usuário e agente; custo por resposta com a latência (apenas dev)"""
+    if days < 1 or days > 90:
+        raise HTTPException(status_code=400, detail="days deve estar entre 1 e 90")
+    return usage_report(db, days=days)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "json",
+    current_user: User = Depends(get_current_dev_user)
+):
+    """Profile gravado: relatório (json) ou stacks para flame graph (collapsed)"""
+    suffixes = {"json": ".json", "collapsed": ".collapsed"}
+    if format not in suffixes:
+        raise HTTPException(status_code=400, detail="format deve ser json ou collapsed")
+    path = profile_path(profile_id, suffixes[format])
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile não encontrado")
+    media_type = "application/json" if format == "json" else "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
 @router.get("/agents/status")
-async def agents_status():
-    """Status dos agentes"""
+async def agents_status(service: MultiAgentChatService = Depends(get_chat_service)):
+    """Agentes registrados no serviço, com chamadas, latência média e chamadas em andamento"""
+    stages = stage_summary()
+    inflight = {dict(key).get("agent"): value for key, value in LLM_INFLIGHT.values().items()}
+    agents = []
+    for name in service.agents:
+        stage = stages.get(AGENT_STAGES.get(name, f"agent.{name}"), {})
+        agents.append({
+            "name": name,
+            "calls": stage.get("count", 0),
+            "avg_latency_ms": stage.get("avg_ms"),
+            "inflight_llm_calls": int(inflight.get(name, 0)),
+        })
     return {
-        "agents": ["orchestrator", "search", "analysis", "chart", "calculation"],
+        "agents": agents,
         "status": "operational"
     }
 
 @router.get("/status")
-async def chat_status():
+async def chat_status(services: ServiceContainer = Depends(get_services)):
     """Status do servico de chat"""
     try:
-        service = get_services()
-        count = embedding_service.get_collection_count() if embedding_service else 0
+        count = services.embedding_service.get_collection_count()
         return {
             "status": "operational",
             "documents_indexed": count,
-            "multi_agent": True
+            "multi_agent": True,
+            "sse_connections": int(sum(SSE_CONNECTIONS.values().values())),
+            "llm_inflight_calls": int(sum(LLM_INFLIGHT.values().values()))
         }
     except Exception as e:
         return {
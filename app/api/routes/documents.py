@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.models import get_db, User, Document
 from app.schemas.document import DocumentResponse, DocumentStats
-from app.core.dependencies import get_current_active_user, get_current_dev_user
+from app.core.dependencies import get_current_active_user, get_current_dev_user, get_embedding_service
+from app.core.metrics import record_cache
 from app.services.embedding_service import EmbeddingService
+from app.models.chunks import ChunkCategory
 import logging
 import subprocess
 import sys
 import os
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import quote
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -77,11 +81,11 @@ def get_document(
 
 @router.get("/admin/embeddings/status")
 def get_embeddings_status(
-    current_user: User = Depends(get_current_dev_user)
+    current_user: User = Depends(get_current_dev_user),
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
 ) -> Dict:
     """Retorna o status de todas as collections de embeddings"""
     try:
-        embedding_service = EmbeddingService()
         stats = embedding_service.get_all_collection_stats()
 
         return {
@@ -124,6 +128,31 @@ def run_ingest_script(script_name: str):
         return {"success": False, "error": str(e)}
 
 
+@router.get("/admin/embeddings/versions")
+def get_embeddings_versions(
+    current_user: User = Depends(get_current_dev_user),
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+) -> Dict:
+    """Versão ativa e anterior (rollback) de cada collection"""
+    return {"collections": embedding_service.get_collection_versions()}
+
+
+@router.post("/admin/embeddings/rollback/{category}")
+def rollback_embeddings(
+    category: ChunkCategory,
+    current_user: User = Depends(get_current_dev_user),
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+) -> Dict:
+    """Volta a collection para a versão anterior (troca de alias, sem re-indexar)"""
+    try:
+        entry = embedding_service.rollback_collection(category)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    logger.info(f"Rollback de {category.value} para {entry['active']} por {current_user.email}")
+    return {"status": "ok", "category": category.value, **entry}
+
+
 @router.post("/admin/embeddings/reindex")
 async def reindex_embeddings(
     background_tasks: BackgroundTasks,
@@ -131,7 +160,9 @@ async def reindex_embeddings(
 ) -> Dict:
     """
     Re-indexa todos os documentos no ChromaDB.
-    Executa os scripts de ingestão em background.
+    Executa os scripts de ingestão em background. Cada script constrói novas
+    versões das collections e só troca o alias depois de validá-las, então as
+    queries continuam na versão ativa durante todo o processo.
 
     ATENÇÃO: Este processo pode demorar vários minutos e consumir créditos da OpenAI.
     """
@@ -458,45 +489,170 @@ def get_portfolio_images_stats(
     )
 
 
+# Paginas escaneadas nunca mudam depois de publicadas: cache longo + revalidacao por ETag
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# URLs pre-assinadas expiram em 3600s; o redirect nao pode viver mais que isso
+REDIRECT_CACHE_CONTROL = "private, max-age=3000"
+
+
+def _build_cache_headers(metadata: Dict, cache_control: str) -> Dict[str, str]:
+    """Monta headers de cache (ETag, Last-Modified, Cache-Control)"""
+    headers = {"Cache-Control": cache_control}
+    if metadata.get("etag"):
+        headers["ETag"] = metadata["etag"]
+    if metadata.get("last_modified"):
+        # usegmt exige datetime.timezone.utc (o boto3 devolve tzutc do dateutil)
+        headers["Last-Modified"] = format_datetime(metadata["last_modified"].astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def _is_not_modified(request: Request, metadata: Dict) -> bool:
+    """Avalia If-None-Match / If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    etag = metadata.get("etag")
+
+    if if_none_match:
+        # If-None-Match tem precedencia sobre If-Modified-Since
+        if not etag:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = metadata.get("last_modified")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # "-0000" (e datas sem zona) viram datetime naive: tratar como UTC
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+# Imagens servidas pela API (extensao -> media type)
+IMAGE_MEDIA_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+}
+
+
+class RangeNotSatisfiable(Exception):
+    """Range fora do tamanho do arquivo (416)"""
+
+
+def _parse_range(request: Request, metadata: Dict) -> Optional[Tuple[int, int]]:
+    """
+    (inicio, fim inclusivo) de um header Range de intervalo unico, ou None para
+    responder o arquivo inteiro (sem Range, If-Range desatualizado, multiplos
+    intervalos ou header invalido). Levanta RangeNotSatisfiable se o intervalo
+    comeca depois do fim do arquivo.
+    """
+    header = request.headers.get("range")
+    size = metadata.get("size")
+    if not header or size is None:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != metadata.get("etag"):
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # "bytes=-500": os ultimos 500 bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, end
+
+
+def _content_disposition(filename: str) -> str:
+    # Mesmo formato do FileResponse (filename* para nomes nao-ASCII)
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 @router.get("/images/file/{image_path:path}")
-def get_portfolio_image(image_path: str):
+async def get_portfolio_image(image_path: str, request: Request):
     """
     Retorna o arquivo de imagem.
     Suporta tanto storage local quanto S3/R2.
+
+    - ETag = o que o S3/R2 reporta (MD5, ou MD5 das partes no multipart);
+      o backend local calcula do mesmo jeito, entao o valor e o mesmo nos dois
+    - If-None-Match / If-Modified-Since retornam 304 sem corpo
+    - Range (um intervalo): 206 com o trecho pedido; atras do redirect, o proprio R2
+    - O corpo vem em blocos do iter_file do backend (nunca o arquivo inteiro em
+      memoria); S3/R2 so passa pela API se a URL pre-assinada nao puder ser gerada
+    - Todo I/O passa pelo backend async, sem bloquear o event loop
     """
     from urllib.parse import unquote
-    from fastapi.responses import RedirectResponse, Response
+    from fastapi.responses import RedirectResponse, Response, StreamingResponse
 
     image_path = unquote(image_path)
+    storage = storage_service.async_backend
 
-    # Verificar se arquivo existe
-    if not storage_service.file_exists(image_path):
+    # Metadados (um unico HEAD no S3) - tambem serve como verificacao de existencia
+    metadata = await storage.get_file_metadata(image_path)
+    if not metadata:
         raise HTTPException(status_code=404, detail="Imagem nao encontrada")
 
-    # Se for S3, redirecionar para URL pre-assinada
-    if not storage_service.is_local():
-        presigned_url = storage_service.get_file_url(image_path)
-        if presigned_url:
-            return RedirectResponse(url=presigned_url)
-        raise HTTPException(status_code=500, detail="Erro ao gerar URL da imagem")
-
-    # Se for local, servir o arquivo diretamente
-    local_path = storage_service.get_local_path(image_path)
-    if not local_path:
-        raise HTTPException(status_code=404, detail="Imagem nao encontrada")
-
-    # Determinar media type baseado na extensao
-    suffix = local_path.suffix.lower()
-    media_types = {
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.gif': 'image/gif',
-    }
-    media_type = media_types.get(suffix, 'image/jpeg')
-
-    return FileResponse(
-        path=str(local_path),
-        media_type=media_type,
-        filename=local_path.name
+    # Revalidacao do navegador (304) conta como hit do cache HTTP
+    not_modified = _is_not_modified(request, metadata)
+    record_cache("image_http", not_modified)
+
+    # Backend com disco local serve o arquivo; os demais (S3/R2) redirecionam
+    local_path = await storage.get_file_path(image_path)
+    redirect_url = None if local_path else await storage.get_file_url(image_path)
+    headers = _build_cache_headers(metadata, REDIRECT_CACHE_CONTROL if redirect_url else IMAGE_CACHE_CONTROL)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    if redirect_url:
+        return RedirectResponse(url=redirect_url, headers=headers)
+
+    size = metadata["size"]
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = _content_disposition(Path(image_path).name)
+    try:
+        byte_range = _parse_range(request, metadata)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size - 1)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        storage.iter_file(image_path, start, end if byte_range else None),
+        status_code=status_code,
+        media_type=IMAGE_MEDIA_TYPES.get(Path(image_path).suffix.lower(), 'image/jpeg'),
+        headers=headers
     )
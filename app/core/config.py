@@ -22,6 +22,20 @@ class Settings(BaseSettings):
     
     # Vector Database - Em produção, usar volume persistente (ex: /data/embeddings)
     CHROMA_PERSIST_DIRECTORY: str = Field(default="./data/embeddings")
+
+    # Backend do Chroma: "embedded" (PersistentClient no diretório acima) ou
+    # "http" (servidor `chroma run` compartilhado por várias réplicas da API;
+    # o diretório acima guarda só os caches locais: BM25, layout mmap)
+    CHROMA_MODE: str = "embedded"
+    CHROMA_HOST: str = "localhost"
+    CHROMA_PORT: int = 8000
+    CHROMA_SSL: bool = False
+    CHROMA_AUTH_TOKEN: str = ""
+    CHROMA_POOL_SIZE: int = 40  # conexões mantidas (threadpool do anyio: 40 threads)
+    CHROMA_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    CHROMA_TIMEOUT_SECONDS: float = 30.0  # leitura (get() de uma collection inteira pode demorar)
+    CHROMA_MAX_RETRIES: int = 3
+    CHROMA_RETRY_BACKOFF_SECONDS: float = 0.5
     
     # JWT Settings - MUST come from environment!
     SECRET_KEY: str = Field(default="")
@@ -41,10 +55,63 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY_ID: str = ""
     S3_SECRET_ACCESS_KEY: str = ""
     S3_REGION: str = "auto"  # For R2 use "auto"
+    S3_MAX_POOL_CONNECTIONS: int = 32  # Pool compartilhado entre chamadas sync e async
+
+    # Threads dedicadas a I/O de storage local nos endpoints async
+    STORAGE_IO_CONCURRENCY: int = 32
 
     # Local images path (for development)
     LOCAL_IMAGES_PATH: str = ""
 
+    # Dimensão dos embeddings (text-embedding-3-small: 1536; 0 = padrão do modelo).
+    # Mudar exige re-ingestão - a query precisa ter a mesma dimensão das collections
+    EMBEDDING_DIMENSIONS: int = 0
+
+    # Índice vetorial exato em memória (NumPy) no lugar das queries HNSW do Chroma
+    LOCAL_VECTOR_INDEX: bool = False
+    LOCAL_VECTOR_INDEX_DTYPE: str = "float32"  # "float32", "float16" ou "int8"
+    LOCAL_VECTOR_INDEX_DTYPE_OVERRIDES: str = ""  # por collection, ex.: "portfolio_facts=int8,ubs_official_docs=float16"
+    LOCAL_VECTOR_INDEX_REFRESH_SECONDS: float = 30.0  # intervalo para checar se as collections mudaram
+
+    # Layout memory-mapped do índice vetorial (gerado na ingestão). Com vários
+    # workers do uvicorn, todos mapeiam os mesmos arquivos somente leitura e
+    # dividem o page cache. Ativa o índice local. Vazio = <CHROMA_PERSIST_DIRECTORY>/mmap_index
+    MMAP_INDEX: bool = False
+    MMAP_INDEX_DIRECTORY: str = ""
+
+    # Busca híbrida: BM25 (índice lexical ao lado do Chroma) + vetorial, combinados por RRF
+    HYBRID_SEARCH: bool = False
+
+    # Artefato pré-construído do índice (scripts/index_artifact.py export).
+    # Se definido, é importado no startup (uma vez por sha256), sem chamadas de embedding
+    INDEX_ARTIFACT_PATH: str = ""
+
+    # Tracing OpenTelemetry por etapa do pipeline: "none", "console" ou "otlp"
+    TELEMETRY_EXPORTER: str = "none"
+    TELEMETRY_OTLP_ENDPOINT: str = ""  # ex.: http://localhost:4317 (vazio = OTEL_EXPORTER_OTLP_ENDPOINT)
+    TELEMETRY_SERVICE_NAME: str = "ubs-portfolio-api"
+
+    # GET /metrics (formato Prometheus) com contadores em processo; desligado por padrão.
+    # Com METRICS_TOKEN definido, o scraper precisa mandar "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str = ""
+
+    # Profiler por request (?profile=true ou X-Profile: 1, apenas usuários dev)
+    PROFILING_ENABLED: bool = True
+    PROFILING_DIRECTORY: str = "./data/profiles"
+    PROFILING_INTERVAL_MS: float = 5.0
+
+    # Contabilidade de tokens/custo (preços em USD por 1M tokens)
+    USAGE_PRICING_OVERRIDES: str = ""  # ex.: "gpt-4.1=2:8,text-embedding-3-small=0.02:0"
+    USAGE_DAILY_BUDGET_USD: float = 0.0  # orçamento diário global (0 = sem alerta)
+    USAGE_USER_DAILY_BUDGET_USD: float = 0.0  # orçamento diário por usuário (0 = sem alerta)
+    USAGE_BUDGET_ALERT_RATIO: float = 0.8  # alerta ao atingir esta fração do orçamento
+    USAGE_ENFORCE_BUDGET: bool = False  # True: 429 para o usuário que estourou o orçamento do dia
+
+    # Aquecer serviços no startup (collections, índices HNSW, contexto fixo, schemas)
+    # /ready responde 503 até o warm-up terminar
+    WARMUP_ON_STARTUP: bool = True
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
@@ -6,6 +6,9 @@ from app.core.config import settings
 from app.core.security import verify_password
 from app.models import get_db, User
 from app.schemas.auth import TokenData
+from app.services.service_container import ServiceContainer, get_or_create_container
+from app.services.embedding_service import EmbeddingService
+from app.services.multi_agent_service import MultiAgentChatService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -47,3 +50,14 @@ def get_current_dev_user(current_user: User = Depends(get_current_active_user))
             detail="Only dev users can perform this action"
         )
     return current_user
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """Container de serviços criado no lifespan (app.state.services)"""
+    return get_or_create_container(request.app.state)
+
+def get_embedding_service(services: ServiceContainer = Depends(get_services)) -> EmbeddingService:
+    return services.embedding_service
+
+def get_chat_service(services: ServiceContainer = Depends(get_services)) -> MultiAgentChatService:
+    return services.chat_service
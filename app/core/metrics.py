@@ -0,0 +1,296 @@
+"""
+Métricas em processo no formato texto do Prometheus (GET /metrics).
+
+Contadores, gauges e histogramas simples (dict + lock, sem dependências):
+o custo de um inc/observe é de poucos microssegundos, então podem ficar
+ligados sempre. Com vários workers, cada processo expõe os próprios números
+(o Prometheus soma por instância).
+
+Principais séries:
+- http_requests_total / http_request_duration_seconds: por rota (template) e status
+- stage_duration_seconds{stage}: cada span do pipeline (telemetry.span), com ou sem exporter
+- llm_inflight_calls / llm_calls_total / llm_tokens_total / llm_cost_usd_total: por agente
+  (in-flight também cobre o rerank)
+- sse_connections: streams /chat/stream abertos
+- cache_requests_total{cache,result} e cache_hit_ratio{cache}: cada camada de cache
+- db_pool_*: uso do pool do SQLAlchemy (lido na hora do scrape)
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Latência de etapas: de milissegundos (cache, busca local) a dezenas de segundos (LLM)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Soma 1 enquanto o bloco roda (ex.: chamadas LLM em andamento)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # por label: (contagem por bucket, soma, total)
+        self._values: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[LabelKey, Tuple[List[int], float, int]]:
+        with self._lock:
+            return {key: (list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # Métricas calculadas no scrape (pool do banco, razões de cache)
+        self._collectors: List[Callable[[], Iterable[Gauge]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Gauge]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        metrics: List[_Metric] = list(self._metrics)
+        for collector in self._collectors:
+            try:
+                metrics.extend(collector())
+            except Exception as e:
+                print(f"⚠️ Erro ao coletar métricas: {e}")
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requests HTTP por método, rota e status"))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latência dos requests HTTP por rota"))
+HTTP_INFLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_progress", "Requests HTTP em andamento"))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "stage_duration_seconds", "Latência por etapa do pipeline (orquestrador, busca, rerank, agentes, consolidação)"))
+LLM_INFLIGHT = REGISTRY.register(Gauge(
+    "llm_inflight_calls", "Chamadas a modelos (OpenAI, rerank da Cohere) em andamento por agente"))
+LLM_CALLS = REGISTRY.register(Counter(
+    "llm_calls_total", "Chamadas à OpenAI concluídas por agente e modelo"))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Tokens consumidos por agente, modelo e tipo (prompt/completion)"))
+LLM_COST = REGISTRY.register(Counter(
+    "llm_cost_usd_total", "Custo estimado (USD) por agente e modelo"))
+SSE_CONNECTIONS = REGISTRY.register(Gauge(
+    "sse_connections", "Conexões /chat/stream abertas"))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Consultas a cada camada de cache (result=hit|miss)"))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def _cache_hit_ratios() -> Iterable[Gauge]:
+    ratios = Gauge("cache_hit_ratio", "Fração de hits por camada de cache desde o start do processo")
+    totals: Dict[str, List[float]] = {}
+    for key, value in CACHE_REQUESTS.values().items():
+        labels = dict(key)
+        hits_and_total = totals.setdefault(labels["cache"], [0.0, 0.0])
+        hits_and_total[1] += value
+        if labels["result"] == "hit":
+            hits_and_total[0] += value
+    for cache, (hits, total) in totals.items():
+        ratios.set(hits / total if total else 0.0, cache=cache)
+    return [ratios]
+
+
+REGISTRY.add_collector(_cache_hit_ratios)
+
+
+def add_db_pool_collector(engine) -> None:
+    """Uso do pool de conexões do engine (QueuePool; outros pools expõem o que tiverem)"""
+
+    def collect() -> Iterable[Gauge]:
+        pool = engine.pool
+        gauges = []
+        for name, documentation, attribute in (
+            ("db_pool_size", "Conexões permanentes do pool", "size"),
+            ("db_pool_checked_out", "Conexões em uso", "checkedout"),
+            ("db_pool_checked_in", "Conexões livres no pool", "checkedin"),
+            ("db_pool_overflow", "Conexões além do pool_size em uso", "overflow"),
+        ):
+            getter = getattr(pool, attribute, None)
+            if getter is None:
+                continue
+            gauge = Gauge(name, documentation)
+            # overflow() fica negativo enquanto o pool não encheu
+            gauge.set(max(getter(), 0))
+            gauges.append(gauge)
+        return gauges
+
+    REGISTRY.add_collector(collect)
+
+
+def stage_summary() -> Dict[str, Dict[str, float]]:
+    """Contagem e latência média por etapa (para os endpoints de status)"""
+    summary = {}
+    for key, (_, total, count) in STAGE_DURATION.snapshot().items():
+        stage = dict(key)["stage"]
+        summary[stage] = {"count": count, "avg_ms": round(total / count * 1000, 1) if count else None}
+    return summary
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI (sem BaseHTTPMiddleware, para não bufferizar o SSE):
+    conta requests por rota/status e mede a duração até o fim da resposta.
+    A rota é o template ("/chat/conversations/{conversation_id}"), nunca o path
+    cru, para manter a cardinalidade baixa.
+    """
+
+    def __init__(self, app, excluded_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = set(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status["code"])
+            HTTP_DURATION.observe(time.perf_counter() - start, route=route)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,220 @@
+"""
+Profiler por request, opt-in para usuários dev.
+
+Com ?profile=true ou o header "X-Profile: 1" em /chat/ e /chat/stream, o
+request roda com:
+- um amostrador em thread separada que lê a stack da thread do event loop a
+  cada PROFILING_INTERVAL_MS, só enquanto a task do request está executando.
+  Amostras com o loop parado em I/O viram "(await)"; com outra task
+  rodando, "(other task)". Assim o flame graph cobre o tempo de parede
+- o timeline de etapas: cada telemetry.span() aberto no request (início,
+  duração e profundidade)
+
+O resultado vai para PROFILING_DIRECTORY: <id>.collapsed (uma stack por
+linha, "a;b;c N", aberto por flamegraph.pl e speedscope) e <id>.json
+(timeline e funções mais quentes). Sem a flag nada roda: span() só faz um
+ContextVar.get(). Código em threads do pool (to_thread) não é amostrado.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent) + os.sep
+STDLIB_ROOT = os.path.dirname(os.__file__) + os.sep
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+TOP_FUNCTIONS = 15
+
+# Frame do loop que executa um passo de task: tudo acima dele é o servidor
+_LOOP_STEP_CODE = asyncio.events.Handle._run.__code__
+
+_active_profiler: ContextVar[Optional["RequestProfiler"]] = ContextVar("request_profiler", default=None)
+
+
+def current_profiler() -> Optional["RequestProfiler"]:
+    return _active_profiler.get()
+
+
+def profiling_directory() -> Path:
+    return Path(settings.PROFILING_DIRECTORY)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for root in (PROJECT_ROOT, STDLIB_ROOT):
+        if filename.startswith(root):
+            filename = filename[len(root):]
+            break
+    else:
+        marker = "site-packages" + os.sep
+        index = filename.rfind(marker)
+        if index >= 0:
+            filename = filename[index + len(marker):]
+    # ";" separa frames no formato collapsed
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class RequestProfiler:
+    """Amostrador + timeline de um request (start/stop na mesma task)"""
+
+    def __init__(self, label: str, interval_ms: Optional[float] = None, sample: bool = True):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.sample = sample
+        self.interval = (interval_ms or settings.PROFILING_INTERVAL_MS) / 1000
+        self.stacks: Counter = Counter()
+        self.stages: List[Dict[str, Any]] = []
+        self._depth = 0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._token = None
+        self._report: Optional[Dict[str, Any]] = None
+
+    def start(self) -> "RequestProfiler":
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        self._token = _active_profiler.set(self)
+        if self.sample:
+            self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+            self._sampler.start()
+        return self
+
+    def _sample(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # Com código Python segurando o GIL o amostrador acorda atrasado:
+            # cada amostra pesa o tempo real desde a anterior (em intervalos)
+            now = time.perf_counter()
+            weight = max(1, round((now - last) / self.interval))
+            last = now
+
+            # Leitura do dict de tasks correntes do loop a partir de outra thread:
+            # no pior caso uma amostra cai no rótulo errado
+            running = asyncio.current_task(self._loop)
+            if running is not self._task:
+                self.stacks["(await)" if running is None else "(other task)"] += weight
+                continue
+
+            frame = sys._current_frames().get(self._thread_id)
+            labels = []
+            while frame is not None and frame.f_code is not _LOOP_STEP_CODE:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += weight
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 2)
+
+    def enter_stage(self, name: str) -> int:
+        self.stages.append({"name": name, "depth": self._depth, "start_ms": self._elapsed_ms(), "duration_ms": None})
+        self._depth += 1
+        return len(self.stages) - 1
+
+    def exit_stage(self, index: int) -> None:
+        self._depth -= 1
+        stage = self.stages[index]
+        stage["duration_ms"] = round(self._elapsed_ms() - stage["start_ms"], 2)
+
+    def stop(self, write: bool = True, **extra: Any) -> Dict[str, Any]:
+        """
+        Para o amostrador e grava os arquivos (write=False: só o relatório, ex.:
+        benchmarks que usam apenas o timeline). Chamadas repetidas devolvem o
+        mesmo relatório.
+        """
+        if self._report is not None:
+            return self._report
+
+        duration_ms = self._elapsed_ms()
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+        try:
+            _active_profiler.reset(self._token)
+        except ValueError:
+            # Gerador SSE fechado em outro contexto
+            _active_profiler.set(None)
+
+        self._report = self._build_report(duration_ms, extra)
+        if not write:
+            return self._report
+        try:
+            self._write()
+        except OSError as e:
+            print(f"⚠️ Erro ao gravar profile {self.id}: {e}")
+            self._report["files"] = None
+        return self._report
+
+    def _build_report(self, duration_ms: float, extra: Dict[str, Any]) -> Dict[str, Any]:
+        samples = sum(self.stacks.values())
+        self_time: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_time[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        def top(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"function": label, "samples": count, "percent": round(100 * count / samples, 1)}
+                for label, count in counter.most_common(TOP_FUNCTIONS)
+            ]
+
+        return {
+            "id": self.id,
+            "label": self.label,
+            "duration_ms": duration_ms,
+            "interval_ms": round(self.interval * 1000, 2),
+            "samples": samples,
+            "stages": self.stages,
+            "top_self": top(self_time) if samples else [],
+            "top_inclusive": top(inclusive) if samples else [],
+            **extra,
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def _write(self) -> None:
+        directory = profiling_directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        collapsed_path = directory / f"{self.id}.collapsed"
+        report_path = directory / f"{self.id}.json"
+        self._report["files"] = {"collapsed": str(collapsed_path), "report": str(report_path)}
+        _write_atomic(collapsed_path, self.collapsed())
+        _write_atomic(report_path, json.dumps(self._report, ensure_ascii=False, indent=2, default=str))
+
+
+def start_profiler(label: str, sample: bool = True) -> RequestProfiler:
+    """sample=False: só o timeline de etapas, sem a thread de amostragem"""
+    return RequestProfiler(label, sample=sample).start()
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[Path]:
+    """Caminho de um profile gravado (None para ids inválidos ou inexistentes)"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = profiling_directory() / f"{profile_id}{suffix}"
+    return path if path.exists() else None
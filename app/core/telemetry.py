@@ -0,0 +1,173 @@
+"""
+Tracing (OpenTelemetry) do pipeline de chat.
+
+TELEMETRY_EXPORTER:
+- "none" (padrão): nada é importado; span() devolve um span vazio (só mede a duração)
+- "console": spans impressos no stdout (desenvolvimento)
+- "otlp": enviados a um collector OTLP/gRPC (TELEMETRY_OTLP_ENDPOINT, ex.: Jaeger local)
+
+Uso:
+    with span("search.vector", categories=3) as current:
+        ...
+        current.set_attribute("search.documents", total)
+
+    @traced("agent.forensic")
+    async def analyze(...): ...
+
+Independente do exporter, a duração de cada span vai para o histograma
+stage_duration_seconds{stage=<nome do span>} de app.core.metrics e, em
+requests com profiler (app.core.profiling), para o timeline de etapas.
+
+Com o exporter ligado, o FastAPIInstrumentor cria o span do request e os
+spans do pipeline ficam aninhados nele (inclusive no /chat/stream, cujo
+gerador SSE roda dentro do request).
+"""
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import STAGE_DURATION
+from app.core.profiling import current_profiler
+
+
+TELEMETRY_EXPORTERS = ("none", "console", "otlp")
+INSTRUMENTATION_NAME = "ubs_portfolio_ai"
+
+_tracer = None
+_provider = None
+
+
+class _NoopSpan:
+    """Span usado com a telemetria desligada (mesma interface que usamos do Span real)"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def setup_telemetry(app: Any = None) -> bool:
+    """
+    Configura o TracerProvider conforme TELEMETRY_EXPORTER e instrumenta o app
+    FastAPI (se informado). Retorna False com a telemetria desligada.
+    """
+    global _tracer, _provider
+
+    exporter_name = settings.TELEMETRY_EXPORTER
+    if exporter_name not in TELEMETRY_EXPORTERS:
+        raise ValueError(f"TELEMETRY_EXPORTER inválido: {exporter_name} (use {', '.join(TELEMETRY_EXPORTERS)})")
+    if exporter_name == "none":
+        return False
+
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if exporter_name == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        # Vazio: o exporter usa OTEL_EXPORTER_OTLP_ENDPOINT ou localhost:4317
+        endpoint = settings.TELEMETRY_OTLP_ENDPOINT or None
+        exporter = OTLPSpanExporter(
+            endpoint=endpoint,
+            insecure=endpoint.startswith("http://") if endpoint else None
+        )
+
+    _provider = TracerProvider(resource=Resource.create({
+        "service.name": settings.TELEMETRY_SERVICE_NAME,
+        "deployment.environment": settings.ENVIRONMENT,
+    }))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer(INSTRUMENTATION_NAME)
+
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="health,ready,metrics")
+    return True
+
+
+def shutdown_telemetry() -> None:
+    """Envia os spans pendentes (chamado no shutdown do app)"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def set_attributes(current: Any, **attributes: Any) -> None:
+    """Define atributos ignorando None (o OpenTelemetry rejeita None)"""
+    values = {key.replace("__", "."): value for key, value in attributes.items() if value is not None}
+    if values:
+        current.set_attributes(values)
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Span como contexto atual. Atributos com "__" viram "." (llm__model -> llm.model)"""
+    start = time.perf_counter()
+    profiler = current_profiler()
+    stage = profiler.enter_stage(name) if profiler is not None else None
+    try:
+        if _tracer is None:
+            yield NOOP_SPAN
+            return
+
+        with _tracer.start_as_current_span(name) as current:
+            set_attributes(current, **attributes)
+            yield current
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=name)
+        if profiler is not None:
+            profiler.exit_stage(stage)
+
+
+def current_span() -> Any:
+    """Span ativo (ou o vazio), para anotar atributos de dentro de uma etapa"""
+    if _tracer is None:
+        return NOOP_SPAN
+
+    from opentelemetry import trace
+
+    return trace.get_current_span()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator: envolve a função (sync ou async) em um span"""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from anyio import to_thread
 from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, add_db_pool_collector, render_metrics
+from app.core.telemetry import setup_telemetry, shutdown_telemetry
 from app.api.routes import chat, auth, documents
-from app.models import init_db
+from app.models import engine, init_db
+from app.services.service_container import get_or_create_container
+import asyncio
+import hmac
 import logging
+import os
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -12,17 +22,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _build_and_warm_up(app: FastAPI) -> dict:
+    """Cria o container (se ainda não existe), importa o artefato de índice e aquece os serviços"""
+    container = get_or_create_container(app.state)
+    report = {}
+    if settings.INDEX_ARTIFACT_PATH and settings.CHROMA_MODE == "http":
+        # Chroma compartilhado: o import é um job único (scripts/index_artifact.py), não de cada réplica
+        logger.warning("INDEX_ARTIFACT_PATH ignored with CHROMA_MODE=http; run scripts/index_artifact.py import once")
+    elif settings.INDEX_ARTIFACT_PATH:
+        if os.path.exists(settings.INDEX_ARTIFACT_PATH):
+            report["index_artifact"] = container.load_index_artifact(settings.INDEX_ARTIFACT_PATH)
+        else:
+            logger.warning(f"INDEX_ARTIFACT_PATH not found: {settings.INDEX_ARTIFACT_PATH}")
+    if settings.WARMUP_ON_STARTUP:
+        report.update(container.warm_up())
+    return report
+
+
+async def warm_up_services(app: FastAPI) -> None:
+    """Startup em background; marca app.state.ready ao final"""
+    start = time.perf_counter()
+    logger.info("Initializing services...")
+    try:
+        app.state.warmup = await to_thread.run_sync(_build_and_warm_up, app)
+        app.state.ready = True
+        logger.info(f"Services ready in {time.perf_counter() - start:.2f}s: {app.state.warmup}")
+    except Exception as e:
+        # ready continua False: /ready responde 503 com o erro e o healthcheck
+        # do deploy não libera tráfego para uma réplica quebrada
+        logger.error(f"Failed to initialize services at startup: {e}")
+        app.state.warmup = {"error": str(e)}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown: cria os serviços compartilhados uma única vez por processo"""
+    logger.info("=" * 60)
+    logger.info(f"🚀 {settings.APP_NAME} Starting...")
+    logger.info(f"Environment: {settings.ENVIRONMENT}")
+    logger.info(f"Debug Mode: {settings.DEBUG}")
+    logger.info(f"OpenAI Model: {settings.OPENAI_MODEL}")
+    logger.info(f"Database: {settings.DATABASE_URL}")
+    logger.info("=" * 60)
+
+    # Initialize database
+    logger.info("Initializing database...")
+    await to_thread.run_sync(init_db)
+
+    # Chroma/OpenAI/Cohere/agentes + warm-up rodam em background: /health
+    # responde na hora e /ready só libera quando tudo estiver quente
+    app.state.ready = False
+    app.state.warmup = {}
+    warmup_task = asyncio.create_task(warm_up_services(app))
+
+    yield
+
+    warmup_task.cancel()
+    shutdown_telemetry()
+    logger.info("Shutting down UBS Portfolio AI...")
+    app.state.services = None
+    app.state.ready = False
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     debug=settings.DEBUG,
     version="1.0.0",
-    description="Sistema de análise de portfólio com IA multi-agente"
+    description="Sistema de análise de portfólio com IA multi-agente",
+    lifespan=lifespan
 )
 
-# Initialize database
-logger.info("Initializing database...")
-init_db()
-
 # CORS - usar origens do config
 allowed_origins = settings.get_allowed_origins_list()
 logger.info(f"CORS allowed origins: {allowed_origins}")
@@ -41,6 +111,17 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Métricas por rota e etapa (GET /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    add_db_pool_collector(engine)
+    if not settings.METRICS_TOKEN:
+        logger.warning("METRICS_ENABLED without METRICS_TOKEN: /metrics is unauthenticated")
+
+# Tracing por etapa (TELEMETRY_EXPORTER); no-op por padrão
+if setup_telemetry(app):
+    logger.info(f"Telemetry enabled: {settings.TELEMETRY_EXPORTER}")
+
 # Routes
 app.include_router(auth.router)
 app.include_router(chat.router)
@@ -65,18 +146,30 @@ def health():
         "debug": settings.DEBUG
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """Log startup information"""
-    logger.info("=" * 60)
-    logger.info(f"🚀 {settings.APP_NAME} Starting...")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
-    logger.info(f"Debug Mode: {settings.DEBUG}")
-    logger.info(f"OpenAI Model: {settings.OPENAI_MODEL}")
-    logger.info(f"Database: {settings.DATABASE_URL}")
-    logger.info("=" * 60)
+@app.get("/ready")
+def ready():
+    """Readiness: 200 só depois do warm-up dos serviços (usado pelo healthcheck do deploy)"""
+    if not getattr(app.state, "ready", False):
+        error = (getattr(app.state, "warmup", None) or {}).get("error")
+        if error:
+            return JSONResponse(status_code=503, content={"status": "failed", "error": error})
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {
+        "status": "ready",
+        "warmup": app.state.warmup
+    }
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("Shutting down UBS Portfolio AI...")
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: str = Header(default="")):
+    """Métricas em processo no formato texto do Prometheus (bearer METRICS_TOKEN, se definido)"""
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+    ):
+        return JSONResponse(
+            status_code=401,
+            content={"detail": "Not authenticated"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
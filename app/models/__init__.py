@@ -1,9 +1,11 @@
 from .database import Base, engine, get_db, init_db, SessionLocal
 from .document import User, Document, DocumentChunk
 from .conversation import Conversation, Message
+from .usage import UsageRecord
 
 __all__ = [
     "Base", "engine", "get_db", "init_db", "SessionLocal",
     "User", "Document", "DocumentChunk",
-    "Conversation", "Message"
+    "Conversation", "Message",
+    "UsageRecord"
 ]
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from .database import Base
+
+class UsageRecord(Base):
+    """Tokens e custo de um agente em um request do chat (uma linha por agente/modelo)"""
+    __tablename__ = "usage_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    request_id = Column(String(36), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True, index=True)
+    message_id = Column(Integer, ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
+    agent = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    calls = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    latency_ms = Column(Float, nullable=True)  # duração do request inteiro
+    created_at = Column(DateTime, server_default=func.now(), index=True)
@@ -1,11 +1,18 @@
 """
 Processador de Documentos Oficiais da UBS.
 Processa PDFs de documentos oficiais e gera chunks para evidência.
+
+A extração de texto é feita em streaming (página a página). PDFs grandes têm
+as páginas distribuídas em um pool de processos, e o texto extraído fica em
+cache no disco por (hash do arquivo, página) — re-ingerir PDFs inalterados
+não faz parsing de novo.
 """
+import os
 import re
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import PyPDF2
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
 
 from app.models.chunks import (
     UBSOfficialDocChunk,
@@ -14,9 +21,41 @@ from app.models.chunks import (
 )
 
 
+def _iter_pages(pdf_path: str, pages: Sequence[int]) -> Iterator[Tuple[int, str]]:
+    """
+    Gera o texto das páginas pedidas (números 1-indexed, na ordem dada), uma por
+    vez: cada página é extraída só quando o consumidor pede a próxima.
+    """
+    import PyPDF2
+
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for num in pages:
+            try:
+                text = reader.pages[num - 1].extract_text() or ""
+            except Exception as e:
+                print(f"Erro na página {num} de {pdf_path}: {e}")
+                text = ""
+            yield num, text
+
+
+def _extract_pages(pdf_path: str, pages: List[int]) -> List[Tuple[int, str]]:
+    """
+    Extrai o texto das páginas pedidas de um PDF (1-indexed).
+    Função de módulo para poder rodar em ProcessPoolExecutor.
+    """
+    return list(_iter_pages(pdf_path, pages))
+
+
 class UBSDocsProcessor:
     """Processa documentos oficiais da UBS"""
 
+    # Com pelo menos esse número de páginas fora do cache, a extração é em paralelo
+    PARALLEL_MIN_PAGES = 40
+
+    # Páginas por tarefa enviada ao pool (cada tarefa reabre o PDF)
+    PAGES_PER_TASK = 16
+
     # Mapeamento de arquivos para tipos
     DOC_TYPE_MAPPING = {
         "code_of_conduct": UBSOfficialChunkType.CODE_OF_CONDUCT,
@@ -61,20 +100,34 @@ class UBSDocsProcessor:
         ],
     }
 
-    def __init__(self, docs_dir: str = "data/raw/ubs_official"):
+    def __init__(
+        self,
+        docs_dir: str = "data/raw/ubs_official",
+        cache_dir: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ):
         self.docs_dir = Path(docs_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.docs_dir / ".text_cache"
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
 
     def process_all(self) -> List[UBSOfficialDocChunk]:
         """Processa todos os documentos oficiais"""
         all_chunks = []
 
-        for pdf_file in self.docs_dir.glob("*.pdf"):
+        # Um único pool compartilhado por todos os PDFs do diretório
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            self._executor = executor
             try:
-                chunks = self.process_document(pdf_file)
-                all_chunks.extend(chunks)
-                print(f"  ✓ {pdf_file.name}: {len(chunks)} chunks")
-            except Exception as e:
-                print(f"  ✗ {pdf_file.name}: {e}")
+                for pdf_file in sorted(self.docs_dir.glob("*.pdf")):
+                    try:
+                        chunks = self.process_document(pdf_file)
+                        all_chunks.extend(chunks)
+                        print(f"  ✓ {pdf_file.name}: {len(chunks)} chunks")
+                    except Exception as e:
+                        print(f"  ✗ {pdf_file.name}: {e}")
+            finally:
+                self._executor = None
 
         return all_chunks
 
@@ -86,11 +139,8 @@ class UBSDocsProcessor:
         filename_lower = pdf_path.stem.lower()
         doc_type = self._detect_doc_type(filename_lower)
 
-        # Extrair texto do PDF
-        text_pages = self._extract_pdf_text(pdf_path)
-
-        # Processar cada página
-        for page_num, page_text in enumerate(text_pages, 1):
+        # Processar cada página (extraída sob demanda)
+        for page_num, page_text in self._iter_pdf_pages(pdf_path):
             if len(page_text.strip()) < 100:
                 continue
 
@@ -128,18 +178,95 @@ class UBSDocsProcessor:
 
     def _extract_pdf_text(self, pdf_path: Path) -> List[str]:
         """Extrai texto de todas as páginas do PDF"""
-        pages = []
-
+        return [text for _, text in self._iter_pdf_pages(pdf_path)]
+
+    def _iter_pdf_pages(self, pdf_path: Path) -> Iterator[Tuple[int, str]]:
+        """
+        Gera (número da página, texto) em ordem, sem manter o PDF inteiro em memória.
+        Páginas já em cache são lidas do disco; só as que faltam são extraídas,
+        serialmente (poucas páginas) ou em paralelo no pool de processos.
+        """
         try:
-            with open(pdf_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text = page.extract_text() or ""
-                    pages.append(text)
+            page_dir = self.cache_dir / self._file_hash(pdf_path)
+            page_count = self._cached_page_count(page_dir)
+
+            if page_count is None:
+                import PyPDF2
+
+                with open(pdf_path, "rb") as f:
+                    page_count = len(PyPDF2.PdfReader(f).pages)
+
+            missing = [
+                num for num in range(1, page_count + 1)
+                if not (page_dir / f"{num}.txt").exists()
+            ]
+
+            extracted: Iterator[Tuple[int, str]] = iter(())
+            if missing:
+                page_dir.mkdir(parents=True, exist_ok=True)
+                if len(missing) < self.PARALLEL_MIN_PAGES:
+                    extracted = _iter_pages(str(pdf_path), missing)
+                else:
+                    extracted = self._extract_parallel(pdf_path, missing)
+
+            # Intercala cache e extração (as páginas extraídas saem em ordem)
+            missing_pages = set(missing)
+            for num in range(1, page_count + 1):
+                if num in missing_pages:
+                    _, text = next(extracted)
+                    self._write_page_cache(page_dir, num, text)
+                else:
+                    text = (page_dir / f"{num}.txt").read_text(encoding="utf-8")
+                yield num, text
+
+            if missing:
+                (page_dir / "pages.count").write_text(str(page_count), encoding="utf-8")
         except Exception as e:
             print(f"Erro ao processar {pdf_path}: {e}")
 
-        return pages
+    def _extract_parallel(self, pdf_path: Path, pages: List[int]) -> Iterator[Tuple[int, str]]:
+        """Distribui as páginas em lotes no pool e devolve os resultados em ordem"""
+        executor = self._executor
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            futures = [
+                executor.submit(_extract_pages, str(pdf_path), pages[start:start + self.PAGES_PER_TASK])
+                for start in range(0, len(pages), self.PAGES_PER_TASK)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            if own_executor:
+                executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _file_hash(pdf_path: Path) -> str:
+        """SHA-256 do conteúdo do PDF (chave do cache)"""
+        sha = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @staticmethod
+    def _cached_page_count(page_dir: Path) -> Optional[int]:
+        count_file = page_dir / "pages.count"
+        if not count_file.exists():
+            return None
+        try:
+            return int(count_file.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _write_page_cache(page_dir: Path, page_num: int, text: str) -> None:
+        """Grava o texto da página de forma atômica (tmp + rename)"""
+        tmp_path = page_dir / f"{page_num}.txt.tmp"
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, page_dir / f"{page_num}.txt")
 
     def _detect_doc_type(self, filename: str) -> UBSOfficialChunkType:
         """Detecta tipo de documento pelo nome do arquivo"""
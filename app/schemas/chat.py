@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 class ChatMessage(BaseModel):
@@ -14,6 +14,7 @@ class ChatRequest(BaseModel):
     message: str
     conversation_history: List[ChatMessage] = []
     date_range: Optional[DateRange] = None
+    portfolio: Optional[Literal["01", "02"]] = None
 
 class Source(BaseModel):
     filename: str
@@ -41,6 +42,8 @@ class ChatResponse(BaseModel):
     chart: Optional[Dict[str, Any]] = None
     agents_used: Optional[List[str]] = None
     analysis: Optional[Dict[str, Any]] = None
+    usage: Optional[Dict[str, Any]] = None  # tokens/custo por agente e latência do request
+    profile: Optional[Dict[str, Any]] = None  # só com ?profile=true (usuários dev)
     conversation_id: Optional[int] = None
 
 class ConversationResponse(BaseModel):
@@ -1,6 +1,18 @@
-from .document_processor import DocumentProcessor
-from .embedding_service import EmbeddingService
-from .rag_service import RAGService
-from .chart_generator import ChartGenerator
+# Imports sob demanda: importar um submódulo (ex.: app.services.storage_service)
+# não deve carregar pandas/chromadb/etc. dos demais serviços
+_LAZY_EXPORTS = {
+    "DocumentProcessor": ".document_processor",
+    "EmbeddingService": ".embedding_service",
+    "RAGService": ".rag_service",
+    "ChartGenerator": ".chart_generator",
+}
 
 __all__ = ["DocumentProcessor", "EmbeddingService", "RAGService", "ChartGenerator"]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+
+        return getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,145 @@
+"""
+Criação do cliente do Chroma: embutido (PersistentClient em disco local) ou
+HTTP (servidor `chroma run` separado, compartilhado por várias réplicas da API).
+
+No modo HTTP a sessão `requests` do cliente recebe um pool de conexões do
+tamanho do threadpool, timeout padrão (conexão, leitura) em toda requisição
+e retry com backoff para falhas de conexão e 502/503/504. Depois que a
+requisição chegou ao servidor, só repetem os métodos idempotentes e os POST de
+leitura (get/query de uma collection): um add/upsert/delete pode ter sido
+aplicado antes do timeout ou do 50x.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+
+
+CHROMA_MODES = ("embedded", "http")
+RETRY_STATUSES = (502, 503, 504)
+# POST do Chroma que só leem dados (/api/v1/collections/{id}/get e /query)
+READ_ONLY_POST_SUFFIXES = ("/get", "/query")
+
+
+def is_read_only_post(url: Optional[str]) -> bool:
+    path = urlsplit(url or "").path.rstrip("/")
+    return path.endswith(READ_ONLY_POST_SUFFIXES)
+
+
+def _retry_class():
+    from urllib3.exceptions import MaxRetryError, ResponseError
+    from urllib3.util.retry import Retry
+
+    class ChromaRetry(Retry):
+        """Retry que repete POST só nos endpoints de leitura do Chroma"""
+
+        def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+            if method == "POST" and not is_read_only_post(url) and not (error and self._is_connection_error(error)):
+                # Escrita que pode ter sido aplicada: devolve o erro/resposta original
+                if error is not None:
+                    raise error.with_traceback(_stacktrace)
+                status = getattr(response, "status", None)
+                raise MaxRetryError(_pool, url, ResponseError(ResponseError.SPECIFIC_ERROR.format(status_code=status)))
+            return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    return ChromaRetry
+
+
+def _timeout_adapter_class():
+    from requests.adapters import HTTPAdapter
+
+    class TimeoutHTTPAdapter(HTTPAdapter):
+        """HTTPAdapter com timeout padrão (o cliente do Chroma não passa timeout)"""
+
+        def __init__(self, timeout: Tuple[float, float], **kwargs):
+            self.timeout = timeout
+            super().__init__(**kwargs)
+
+        def send(self, request, **kwargs):
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = self.timeout
+            return super().send(request, **kwargs)
+
+    return TimeoutHTTPAdapter
+
+
+def configure_http_session(
+    session: Any,
+    pool_size: int,
+    timeout: Tuple[float, float],
+    max_retries: int,
+    backoff_seconds: float
+) -> None:
+    """Monta o adapter com pool, timeout e retry em http:// e https://"""
+    retry_class = _retry_class()
+    retry = retry_class(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_seconds,
+        status_forcelist=RETRY_STATUSES,
+        # POST entra aqui, mas o ChromaRetry só repete os de leitura
+        allowed_methods=retry_class.DEFAULT_ALLOWED_METHODS | {"POST"},
+        raise_on_status=False,
+    )
+    adapter = _timeout_adapter_class()(
+        timeout=timeout,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def _http_headers() -> Optional[Dict[str, str]]:
+    if settings.CHROMA_AUTH_TOKEN:
+        return {"Authorization": f"Bearer {settings.CHROMA_AUTH_TOKEN}"}
+    return None
+
+
+def create_chroma_client() -> Any:
+    """Cliente conforme CHROMA_MODE ("embedded" ou "http")"""
+    import chromadb
+
+    mode = settings.CHROMA_MODE
+    if mode not in CHROMA_MODES:
+        raise ValueError(f"CHROMA_MODE inválido: {mode} (use {', '.join(CHROMA_MODES)})")
+
+    if mode == "embedded":
+        return chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+
+    # O construtor já faz requisições (valida tenant/database): o servidor pode
+    # ainda estar subindo, então tenta algumas vezes antes de desistir
+    attempts = settings.CHROMA_MAX_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            client = chromadb.HttpClient(
+                host=settings.CHROMA_HOST,
+                port=str(settings.CHROMA_PORT),
+                ssl=settings.CHROMA_SSL,
+                headers=_http_headers(),
+            )
+            break
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = settings.CHROMA_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            print(f"⚠️  Chroma em {settings.CHROMA_HOST}:{settings.CHROMA_PORT} indisponível ({e}); nova tentativa em {delay:.1f}s")
+            time.sleep(delay)
+
+    # Sessão interna do FastAPI client do chromadb (0.4.x)
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is None:
+        print("⚠️  Sessão HTTP do Chroma não encontrada - pool/timeout/retry não configurados")
+    else:
+        configure_http_session(
+            session,
+            pool_size=settings.CHROMA_POOL_SIZE,
+            timeout=(settings.CHROMA_CONNECT_TIMEOUT_SECONDS, settings.CHROMA_TIMEOUT_SECONDS),
+            max_retries=settings.CHROMA_MAX_RETRIES,
+            backoff_seconds=settings.CHROMA_RETRY_BACKOFF_SECONDS,
+        )
+    return client
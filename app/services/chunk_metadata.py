@@ -0,0 +1,273 @@
+"""
+Metadata tipada dos chunks e filtros estruturados de busca.
+
+Na ingestão, `normalize_metadata` garante campos filtráveis em todos os chunks:
+- year_start / year_end (int): período coberto; sem data = YEAR_MIN..YEAR_MAX
+- year (int): quando o chunk é de um único ano
+- portfolio_type (str): "01", "02" ou "all" (ambos / não especificado)
+- quarter (int): 1-4, ou 0 quando não é trimestral
+
+`SearchFilters` traduz um recorte (período, portfolio, trimestre) para uma
+cláusula `where` do Chroma ou para uma máscara booleana sobre as colunas dos
+índices locais (vetorial e BM25), para que o corte aconteça antes do ranking.
+Chunks sem data ou de ambos os portfolios sempre passam pelo filtro.
+
+Regra única para campo ausente (chunks ingeridos antes da metadata tipada):
+o campo vale o seu valor "passa tudo" (FIELD_DEFAULTS), em todos os backends.
+O `where` do Chroma descarta documentos sem a chave, então só é exato em
+collections tipadas; nas demais a busca filtra os candidatos com `matches`.
+"""
+import json
+import re
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+YEAR_MIN = 0
+YEAR_MAX = 9999
+ALL_PORTFOLIOS = "all"
+NO_QUARTER = 0
+
+# Valor assumido quando o campo tipado não existe na metadata (sempre passa)
+FIELD_DEFAULTS = {
+    "year_start": YEAR_MIN,
+    "year_end": YEAR_MAX,
+    "portfolio_type": ALL_PORTFOLIOS,
+    "quarter": NO_QUARTER,
+}
+TYPED_FIELDS = tuple(FIELD_DEFAULTS)
+
+# `where` que casa só os chunks com todos os campos tipados
+TYPED_WHERE = {"$and": [
+    {"year_start": {"$gte": YEAR_MIN}},
+    {"year_end": {"$gte": YEAR_MIN}},
+    {"portfolio_type": {"$ne": ""}},
+    {"quarter": {"$gte": NO_QUARTER}},
+]}
+
+# Campos de data: um único instante ou um período (início, fim)
+SINGLE_DATE_FIELDS = ("reference_date", "event_date", "document_date")
+PERIOD_FIELDS = (("period_start", "period_end"), ("violation_start", "violation_end"))
+PORTFOLIO_FIELDS = ("portfolio_type", "portfolio_affected", "portfolio_number")
+
+_YEAR_RE = re.compile(r"(?<!\d)(19|20)\d{2}(?!\d)")
+_PORTFOLIO_RE = re.compile(r"(?:^|\D)(01|02)$")
+_QUARTER_RE = re.compile(r"^Q?([1-4])$", re.IGNORECASE)
+
+
+def _year_of(value: Any) -> Optional[int]:
+    if isinstance(value, (date, datetime)):
+        return value.year
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = _YEAR_RE.search(value)
+        if match:
+            return int(match.group(0))
+    return None
+
+
+def normalize_portfolio(value: Any) -> str:
+    """"01", "02" ou "all" a partir de "01", "PORTFOLIO 02", "0240-...-02", "both", "XX"..."""
+    if value is None:
+        return ALL_PORTFOLIOS
+    match = _PORTFOLIO_RE.search(str(value).strip())
+    return match.group(1) if match else ALL_PORTFOLIOS
+
+
+def normalize_quarter(value: Any) -> int:
+    """1-4 a partir de "Q3", "3" ou 3; NO_QUARTER se não for trimestral"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value if 1 <= value <= 4 else NO_QUARTER
+    match = _QUARTER_RE.match(str(value).strip()) if value is not None else None
+    return int(match.group(1)) if match else NO_QUARTER
+
+
+def year_range(metadata: Dict[str, Any]) -> Tuple[int, int]:
+    """Período (ano inicial, ano final) coberto pelo chunk"""
+    year = _year_of(metadata.get("year"))
+    if year is not None:
+        return year, year
+
+    years: List[int] = []
+    for start_field, end_field in PERIOD_FIELDS:
+        start, end = _year_of(metadata.get(start_field)), _year_of(metadata.get(end_field))
+        if start is not None or end is not None:
+            return (start if start is not None else YEAR_MIN), (end if end is not None else YEAR_MAX)
+
+    for field in SINGLE_DATE_FIELDS:
+        found = _year_of(metadata.get(field))
+        if found is not None:
+            years.append(found)
+
+    if not years:
+        return YEAR_MIN, YEAR_MAX
+    return min(years), max(years)
+
+
+def normalize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadata pronta para o Chroma (só str/int/float/bool, sem None) com os
+    campos tipados de filtro. Listas e dicts viram JSON.
+    """
+    clean: Dict[str, Any] = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, (date, datetime)):
+            clean[key] = value.isoformat()
+        elif isinstance(value, (list, dict)):
+            clean[key] = json.dumps(value, ensure_ascii=False, default=str)
+        elif isinstance(value, (str, int, float, bool)):
+            clean[key] = value
+        else:
+            clean[key] = str(value)
+
+    year_start, year_end = year_range(metadata)
+    clean["year_start"] = year_start
+    clean["year_end"] = year_end
+    if year_start == year_end:
+        clean["year"] = year_start
+    else:
+        clean.pop("year", None)
+
+    portfolio = next(
+        (metadata[field] for field in PORTFOLIO_FIELDS if metadata.get(field) is not None),
+        None
+    )
+    clean["portfolio_type"] = normalize_portfolio(portfolio)
+    clean["quarter"] = normalize_quarter(metadata.get("quarter"))
+    return clean
+
+
+def typed_values(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Campos tipados de um chunk, com FIELD_DEFAULTS no lugar dos ausentes"""
+    metadata = metadata or {}
+    return {name: metadata.get(name, default) for name, default in FIELD_DEFAULTS.items()}
+
+
+@dataclass(frozen=True)
+class FilterColumns:
+    """Colunas de filtro (uma linha por chunk) para máscaras nos índices locais"""
+    year_start: np.ndarray
+    year_end: np.ndarray
+    portfolio_type: np.ndarray
+    quarter: np.ndarray
+
+    @classmethod
+    def from_metadatas(cls, metadatas: List[Dict[str, Any]]) -> "FilterColumns":
+        # Chunks ingeridos antes da metadata tipada caem nos valores "passa tudo"
+        values = [typed_values(m) for m in metadatas]
+        return cls(
+            year_start=np.fromiter((v["year_start"] for v in values), dtype=np.int32, count=len(values)),
+            year_end=np.fromiter((v["year_end"] for v in values), dtype=np.int32, count=len(values)),
+            portfolio_type=np.asarray([v["portfolio_type"] for v in values], dtype=object),
+            quarter=np.fromiter((v["quarter"] for v in values), dtype=np.int8, count=len(values)),
+        )
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Recorte estruturado de uma busca (todos os campos opcionais)"""
+    year_start: Optional[int] = None
+    year_end: Optional[int] = None
+    portfolio_type: Optional[str] = None
+    quarter: Optional[int] = None
+
+    @classmethod
+    def from_date_range(cls, date_range: Any = None, portfolio: Optional[str] = None) -> Optional["SearchFilters"]:
+        """A partir do DateRange do ChatRequest (start_year/end_year); None se não houver recorte"""
+        filters = cls(
+            year_start=getattr(date_range, "start_year", None),
+            year_end=getattr(date_range, "end_year", None),
+            portfolio_type=normalize_portfolio(portfolio) if portfolio else None,
+        )
+        return None if filters.is_empty else filters
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            self.year_start is None and self.year_end is None
+            and self.portfolio_type in (None, ALL_PORTFOLIOS) and not self.quarter
+        )
+
+    def describe(self) -> str:
+        """Nota curta para o prompt (o LLM sabe qual recorte foi aplicado)"""
+        parts = []
+        if self.year_start is not None or self.year_end is not None:
+            start = self.year_start if self.year_start is not None else "início"
+            end = self.year_end if self.year_end is not None else "hoje"
+            parts.append(f"período de {start} a {end}")
+        if self.portfolio_type not in (None, ALL_PORTFOLIOS):
+            parts.append(f"portfolio {self.portfolio_type}")
+        if self.quarter:
+            parts.append(f"Q{self.quarter}")
+        return f"\n[CONTEXTO: Análise limitada ao {', '.join(parts)}]" if parts else ""
+
+    def fill_from(self, other: "SearchFilters") -> "SearchFilters":
+        """Completa os campos vazios com os de outro filtro (os próprios têm precedência)"""
+        return replace(self, **{
+            name: getattr(other, name)
+            for name in ("year_start", "year_end", "portfolio_type", "quarter")
+            if getattr(self, name) is None
+        })
+
+    def to_where(self) -> Optional[Dict[str, Any]]:
+        """
+        Cláusula `where` do Chroma (None se não houver recorte).
+        Só equivale a `matches` em collections tipadas: o Chroma descarta
+        documentos sem a chave (não há como dizer "ausente passa").
+        """
+        conditions: List[Dict[str, Any]] = []
+        if self.year_start is not None:
+            conditions.append({"year_end": {"$gte": self.year_start}})
+        if self.year_end is not None:
+            conditions.append({"year_start": {"$lte": self.year_end}})
+        if self.portfolio_type not in (None, ALL_PORTFOLIOS):
+            conditions.append({"portfolio_type": {"$in": [self.portfolio_type, ALL_PORTFOLIOS]}})
+        if self.quarter:
+            conditions.append({"quarter": {"$in": [self.quarter, NO_QUARTER]}})
+
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def merge_where(self, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Combina com um `where` já existente"""
+        own = self.to_where()
+        if own is None or where is None:
+            return own or where
+        return {"$and": [where, own]}
+
+    def matches(self, metadata: Optional[Dict[str, Any]]) -> bool:
+        """Se um chunk passa pelo recorte (mesma regra de `mask`, linha a linha)"""
+        values = typed_values(metadata)
+        if self.year_start is not None and values["year_end"] < self.year_start:
+            return False
+        if self.year_end is not None and values["year_start"] > self.year_end:
+            return False
+        if self.portfolio_type not in (None, ALL_PORTFOLIOS) \
+                and values["portfolio_type"] not in (self.portfolio_type, ALL_PORTFOLIOS):
+            return False
+        if self.quarter and values["quarter"] not in (self.quarter, NO_QUARTER):
+            return False
+        return True
+
+    def mask(self, columns: FilterColumns, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Máscara booleana das linhas [start, end) que passam pelo recorte"""
+        end = len(columns.year_start) if end is None else end
+        mask = np.ones(end - start, dtype=bool)
+        if self.year_start is not None:
+            mask &= columns.year_end[start:end] >= self.year_start
+        if self.year_end is not None:
+            mask &= columns.year_start[start:end] <= self.year_end
+        if self.portfolio_type not in (None, ALL_PORTFOLIOS):
+            portfolios = columns.portfolio_type[start:end]
+            mask &= (portfolios == self.portfolio_type) | (portfolios == ALL_PORTFOLIOS)
+        if self.quarter:
+            quarters = columns.quarter[start:end]
+            mask &= (quarters == self.quarter) | (quarters == NO_QUARTER)
+        return mask
@@ -0,0 +1,243 @@
+"""
+Collections versionadas com alias (blue/green) para re-indexação sem downtime.
+
+Cada categoria tem um nome base (ex.: "complete_analysis") e versões físicas
+no Chroma ("complete_analysis__v42"). O alias base -> versão ativa fica em
+<CHROMA_PERSIST_DIRECTORY>/collection_aliases.json, gravado de forma atômica.
+
+Fluxo de uma re-indexação:
+1. begin_build(base): cria a próxima versão vazia, ao lado da ativa
+2. a ingestão escreve só na versão nova; as queries continuam na ativa
+3. publish(base, nome): troca o alias atomicamente; a versão anterior é
+   mantida para rollback instantâneo e as mais antigas são apagadas
+4. rollback(base): volta o alias para a versão anterior
+
+Sem alias, a collection ativa é a de nome base (layout antigo), que passa a
+ser a "versão anterior" após a primeira publicação.
+
+Com o Chroma em modo HTTP (várias réplicas da API), o alias fica no próprio
+Chroma, na metadata da collection "collection_aliases" (ChromaAliasStore),
+para que todas as réplicas vejam a mesma troca.
+"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+ALIASES_FILENAME = "collection_aliases.json"
+ALIASES_COLLECTION = "collection_aliases"
+ALIASES_FORMAT_VERSION = 1
+VERSION_SEPARATOR = "__v"
+
+
+def versioned_name(base: str, version: int) -> str:
+    return f"{base}{VERSION_SEPARATOR}{version}"
+
+
+def parse_version(base: str, name: str) -> Optional[int]:
+    """Número da versão de "base__vN" (0 para o nome base, None se for de outra base)"""
+    if name == base:
+        return 0
+    match = re.fullmatch(re.escape(base + VERSION_SEPARATOR) + r"(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+class FileAliasStore:
+    """Aliases em um arquivo JSON local (Chroma embutido)"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def signature(self) -> Optional[tuple]:
+        # os.replace troca o inode a cada gravação: detecta mudanças mesmo com mtime igual
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def read(self) -> Dict[str, Any]:
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        """Grava de forma atômica (tmp + rename): leitores veem o alias antigo ou o novo"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class ChromaAliasStore:
+    """
+    Aliases na metadata de uma collection do próprio Chroma (modo HTTP).
+    Ler custa uma requisição, então a verificação é feita no máximo a cada
+    refresh_seconds; quem grava vê a mudança na hora.
+    """
+
+    def __init__(self, chroma_client: Any, refresh_seconds: float = 5.0):
+        self.chroma_client = chroma_client
+        self.refresh_seconds = refresh_seconds
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._last_fetch = 0.0
+
+    def _fetch(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        if self._metadata is None or now - self._last_fetch >= self.refresh_seconds:
+            collection = self.chroma_client.get_or_create_collection(name=ALIASES_COLLECTION)
+            self._metadata = collection.metadata or {}
+            self._last_fetch = now
+        return self._metadata
+
+    def signature(self) -> Optional[tuple]:
+        revision = self._fetch().get("revision")
+        return None if revision is None else (revision,)
+
+    def read(self) -> Dict[str, Any]:
+        return json.loads(self._fetch()["payload"])
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        metadata = {
+            "payload": json.dumps(payload),
+            "revision": int(self._fetch().get("revision", 0)) + 1,
+        }
+        collection = self.chroma_client.get_or_create_collection(name=ALIASES_COLLECTION)
+        collection.modify(metadata=metadata)
+        self._metadata = metadata
+        self._last_fetch = time.monotonic()
+
+
+class CollectionRegistry:
+    """Alias base -> collection ativa, persistido ao lado do Chroma (ou nele)"""
+
+    def __init__(
+        self,
+        chroma_client: Any,
+        persist_directory: str,
+        collection_metadata: Optional[Dict] = None,
+        store: Optional[Any] = None
+    ):
+        self.chroma_client = chroma_client
+        self.store = store or FileAliasStore(Path(persist_directory) / ALIASES_FILENAME)
+        self.collection_metadata = collection_metadata or {"hnsw:space": "cosine"}
+        self._aliases: Dict[str, Dict[str, Any]] = {}
+        self._signature: Optional[tuple] = None
+        # Incrementado a cada mudança de alias (quem guarda collections abertas compara)
+        self.generation = 0
+        self.refresh()
+
+    # ------------------------------------------------------------
+    # Leitura do alias (barata: um stat, ou o cache do ChromaAliasStore)
+    # ------------------------------------------------------------
+
+    def refresh(self) -> bool:
+        """Recarrega o arquivo de aliases se ele mudou; retorna True se mudou"""
+        signature = self.store.signature()
+        if signature == self._signature:
+            return False
+
+        aliases = {}
+        if signature is not None:
+            try:
+                payload = self.store.read()
+                if payload.get("format") == ALIASES_FORMAT_VERSION:
+                    aliases = payload.get("aliases", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Aliases de collections ignorados ({e})")
+                return False
+
+        self._aliases = aliases
+        self._signature = signature
+        self.generation += 1
+        return True
+
+    def active_name(self, base: str) -> str:
+        return self._aliases.get(base, {}).get("active", base)
+
+    def previous_name(self, base: str) -> Optional[str]:
+        return self._aliases.get(base, {}).get("previous")
+
+    def get_active(self, base: str) -> Any:
+        return self.chroma_client.get_or_create_collection(
+            name=self.active_name(base),
+            metadata=self.collection_metadata
+        )
+
+    # ------------------------------------------------------------
+    # Build / publish / rollback
+    # ------------------------------------------------------------
+
+    def versions(self, base: str) -> List[int]:
+        """Versões existentes no Chroma para a base (0 = nome base)"""
+        versions = []
+        for collection in self.chroma_client.list_collections():
+            version = parse_version(base, collection.name)
+            if version is not None:
+                versions.append(version)
+        return sorted(versions)
+
+    def begin_build(self, base: str) -> Any:
+        """Cria (vazia) a próxima versão da collection, sem tocar na ativa"""
+        self.refresh()
+        known = self.versions(base)
+        active = parse_version(base, self.active_name(base)) or 0
+        name = versioned_name(base, max(known + [active]) + 1)
+        return self.chroma_client.create_collection(name=name, metadata=self.collection_metadata)
+
+    def discard_build(self, name: str) -> None:
+        """Apaga uma versão que não foi publicada"""
+        self.chroma_client.delete_collection(name)
+
+    def publish(self, base: str, name: str, keep_previous: bool = True) -> Dict[str, Any]:
+        """
+        Torna `name` a versão ativa (troca atômica do alias). A ativa atual vira
+        a anterior; versões mais antigas que ela são apagadas do Chroma.
+        """
+        self.refresh()
+        current = self.active_name(base)
+        previous = current if keep_previous and current != name else None
+
+        entry = {"active": name, "previous": previous, "published_at": time.time()}
+        self._write({**self._aliases, base: entry})
+
+        retained = {name, previous}
+        for version in self.versions(base):
+            candidate = base if version == 0 else versioned_name(base, version)
+            if candidate not in retained:
+                self.chroma_client.delete_collection(candidate)
+
+        return entry
+
+    def rollback(self, base: str) -> Dict[str, Any]:
+        """Volta para a versão anterior (a atual passa a ser a anterior)"""
+        self.refresh()
+        previous = self.previous_name(base)
+        if not previous:
+            raise ValueError(f"Nenhuma versão anterior de {base} para rollback")
+        if previous not in {collection.name for collection in self.chroma_client.list_collections()}:
+            raise ValueError(f"Versão anterior {previous} não existe mais no Chroma")
+
+        entry = {"active": previous, "previous": self.active_name(base), "published_at": time.time()}
+        self._write({**self._aliases, base: entry})
+        return entry
+
+    def status(self, bases: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Versão ativa, anterior e versões existentes de cada base"""
+        self.refresh()
+        return {
+            base: {
+                "active": self.active_name(base),
+                "previous": self.previous_name(base),
+                "versions": self.versions(base),
+                "published_at": self._aliases.get(base, {}).get("published_at"),
+            }
+            for base in bases
+        }
+
+    def _write(self, aliases: Dict[str, Dict[str, Any]]) -> None:
+        self.store.write({"format": ALIASES_FORMAT_VERSION, "aliases": aliases})
+        self._aliases = aliases
+        self._signature = self.store.signature()
+        self.generation += 1
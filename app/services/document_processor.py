@@ -1,6 +1,8 @@
-from typing import List, Dict
-import PyPDF2
-import pandas as pd
+from typing import List, Dict, Iterator, Optional
+
+from app.services.text_chunker import (
+    DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, TextChunker, get_text_chunker, tokens_from_chars
+)
 
 class DocumentProcessor:
 
@@ -21,6 +23,8 @@ class DocumentProcessor:
     @staticmethod
     def process_pdf(file_path: str) -> List[Dict]:
         """Extrai texto de PDF"""
+        import PyPDF2
+
         chunks = []
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
@@ -37,6 +41,8 @@ class DocumentProcessor:
     @staticmethod
     def process_excel(file_path: str) -> List[Dict]:
         """Extrai dados de Excel"""
+        import pandas as pd
+
         chunks = []
         xl_file = pd.ExcelFile(file_path)
 
@@ -63,16 +69,40 @@ class DocumentProcessor:
         return chunks
 
     @staticmethod
-    def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Divide texto em chunks com overlap"""
-        chunks = []
-        start = 0
-        text_length = len(text)
+    def iter_text_chunks(
+        text: str,
+        *,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Gera chunks respeitando títulos, parágrafos e frases (orçamento em tokens).
+        chunk_size/overlap são os nomes antigos, em caracteres (convertidos para tokens).
+        Tudo além do texto é keyword-only: chamadas antigas posicionais, como
+        chunk_text(text, 1000, 200), falham em vez de virar 1000 tokens.
+        """
+        if chunk_size is not None:
+            max_tokens = tokens_from_chars(chunk_size)
+        if overlap is not None:
+            overlap_tokens = min(tokens_from_chars(overlap), max_tokens - 1)
 
-        while start < text_length:
-            end = start + chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start += (chunk_size - overlap)
+        chunker = get_text_chunker()
+        if (max_tokens, overlap_tokens) != (chunker.max_tokens, chunker.overlap_tokens):
+            chunker = TextChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        return chunker.iter_chunks(text)
 
-        return chunks
+    @staticmethod
+    def chunk_text(
+        text: str,
+        *,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None
+    ) -> List[str]:
+        """Divide texto em chunks de até max_tokens, com overlap de frases inteiras"""
+        return list(DocumentProcessor.iter_text_chunks(
+            text, max_tokens=max_tokens, overlap_tokens=overlap_tokens, chunk_size=chunk_size, overlap=overlap
+        ))
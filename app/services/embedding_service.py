@@ -2,14 +2,42 @@
 Embedding Service com suporte a múltiplas collections para RAG Forense.
 """
 from openai import OpenAI
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 from typing import List, Dict, Optional, Any, Union
 from app.core.config import settings
+from app.core.telemetry import span
+from app.core.metrics import LLM_INFLIGHT, record_cache
 from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import TYPED_WHERE, SearchFilters, normalize_metadata
+from app.services.chroma_client import create_chroma_client
+from app.services.collection_registry import ChromaAliasStore, CollectionRegistry
+from app.services.vector_index import LocalVectorIndex, parse_dtype_overrides
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from app.services.mmap_index import mmap_index_directory, write_knowledge_context
+from app.services.usage_tracker import record_usage
 import os
 
 
+# Candidatos extras pedidos ao Chroma quando o recorte é aplicado depois da query
+UNTYPED_FILTER_OVERSAMPLE = 4
+
+
+def trim_results(results: Dict[str, Any], n: int) -> Dict[str, Any]:
+    """Mantém apenas os n primeiros itens de um resultado de busca (já ordenado)"""
+    return {
+        key: values[:n] if isinstance(values, list) else values
+        for key, values in results.items()
+    }
+
+
+def filter_results(results: Dict[str, Any], search_filters: SearchFilters, n: int) -> Dict[str, Any]:
+    """Mantém os n primeiros itens cuja metadata passa pelo recorte (SearchFilters.matches)"""
+    keep = [i for i, metadata in enumerate(results.get("metadatas", [])) if search_filters.matches(metadata)][:n]
+    return {
+        key: [values[i] for i in keep] if isinstance(values, list) else values
+        for key, values in results.items()
+    }
+
+
 class EmbeddingService:
     """Serviço de embeddings com múltiplas collections"""
 
@@ -35,14 +63,13 @@ class EmbeddingService:
     def __init__(self):
         self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = "text-embedding-3-small"
+        self.dimensions = settings.EMBEDDING_DIMENSIONS or None
 
         # Garantir que o diretório existe
         os.makedirs(settings.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
 
-        # Configurar ChromaDB com persistência
-        self.chroma_client = chromadb.PersistentClient(
-            path=settings.CHROMA_PERSIST_DIRECTORY
-        )
+        # ChromaDB embutido ou via HTTP conforme CHROMA_MODE (import pesado, só ao criar o serviço)
+        self.chroma_client = create_chroma_client()
 
         # Collection legada (compatibilidade com código existente)
         self.collection = self.chroma_client.get_or_create_collection(
@@ -50,20 +77,87 @@ class EmbeddingService:
             metadata={"description": "UBS Portfolio Documents (Legacy)"}
         )
 
-        # Inicializar collections forenses
-        self.collections: Dict[ChunkCategory, Any] = {}
-        for category, name in self.COLLECTIONS.items():
-            self.collections[category] = self.chroma_client.get_or_create_collection(
-                name=name,
-                metadata={"hnsw:space": "cosine"}
+        # Collections forenses: versões físicas atrás de um alias (blue/green)
+        # (no modo HTTP o alias fica no próprio Chroma, visível para todas as réplicas)
+        alias_store = None
+        if settings.CHROMA_MODE == "http":
+            alias_store = ChromaAliasStore(self.chroma_client)
+        self.registry = CollectionRegistry(self.chroma_client, settings.CHROMA_PERSIST_DIRECTORY, store=alias_store)
+        self._collections: Dict[ChunkCategory, Any] = {}
+        # Collection física -> se todos os chunks têm a metadata tipada (where exato)
+        self._typed_collections: Dict[str, bool] = {}
+        self._open_active_collections()
+
+        # Versões em construção (re-indexação): escritas vão para elas, queries não
+        self._builds: Dict[ChunkCategory, Any] = {}
+
+        # Índice exato em memória (opcional) - carregado na primeira busca/warm-up
+        # (com MMAP_INDEX, mapeado do layout em disco compartilhado entre workers)
+        self.vector_index: Optional[LocalVectorIndex] = None
+        if settings.LOCAL_VECTOR_INDEX or settings.MMAP_INDEX:
+            self.vector_index = LocalVectorIndex(
+                dtype=settings.LOCAL_VECTOR_INDEX_DTYPE,
+                refresh_seconds=settings.LOCAL_VECTOR_INDEX_REFRESH_SECONDS,
+                dtype_overrides=parse_dtype_overrides(settings.LOCAL_VECTOR_INDEX_DTYPE_OVERRIDES),
+                mmap_directory=mmap_index_directory() if settings.MMAP_INDEX else None
             )
 
+        # Índice lexical BM25 (persistido ao lado do Chroma, construído na ingestão)
+        self.lexical_index = LexicalIndex(
+            settings.CHROMA_PERSIST_DIRECTORY,
+            refresh_seconds=settings.LOCAL_VECTOR_INDEX_REFRESH_SECONDS
+        )
+
+    @property
+    def collections(self) -> Dict[ChunkCategory, Any]:
+        """Collections ativas; segue a troca de alias feita por outro processo (ingestão)"""
+        self.registry.refresh()
+        if self.registry.generation != self._generation:
+            self._open_active_collections()
+        return self._collections
+
+    def _open_active_collections(self) -> None:
+        """Abre as collections apontadas pelos aliases e força a recarga dos índices locais"""
+        self._generation = self.registry.generation
+        self._typed_collections = {}
+        self._collections = {
+            category: self.registry.get_active(name)
+            for category, name in self.COLLECTIONS.items()
+        }
+        # Atributos criados depois da primeira abertura, no __init__
+        if getattr(self, "vector_index", None) is not None:
+            self.vector_index.invalidate()
+        if getattr(self, "lexical_index", None) is not None:
+            self.lexical_index.invalidate()
+
+    def _write_collection(self, category: ChunkCategory) -> Any:
+        """Destino das escritas: a versão em construção, se houver, senão a ativa"""
+        collection = self._builds.get(category) or self.collections[category]
+        self._typed_collections.pop(collection.name, None)
+        return collection
+
+    def _is_typed_collection(self, category: ChunkCategory) -> bool:
+        """Se todos os chunks da collection ativa têm os campos tipados (calculado uma vez por versão)"""
+        collection = self.collections[category]
+        typed = self._typed_collections.get(collection.name)
+        if typed is None:
+            tagged = collection.get(where=TYPED_WHERE, include=[])
+            typed = len(tagged["ids"]) == collection.count()
+            self._typed_collections[collection.name] = typed
+        return typed
+
     def create_embedding(self, text: str) -> List[float]:
         """Cria embedding usando OpenAI"""
-        response = self.openai_client.embeddings.create(
-            model=self.model,
-            input=text
-        )
+        # "dimensions" só é enviado quando configurado (embeddings reduzidos)
+        extra = {"dimensions": self.dimensions} if self.dimensions else {}
+        with span("embedding.create", embedding__chars=len(text)):
+            with LLM_INFLIGHT.track_inprogress(agent="embedding"):
+                response = self.openai_client.embeddings.create(
+                    model=self.model,
+                    input=text,
+                    **extra
+                )
+            record_usage("embedding", self.model, response.usage)
         return response.data[0].embedding
 
     # ============================================================
@@ -112,27 +206,17 @@ class EmbeddingService:
         metadata: Dict[str, Any]
     ) -> None:
         """Adiciona um chunk a uma collection específica"""
-        collection = self.collections[category]
+        collection = self._write_collection(category)
 
         # Criar embedding
         embedding = self.create_embedding(content)
 
-        # Limpar metadata (ChromaDB não aceita None)
-        clean_metadata = {k: v for k, v in metadata.items() if v is not None}
-
-        # Converter listas para strings (ChromaDB limitation)
-        for key, value in clean_metadata.items():
-            if isinstance(value, list):
-                clean_metadata[key] = str(value)
-            elif isinstance(value, dict):
-                clean_metadata[key] = str(value)
-
-        # Adicionar à collection
+        # Adicionar à collection (metadata tipada e filtrável)
         collection.add(
             ids=[chunk_id],
             embeddings=[embedding],
             documents=[content],
-            metadatas=[clean_metadata]
+            metadatas=[normalize_metadata(metadata)]
         )
 
     def add_chunks_batch(
@@ -142,9 +226,7 @@ class EmbeddingService:
         batch_size: int = 50
     ) -> int:
         """Adiciona múltiplos chunks de uma vez"""
-        from datetime import date, datetime
-
-        collection = self.collections[category]
+        collection = self._write_collection(category)
         total_added = 0
 
         # Processar em batches
@@ -160,26 +242,8 @@ class EmbeddingService:
                 ids.append(chunk["chunk_id"])
                 documents.append(chunk["content"])
 
-                # Limpar metadata
-                meta = chunk.get("metadata", {})
-                clean_meta = {}
-
-                for k, v in meta.items():
-                    if v is None:
-                        continue
-                    # Converter datas para string
-                    if isinstance(v, (date, datetime)):
-                        clean_meta[k] = v.isoformat()
-                    # Converter tipos complexos para string
-                    elif isinstance(v, (list, dict)):
-                        clean_meta[k] = str(v)
-                    # Manter tipos primitivos
-                    elif isinstance(v, (str, int, float, bool)):
-                        clean_meta[k] = v
-                    else:
-                        clean_meta[k] = str(v)
-
-                metadatas.append(clean_meta)
+                # Metadata tipada (year_start/year_end, portfolio_type, quarter)
+                metadatas.append(normalize_metadata(chunk.get("metadata", {})))
                 embeddings.append(self.create_embedding(chunk["content"]))
 
             collection.add(
@@ -194,21 +258,64 @@ class EmbeddingService:
 
         return total_added
 
+    def add_embeddings_batch(
+        self,
+        category: ChunkCategory,
+        ids: List[str],
+        embeddings: Any,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        batch_size: int = 500
+    ) -> int:
+        """Adiciona chunks com embeddings já calculados (ex.: artefato de índice), sem chamar a OpenAI"""
+        collection = self._write_collection(category)
+        for i in range(0, len(ids), batch_size):
+            batch_embeddings = embeddings[i:i + batch_size]
+            collection.add(
+                ids=ids[i:i + batch_size],
+                embeddings=batch_embeddings.tolist() if hasattr(batch_embeddings, "tolist") else batch_embeddings,
+                documents=documents[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size] or None
+            )
+        return len(ids)
+
     def search_collection(
         self,
         category: ChunkCategory,
         query: str,
         n_results: int = 5,
         where: Optional[Dict] = None,
+        where_document: Optional[Dict] = None,
+        query_embedding: Optional[List[float]] = None,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[str, Any]:
+        """
+        Busca em uma collection específica.
+        search_filters (período/portfolio/trimestre) restringe os candidatos
+        antes do ranking: máscara no índice em memória ou `where` no Chroma.
+        """
+        # Criar embedding da query (ou reaproveitar um já calculado)
+        if query_embedding is None:
+            query_embedding = self.create_embedding(query)
+
+        # Sem where livre, o índice em memória responde direto
+        if self.vector_index is not None and where is None and where_document is None:
+            snapshot = self.vector_index.ensure_fresh(self.collections)
+            return self.vector_index.search(query_embedding, {category: n_results}, snapshot, search_filters)[category]
+
+        return self._query_chroma_filtered(category, query_embedding, n_results, where, where_document, search_filters)
+
+    def _query_chroma(
+        self,
+        category: ChunkCategory,
+        query_embedding: List[float],
+        n_results: int,
+        where: Optional[Dict] = None,
         where_document: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Busca em uma collection específica"""
+        """Query HNSW do Chroma em uma collection"""
         collection = self.collections[category]
 
-        # Criar embedding da query
-        query_embedding = self.create_embedding(query)
-
-        # Buscar
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results,
@@ -218,31 +325,151 @@ class EmbeddingService:
         )
 
         return {
+            "ids": results["ids"][0] if results["ids"] else [],
             "documents": results["documents"][0] if results["documents"] else [],
             "metadatas": results["metadatas"][0] if results["metadatas"] else [],
             "distances": results["distances"][0] if results["distances"] else []
         }
 
+    def _query_chroma_filtered(
+        self,
+        category: ChunkCategory,
+        query_embedding: List[float],
+        n_results: int,
+        where: Optional[Dict] = None,
+        where_document: Optional[Dict] = None,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[str, Any]:
+        """
+        Query no Chroma restrita a search_filters. Em collections tipadas o
+        recorte vira `where`; nas antigas (sem os campos) o `where` descartaria
+        tudo, então os candidatos são filtrados com a mesma regra dos índices locais.
+        """
+        if search_filters is None or search_filters.is_empty:
+            return self._query_chroma(category, query_embedding, n_results, where, where_document)
+
+        if self._is_typed_collection(category):
+            where = search_filters.merge_where(where)
+            return self._query_chroma(category, query_embedding, n_results, where, where_document)
+
+        results = self._query_chroma(
+            category, query_embedding, n_results * UNTYPED_FILTER_OVERSAMPLE, where, where_document
+        )
+        return filter_results(results, search_filters, n_results)
+
+    def search_categories(
+        self,
+        query: str,
+        n_by_category: Dict[ChunkCategory, int],
+        filters: Optional[Dict[ChunkCategory, Dict]] = None,
+        hybrid: Optional[bool] = None,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[ChunkCategory, Dict[str, Any]]:
+        """
+        Busca em várias categorias com um único embedding da query.
+        Com o índice em memória, todas as categorias sem filtro saem de um só matmul.
+        Com busca híbrida (HYBRID_SEARCH), categorias sem filtro combinam o
+        ranking vetorial com o BM25 por reciprocal rank fusion.
+        search_filters vale para todas as categorias (inclusive no BM25).
+        """
+        if hybrid is None:
+            hybrid = settings.HYBRID_SEARCH
+
+        with span("search.categories", search__categories=len(n_by_category), search__hybrid=hybrid,
+                  search__filtered=search_filters is not None) as current:
+            results = self._vector_search_categories(query, n_by_category, filters, search_filters)
+
+            if hybrid:
+                unfiltered = {c: n for c, n in n_by_category.items() if not (filters or {}).get(c)}
+                lexical = self.lexical_search(query, unfiltered, search_filters)
+                for category, n_results in unfiltered.items():
+                    results[category] = reciprocal_rank_fusion(
+                        [results[category], lexical[category]], n_results
+                    )
+
+            current.set_attribute("search.documents", sum(len(r.get("ids", [])) for r in results.values()))
+        return results
+
+    def lexical_search(
+        self,
+        query: str,
+        n_by_category: Dict[ChunkCategory, int],
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[ChunkCategory, Dict[str, Any]]:
+        """Busca BM25 por categoria (sem chamadas de API)"""
+        with span("search.lexical", search__categories=len(n_by_category)):
+            self.lexical_index.ensure_fresh(self.collections)
+            return self.lexical_index.search(query, n_by_category, search_filters)
+
+    def rebuild_lexical_index(self) -> int:
+        """Reconstrói e persiste o índice BM25 a partir do texto no Chroma (usado na ingestão)"""
+        self.lexical_index.build(self.collections)
+        self.lexical_index.save()
+        return self.lexical_index.size
+
+    def write_mmap_index(self) -> Optional[Dict[str, Any]]:
+        """
+        Grava o layout memory-mapped das collections ativas e o contexto fixo
+        da KnowledgeBase (usado na ingestão). None se MMAP_INDEX estiver desligado.
+        """
+        if self.vector_index is None or not self.vector_index.mmap_directory:
+            return None
+
+        from app.services.knowledge_base import KnowledgeBase
+
+        snapshot = self.vector_index.map_shared(self.collections)
+        write_knowledge_context(self.vector_index.mmap_directory, KnowledgeBase.build_fixed_context())
+        return {"vectors": snapshot.size, "bytes": snapshot.nbytes, "directory": self.vector_index.mmap_directory}
+
+    def _vector_search_categories(
+        self,
+        query: str,
+        n_by_category: Dict[ChunkCategory, int],
+        filters: Optional[Dict[ChunkCategory, Dict]] = None,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[ChunkCategory, Dict[str, Any]]:
+        """Busca vetorial em várias categorias com um único embedding"""
+        query_embedding = self.create_embedding(query)
+        filters = filters or {}
+        results: Dict[ChunkCategory, Dict[str, Any]] = {}
+
+        unfiltered = {c: n for c, n in n_by_category.items() if filters.get(c) is None}
+        if self.vector_index is not None and unfiltered:
+            with span("search.vector_index", search__categories=len(unfiltered)) as current:
+                previous = self.vector_index.snapshot
+                snapshot = self.vector_index.ensure_fresh(self.collections)
+                current.set_attribute("index.cache_hit", snapshot is previous)
+                record_cache("vector_index", snapshot is previous)
+                current.set_attribute("index.vectors", snapshot.size)
+                results.update(self.vector_index.search(query_embedding, unfiltered, snapshot, search_filters))
+
+        remaining = [category for category in n_by_category if category not in results]
+        if remaining:
+            with span("search.chroma", search__categories=len(remaining)):
+                for category in remaining:
+                    results[category] = self._query_chroma_filtered(
+                        category, query_embedding, n_by_category[category],
+                        where=filters.get(category), search_filters=search_filters
+                    )
+
+        # Manter a ordem pedida
+        return {category: results[category] for category in n_by_category}
+
     def search_multiple_collections(
         self,
         query: str,
         categories: List[ChunkCategory],
         n_results_per_collection: int = 3,
-        filters: Optional[Dict[ChunkCategory, Dict]] = None
+        filters: Optional[Dict[ChunkCategory, Dict]] = None,
+        search_filters: Optional[SearchFilters] = None
     ) -> Dict[ChunkCategory, Dict[str, Any]]:
         """Busca em múltiplas collections simultaneamente"""
-        results = {}
-
-        for category in categories:
-            where_filter = filters.get(category) if filters else None
-            results[category] = self.search_collection(
-                category=category,
-                query=query,
-                n_results=n_results_per_collection,
-                where=where_filter
-            )
-
-        return results
+        return self.search_categories(
+            query=query,
+            n_by_category={category: n_results_per_collection for category in categories},
+            filters=filters,
+            search_filters=search_filters
+        )
 
     def search_all(
         self,
@@ -261,42 +488,32 @@ class EmbeddingService:
         query: str,
         n_primary: int = 10,
         n_secondary: int = 3,
-        secondary_categories: List[ChunkCategory] = None
+        secondary_categories: List[ChunkCategory] = None,
+        search_filters: Optional[SearchFilters] = None
     ) -> Dict[ChunkCategory, Dict[str, Any]]:
         """
         Busca hierárquica: primeiro na fonte principal, depois nas secundárias.
         SEMPRE prioriza COMPLETE_ANALYSIS.
         """
-        results = {}
-
-        # 1. SEMPRE buscar primeiro em COMPLETE_ANALYSIS (prioridade máxima)
-        primary_results = self.search_collection(
-            category=self.PRIMARY_COLLECTION,
-            query=query,
-            n_results=n_primary
-        )
-        results[self.PRIMARY_COLLECTION] = primary_results
-
-        # 2. Se encontrou resultados relevantes na fonte principal, usar menos da secundária
-        primary_has_results = len(primary_results.get("documents", [])) > 0
-
-        # 3. Buscar em collections secundárias
         if secondary_categories is None:
             secondary_categories = [
                 ChunkCategory.FACTS,
                 ChunkCategory.FORENSIC,
             ]
+        secondary_categories = [c for c in secondary_categories if c != self.PRIMARY_COLLECTION]
+
+        # 1. SEMPRE buscar em COMPLETE_ANALYSIS (prioridade máxima) - tudo com um embedding só
+        n_by_category = {self.PRIMARY_COLLECTION: n_primary}
+        n_by_category.update({category: n_secondary for category in secondary_categories})
+        results = self.search_categories(query, n_by_category, search_filters=search_filters)
 
-        # Ajustar quantidade baseado na qualidade da busca primária
+        # 2. Se encontrou resultados relevantes na fonte principal, usar menos da secundária
+        primary_has_results = len(results[self.PRIMARY_COLLECTION].get("documents", [])) > 0
         adjusted_n = n_secondary if not primary_has_results else max(1, n_secondary // 2)
 
+        # 3. Resultados já vêm ordenados: basta cortar as secundárias
         for category in secondary_categories:
-            if category != self.PRIMARY_COLLECTION:
-                results[category] = self.search_collection(
-                    category=category,
-                    query=query,
-                    n_results=adjusted_n
-                )
+            results[category] = trim_results(results[category], adjusted_n)
 
         return results
 
@@ -313,19 +530,112 @@ class EmbeddingService:
 
         return stats
 
+    def warm_up_indexes(self) -> Dict[str, int]:
+        """
+        Carrega os índices HNSW em memória com uma query por collection.
+        Usa um embedding já armazenado como query (sem chamar a OpenAI).
+        Retorna {collection: número de documentos} das collections aquecidas.
+        """
+        warmed = {}
+
+        for category, collection in self.collections.items():
+            count = collection.count()
+            if count == 0:
+                continue
+
+            sample = collection.peek(limit=1)
+            embeddings = sample.get("embeddings")
+            if embeddings is None or len(embeddings) == 0:
+                continue
+
+            collection.query(query_embeddings=[list(embeddings[0])], n_results=1)
+            warmed[self.COLLECTIONS[category]] = count
+
+        return warmed
+
+    # ============================================================
+    # RE-INDEXAÇÃO BLUE/GREEN
+    # ============================================================
+
+    def begin_rebuild(self, category: ChunkCategory) -> str:
+        """
+        Cria a próxima versão da collection ao lado da ativa. Até o
+        publish_rebuild, add_chunk/add_chunks_batch escrevem nela e as queries
+        continuam na versão ativa. Retorna o nome da nova versão.
+        """
+        if category in self._builds:
+            self.discard_rebuild(category)
+        self._builds[category] = self.registry.begin_build(self.COLLECTIONS[category])
+        return self._builds[category].name
+
+    def discard_rebuild(self, category: ChunkCategory) -> None:
+        """Abandona a versão em construção (a ativa não muda)"""
+        build = self._builds.pop(category, None)
+        if build is not None:
+            self.registry.discard_build(build.name)
+
+    def publish_rebuild(
+        self,
+        category: ChunkCategory,
+        min_ratio: float = 0.5,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Valida a versão em construção e troca o alias para ela.
+        Validação: não vazia, responde a uma query e (sem force) tem pelo menos
+        min_ratio dos documentos da versão ativa. Se falhar, a versão nova é
+        descartada, a ativa continua servindo e um ValueError é levantado.
+        """
+        build = self._builds.get(category)
+        if build is None:
+            raise ValueError(f"Nenhuma re-indexação em andamento para {category.value}")
+
+        count = build.count()
+        active_count = self.collections[category].count()
+        problem = None
+        if count == 0:
+            problem = "versão nova está vazia"
+        elif not force and count < active_count * min_ratio:
+            problem = f"versão nova tem {count} documentos, ativa tem {active_count} (mínimo {min_ratio:.0%})"
+        else:
+            sample = build.peek(limit=1).get("embeddings")
+            try:
+                build.query(query_embeddings=[list(sample[0])], n_results=1)
+            except Exception as e:
+                problem = f"query de validação falhou: {e}"
+
+        if problem:
+            self.discard_rebuild(category)
+            raise ValueError(f"{category.value}: {problem}")
+
+        entry = self.registry.publish(self.COLLECTIONS[category], build.name)
+        del self._builds[category]
+        self._open_active_collections()
+        return {"count": count, **entry}
+
+    def rollback_collection(self, category: ChunkCategory) -> Dict[str, Any]:
+        """Volta o alias da categoria para a versão anterior (instantâneo)"""
+        entry = self.registry.rollback(self.COLLECTIONS[category])
+        self._open_active_collections()
+        return entry
+
+    def get_collection_versions(self) -> Dict[str, Dict[str, Any]]:
+        """Versão ativa, anterior e versões existentes de cada categoria"""
+        return self.registry.status(list(self.COLLECTIONS.values()))
+
     def delete_collection(self, category: ChunkCategory) -> None:
-        """Deleta uma collection (para reprocessamento)"""
-        collection_name = self.COLLECTIONS[category]
+        """Deleta a collection ativa e a recria vazia (queries veem a collection vazia; prefira begin_rebuild)"""
+        collection_name = self.registry.active_name(self.COLLECTIONS[category])
         self.chroma_client.delete_collection(collection_name)
 
         # Recriar vazia
-        self.collections[category] = self.chroma_client.get_or_create_collection(
+        self._collections[category] = self.chroma_client.get_or_create_collection(
             name=collection_name,
             metadata={"hnsw:space": "cosine"}
         )
 
     def clear_collection(self, category: ChunkCategory) -> None:
-        """Limpa todos os documentos de uma collection"""
+        """Limpa todos os documentos da collection ativa (prefira begin_rebuild)"""
         collection = self.collections[category]
         # Pegar todos os IDs
         all_ids = collection.get()["ids"]
@@ -0,0 +1,243 @@
+"""
+Artefato pré-construído do índice (export/import das collections).
+
+Um único .zip comprimido com todas as collections ativas:
+
+    manifest.json                   formato, modelo, dimensão, versão do corpus,
+                                    contagem e sha256 de cada arquivo
+    <categoria>/embeddings.npy      float32 (n, D)
+    <categoria>/records.json        ids, documents, metadatas
+
+O import verifica os checksums e carrega os vetores já prontos em novas
+versões das collections (blue/green, ver CollectionRegistry), sem nenhuma
+chamada de embedding. Um marcador em <CHROMA_PERSIST_DIRECTORY> guarda o
+sha256 do último artefato importado, então reiniciar a instância não
+reimporta o mesmo arquivo.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.models.chunks import ChunkCategory
+from app.services.mmap_index import layout_lock
+from app.services.vector_index import collections_version
+
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+IMPORT_MARKER = "index_artifact.json"
+IMPORT_LOCK = "index_artifact.lock"
+DEFAULT_MODEL_DIMENSIONS = 1536  # text-embedding-3-small sem `dimensions`
+
+
+class ArtifactError(ValueError):
+    """Artefato inválido, corrompido ou incompatível com a configuração atual"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_artifact(embedding_service: Any, output_path: str) -> Dict[str, Any]:
+    """Empacota todas as collections ativas em um .zip; retorna o manifest"""
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    collections = embedding_service.collections
+    manifest: Dict[str, Any] = {
+        "format": ARTIFACT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "model": embedding_service.model,
+        "dimensions": None,
+        "corpus_version": [list(item) for item in collections_version(collections)],
+        "categories": {},
+        "files": {},
+    }
+
+    tmp_path = output.with_suffix(output.suffix + ".tmp")
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for category, collection in collections.items():
+            data = collection.get(include=["embeddings", "documents", "metadatas"])
+            embeddings = np.asarray(data["embeddings"] if data["ids"] else [], dtype=np.float32)
+            if embeddings.ndim == 2:
+                manifest["dimensions"] = manifest["dimensions"] or int(embeddings.shape[1])
+
+            buffer = io.BytesIO()
+            np.save(buffer, embeddings, allow_pickle=False)
+            records = json.dumps({
+                "collection": collection.name,
+                "ids": data["ids"],
+                "documents": data["documents"] or [],
+                "metadatas": data["metadatas"] or [],
+            }, ensure_ascii=False).encode("utf-8")
+
+            for name, payload in (
+                (f"{category.value}/embeddings.npy", buffer.getvalue()),
+                (f"{category.value}/records.json", records),
+            ):
+                archive.writestr(name, payload)
+                manifest["files"][name] = _sha256(payload)
+
+            manifest["categories"][category.value] = len(data["ids"])
+
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    os.replace(tmp_path, output)
+    manifest["sha256"] = file_sha256(output)
+    return manifest
+
+
+def read_artifact(path: str, verify: bool = True) -> Dict[str, Any]:
+    """
+    Lê o artefato: {"manifest": ..., "categories": {categoria: {ids, embeddings,
+    documents, metadatas}}}. Com verify, confere o sha256 de cada arquivo.
+    """
+    with zipfile.ZipFile(path) as archive:
+        try:
+            manifest = json.loads(archive.read(MANIFEST_NAME))
+        except KeyError:
+            raise ArtifactError(f"{path}: manifest.json ausente")
+        if manifest.get("format") != ARTIFACT_FORMAT_VERSION:
+            raise ArtifactError(f"{path}: formato {manifest.get('format')} não suportado")
+
+        files = {}
+        for name, expected in manifest["files"].items():
+            payload = archive.read(name)
+            if verify and _sha256(payload) != expected:
+                raise ArtifactError(f"{path}: checksum inválido em {name}")
+            files[name] = payload
+
+    categories = {}
+    for value in manifest["categories"]:
+        records = json.loads(files[f"{value}/records.json"])
+        embeddings = np.load(io.BytesIO(files[f"{value}/embeddings.npy"]), allow_pickle=False)
+        categories[ChunkCategory(value)] = {
+            "ids": records["ids"],
+            "embeddings": embeddings,
+            "documents": records["documents"],
+            "metadatas": records["metadatas"],
+        }
+
+    return {"manifest": manifest, "categories": categories}
+
+
+def check_compatible(manifest: Dict[str, Any], embedding_service: Any) -> None:
+    """A dimensão do artefato precisa ser a mesma das queries desta instância"""
+    if manifest.get("model") != embedding_service.model:
+        raise ArtifactError(f"Artefato gerado com {manifest.get('model')}, serviço usa {embedding_service.model}")
+    expected = embedding_service.dimensions or DEFAULT_MODEL_DIMENSIONS
+    if manifest.get("dimensions") not in (None, expected):
+        raise ArtifactError(
+            f"Artefato tem {manifest['dimensions']} dimensões, EMBEDDING_DIMENSIONS espera {expected}"
+        )
+
+
+def imported_sha256(persist_directory: str) -> Optional[str]:
+    """sha256 do último artefato importado neste diretório do Chroma"""
+    marker = Path(persist_directory) / IMPORT_MARKER
+    try:
+        return json.loads(marker.read_text(encoding="utf-8")).get("sha256")
+    except (OSError, ValueError):
+        return None
+
+
+def import_artifact(
+    embedding_service: Any,
+    path: str,
+    persist_directory: str,
+    force: bool = False,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """
+    Carrega o artefato nas collections (novas versões + troca de alias).
+    Não faz nada se o mesmo artefato já foi importado (a menos que force).
+    Retorna {"imported": bool, "sha256", "categories": {categoria: count}, "ms"}.
+    """
+    # Vários workers sobem juntos: um importa, os outros esperam e veem o marcador
+    with layout_lock(persist_directory, IMPORT_LOCK):
+        return _import_artifact(embedding_service, path, persist_directory, force, batch_size)
+
+
+def _import_artifact(
+    embedding_service: Any,
+    path: str,
+    persist_directory: str,
+    force: bool,
+    batch_size: int
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    sha256 = file_sha256(Path(path))
+    if not force and imported_sha256(persist_directory) == sha256:
+        return {"imported": False, "sha256": sha256, "categories": {}, "ms": 0.0}
+
+    artifact = read_artifact(path)
+    check_compatible(artifact["manifest"], embedding_service)
+
+    counts = {}
+    for category, items in artifact["categories"].items():
+        embedding_service.begin_rebuild(category)
+        try:
+            embedding_service.add_embeddings_batch(
+                category,
+                ids=items["ids"],
+                embeddings=items["embeddings"],
+                documents=items["documents"],
+                metadatas=items["metadatas"],
+                batch_size=batch_size
+            )
+        except BaseException:
+            embedding_service.discard_rebuild(category)
+            raise
+
+        if items["ids"]:
+            # O artefato é a fonte da verdade: publica mesmo se for menor que a versão ativa
+            embedding_service.publish_rebuild(category, force=True)
+        else:
+            embedding_service.discard_rebuild(category)
+        counts[category.value] = len(items["ids"])
+
+    marker = Path(persist_directory) / IMPORT_MARKER
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = marker.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({
+        "sha256": sha256,
+        "path": str(path),
+        "imported_at": time.time(),
+        "corpus_version": artifact["manifest"].get("corpus_version"),
+    }, indent=2), encoding="utf-8")
+    os.replace(tmp_path, marker)
+
+    # Índice em memória montado direto dos vetores do artefato (sem reler o
+    # Chroma) quando o artefato cobre todas as categorias
+    vector_index = embedding_service.vector_index
+    collections = embedding_service.collections
+    if vector_index is not None and all(counts.get(category.value) for category in collections):
+        vector_index.build(
+            {category: artifact["categories"][category] for category in collections},
+            collections_version(collections),
+            {category: vector_index.dtype_for(category, c.name) for category, c in collections.items()}
+        )
+        # Com MMAP_INDEX, grava o layout para os outros workers só mapearem
+        vector_index.share()
+
+    return {
+        "imported": True,
+        "sha256": sha256,
+        "categories": counts,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
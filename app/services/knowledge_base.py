@@ -6,6 +6,9 @@ import json
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+from app.core.config import settings
+from app.core.metrics import record_cache
+
 
 class KnowledgeBase:
     """Base de conhecimento com dados fixos dos portfolios"""
@@ -49,9 +52,26 @@ class KnowledgeBase:
         Retorna o contexto fixo que SEMPRE deve ser incluído nas respostas.
         Contém os dados principais dos dois portfolios.
         """
+        record_cache("knowledge_context", bool(cls._context_cache))
         if cls._context_cache:
             return cls._context_cache
 
+        # Com MMAP_INDEX, a ingestão já grava o contexto montado: cada worker
+        # só lê o texto, sem carregar os JSONs dos portfolios
+        if settings.MMAP_INDEX:
+            from app.services.mmap_index import mmap_index_directory, read_knowledge_context
+
+            prebuilt = read_knowledge_context(mmap_index_directory())
+            if prebuilt:
+                cls._context_cache = prebuilt
+                return cls._context_cache
+
+        cls._context_cache = cls.build_fixed_context()
+        return cls._context_cache
+
+    @classmethod
+    def build_fixed_context(cls) -> str:
+        """Monta o contexto fixo a partir dos JSONs de data/raw/forensic"""
         # Carregar se ainda não carregou
         if cls._portfolio_01 is None:
             cls.load_portfolios()
@@ -572,8 +592,7 @@ TENDÊNCIAS OBSERVADAS:
 4. Real Estate problemático - entrou em 2005, congelou em 2008
 """)
 
-        cls._context_cache = "\n".join(context_parts)
-        return cls._context_cache
+        return "\n".join(context_parts)
 
     @classmethod
     def get_portfolio_01_withdrawals(cls) -> Dict[str, float]:
@@ -611,8 +630,3 @@ TENDÊNCIAS OBSERVADAS:
             "2015": 3.9,
             "2016": 1.0,
         }
-
-
-# Carregar na inicialização
-print("Carregando Knowledge Base...")
-KnowledgeBase.load_portfolios()
@@ -0,0 +1,310 @@
+"""
+Índice lexical BM25 sobre o texto dos chunks (busca híbrida).
+
+Embeddings perdem tokens exatos como ISINs, nomes de fundos ("Global Property
+Fund"), anos e valores ("256.4"). Este índice invertido BM25 é construído na
+ingestão, persistido ao lado do Chroma e consultado junto com a busca vetorial;
+os dois rankings são combinados com reciprocal rank fusion (RRF).
+"""
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import FilterColumns, SearchFilters
+from app.services.mmap_index import layout_lock
+from app.services.vector_index import collections_version
+
+
+INDEX_FILENAME = "lexical_index.json"
+LOCK_FILENAME = ".lexical_index.lock"
+INDEX_FORMAT_VERSION = 1
+
+# Números (256.4, 1.234,56, 2008), códigos alfanuméricos (LU0123456789) e palavras
+TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*|\w+")
+
+STOPWORDS = {
+    # português
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "um", "uma", "para", "por", "com", "que", "se", "ao", "aos",
+    "foi", "ser", "meu", "minha", "qual", "quais", "quanto", "como",
+    # inglês
+    "the", "of", "and", "in", "to", "for", "on", "is", "was", "by", "with", "at",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos, sem stopwords; números mantidos como um token só"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return [token for token in TOKEN_RE.findall(normalized) if token not in STOPWORDS]
+
+
+class _CategoryIndex:
+    """Postings de uma categoria: termo -> (índices dos docs, frequências)"""
+
+    def __init__(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        doc_len: np.ndarray
+    ):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.postings = postings
+        self.doc_len = doc_len
+        self.columns = FilterColumns.from_metadatas(metadatas)
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    @classmethod
+    def build(cls, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> "_CategoryIndex":
+        term_docs: Dict[str, Dict[int, int]] = {}
+        doc_len = np.zeros(len(ids), dtype=np.float32)
+
+        for doc_idx, text in enumerate(documents):
+            tokens = tokenize(text or "")
+            doc_len[doc_idx] = len(tokens)
+            for token in tokens:
+                counts = term_docs.setdefault(token, {})
+                counts[doc_idx] = counts.get(doc_idx, 0) + 1
+
+        postings = {
+            term: (np.fromiter(counts.keys(), dtype=np.int32), np.fromiter(counts.values(), dtype=np.float32))
+            for term, counts in term_docs.items()
+        }
+        return cls(ids, documents, metadatas, postings, doc_len)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {
+                term: [docs.tolist(), tfs.astype(int).tolist()]
+                for term, (docs, tfs) in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_CategoryIndex":
+        postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (docs, tfs) in data["postings"].items()
+        }
+        return cls(data["ids"], data["documents"], data["metadatas"], postings, np.asarray(data["doc_len"], dtype=np.float32))
+
+    def search(
+        self,
+        query_terms: List[str],
+        n_results: int,
+        k1: float,
+        b: float,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[str, Any]:
+        n_docs = len(self.ids)
+        if n_docs == 0 or n_results <= 0:
+            return _empty_result()
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        norm = k1 * (1 - b + b * self.doc_len / (self.avgdl or 1.0))
+
+        for term in set(query_terms):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (k1 + 1) / (tfs + norm[docs])
+
+        if search_filters is not None:
+            scores[~search_filters.mask(self.columns)] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return _empty_result()
+
+        k = min(n_results, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]] if k < len(matched) else matched
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return {
+            "ids": [self.ids[i] for i in top],
+            "documents": [self.documents[i] for i in top],
+            "metadatas": [self.metadatas[i] for i in top],
+            "scores": [float(scores[i]) for i in top],
+        }
+
+
+class LexicalIndex:
+    """BM25 por categoria, persistido em <CHROMA_PERSIST_DIRECTORY>/lexical_index.json"""
+
+    def __init__(
+        self,
+        persist_directory: str,
+        k1: float = 1.5,
+        b: float = 0.75,
+        refresh_seconds: float = 30.0
+    ):
+        self.path = Path(persist_directory) / INDEX_FILENAME
+        self.k1 = k1
+        self.b = b
+        self.refresh_seconds = refresh_seconds
+        self.version: Tuple = ()
+        self._categories: Dict[ChunkCategory, _CategoryIndex] = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def size(self) -> int:
+        return sum(len(index.ids) for index in self._categories.values())
+
+    def build(self, collections: Dict[ChunkCategory, Any], version: Optional[Tuple] = None) -> None:
+        """Lê o texto de todas as collections do Chroma e (re)constrói o índice"""
+        version = version or collections_version(collections)
+        categories = {}
+        for category, collection in collections.items():
+            data = collection.get(include=["documents", "metadatas"])
+            categories[category] = _CategoryIndex.build(
+                data["ids"], data["documents"] or [], data["metadatas"] or []
+            )
+        self._categories = categories
+        self.version = version
+
+    def save(self) -> None:
+        """Grava de forma atômica (tmp próprio do processo + rename)"""
+        payload = {
+            "format": INDEX_FORMAT_VERSION,
+            "version": [list(item) for item in self.version],
+            "categories": {category.value: index.to_dict() for category, index in self._categories.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Nome único: workers salvando ao mesmo tempo não escrevem no mesmo tmp
+        tmp_file = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.path.parent, prefix=f"{self.path.stem}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp_file:
+                json.dump(payload, tmp_file, ensure_ascii=False)
+            os.replace(tmp_file.name, self.path)
+        except BaseException:
+            Path(tmp_file.name).unlink(missing_ok=True)
+            raise
+
+    def load(self) -> bool:
+        """Carrega do disco; retorna False se não existir ou for de outro formato"""
+        if not self.path.exists():
+            return False
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Índice lexical ignorado ({e})")
+            return False
+        if payload.get("format") != INDEX_FORMAT_VERSION:
+            return False
+
+        self._categories = {
+            ChunkCategory(value): _CategoryIndex.from_dict(data)
+            for value, data in payload["categories"].items()
+        }
+        self.version = tuple(tuple(item) for item in payload.get("version", []))
+        return True
+
+    def ensure_fresh(self, collections: Dict[ChunkCategory, Any]) -> None:
+        """
+        Garante que o índice corresponde à versão atual das collections
+        (verificada no máximo a cada refresh_seconds): carrega do disco e, se
+        estiver desatualizado, reconstrói e salva (só texto do Chroma, nenhuma
+        chamada de API).
+        """
+        if self._categories and time.monotonic() - self._last_check < self.refresh_seconds:
+            return
+
+        with self._lock:
+            if self._categories and time.monotonic() - self._last_check < self.refresh_seconds:
+                return
+
+            version = collections_version(collections)
+            if not (self._categories and self.version == version):
+                if not (self.load() and self.version == version):
+                    # Entre workers: um reconstrói, os outros esperam o lock e carregam o arquivo salvo
+                    with layout_lock(str(self.path.parent), LOCK_FILENAME):
+                        if not (self.load() and self.version == version):
+                            self.build(collections, version)
+                            self.save()
+            self._last_check = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Força a verificação de versão na próxima busca"""
+        self._last_check = 0.0
+
+    def search(
+        self,
+        query: str,
+        n_by_category: Dict[ChunkCategory, int],
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[ChunkCategory, Dict[str, Any]]:
+        """Top-n BM25 por categoria (opcionalmente só entre os chunks do recorte)"""
+        terms = tokenize(query)
+        results = {}
+        for category, n_results in n_by_category.items():
+            index = self._categories.get(category)
+            results[category] = (
+                index.search(terms, n_results, self.k1, self.b, search_filters)
+                if index and terms else _empty_result()
+            )
+        return results
+
+
+def reciprocal_rank_fusion(
+    rankings: List[Dict[str, Any]],
+    n_results: int,
+    k: int = 60
+) -> Dict[str, Any]:
+    """
+    Combina rankings (formato de search_collection, com "ids") por RRF:
+    score(doc) = soma de 1 / (k + posição). O primeiro ranking que trouxer o
+    documento fornece texto, metadata e distance.
+    """
+    scores: Dict[str, float] = {}
+    items: Dict[str, Tuple[str, Dict[str, Any], Optional[float]]] = {}
+
+    for ranking in rankings:
+        ids = ranking.get("ids", [])
+        documents = ranking.get("documents", [])
+        metadatas = ranking.get("metadatas", [])
+        distances = ranking.get("distances", [])
+
+        for rank, doc_id in enumerate(ids):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+            if doc_id not in items:
+                items[doc_id] = (
+                    documents[rank] if rank < len(documents) else "",
+                    metadatas[rank] if rank < len(metadatas) else {},
+                    distances[rank] if rank < len(distances) else None,
+                )
+
+    ordered = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)[:n_results]
+    return {
+        "ids": ordered,
+        "documents": [items[doc_id][0] for doc_id in ordered],
+        "metadatas": [items[doc_id][1] for doc_id in ordered],
+        "distances": [items[doc_id][2] for doc_id in ordered],
+        "rrf_scores": [scores[doc_id] for doc_id in ordered],
+    }
+
+
+def _empty_result() -> Dict[str, Any]:
+    return {"ids": [], "documents": [], "metadatas": [], "scores": []}
@@ -0,0 +1,228 @@
+"""
+Layout em disco do índice vetorial para memory-map (compartilhado entre workers).
+
+Gerado na ingestão a partir de um IndexSnapshot:
+
+    <raiz>/CURRENT                  nome da versão ativa (troca atômica)
+    <raiz>/knowledge_context.txt    contexto fixo da KnowledgeBase já montado
+    <raiz>/<versão>/manifest.json   versão do corpus, categorias, segmentos
+    <raiz>/<versão>/segment_<dtype>.npy, scales_int8.npy
+    <raiz>/<versão>/{ids,documents,metadatas}.bin + *_offsets.npy
+    <raiz>/<versão>/col_<campo>.npy colunas de filtro (SearchFilters)
+
+Cada worker do uvicorn abre os .npy com mmap_mode="r": as páginas ficam no
+page cache do SO e são compartilhadas, então mais workers quase não custam
+RAM e o "load" do índice é instantâneo. Textos e metadata só são
+decodificados para as linhas que saem no top-k.
+"""
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+from app.core.config import settings
+from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import FilterColumns
+from app.services.vector_index import IndexSegment, IndexSnapshot
+
+
+LAYOUT_FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+KNOWLEDGE_CONTEXT_FILE = "knowledge_context.txt"
+MANIFEST_NAME = "manifest.json"
+LOCK_FILE = ".lock"
+
+
+def mmap_index_directory() -> str:
+    """Raiz do layout (MMAP_INDEX_DIRECTORY ou <CHROMA_PERSIST_DIRECTORY>/mmap_index)"""
+    return settings.MMAP_INDEX_DIRECTORY or os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "mmap_index")
+
+
+@contextmanager
+def layout_lock(root: str, name: str = LOCK_FILE):
+    """Lock exclusivo entre processos (workers) para gravar/importar o layout"""
+    Path(root).mkdir(parents=True, exist_ok=True)
+    with open(Path(root) / name, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MappedStrings(Sequence):
+    """Sequência de strings sobre um buffer UTF-8 mapeado + offsets (decodifica sob demanda)"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, decode: Optional[Callable[[str], Any]] = None):
+        self._data = data
+        self._offsets = offsets
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        text = self._data[start:end].tobytes().decode("utf-8")
+        return self._decode(text) if self._decode else text
+
+
+def _write_strings(directory: Path, name: str, values: Sequence[str]) -> None:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    with open(directory / f"{name}.bin", "wb") as f:
+        for item in encoded:
+            f.write(item)
+    np.save(directory / f"{name}_offsets.npy", offsets)
+
+
+def _map_strings(directory: Path, name: str, decode: Optional[Callable[[str], Any]] = None) -> MappedStrings:
+    offsets = np.load(directory / f"{name}_offsets.npy", mmap_mode="r")
+    path = directory / f"{name}.bin"
+    # np.memmap não aceita arquivo vazio
+    data = np.memmap(path, dtype=np.uint8, mode="r") if path.stat().st_size else np.zeros(0, dtype=np.uint8)
+    return MappedStrings(data, offsets, decode)
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def write_layout(snapshot: IndexSnapshot, root: str, keep: int = 2) -> Path:
+    """
+    Grava o snapshot em uma versão nova e aponta CURRENT para ela.
+    Mantém as `keep` versões mais recentes (workers podem ainda mapear a anterior).
+    """
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    name = f"v{time.time_ns()}"
+    tmp_dir = root_path / f".{name}.tmp"
+    tmp_dir.mkdir()
+
+    for dtype, segment in snapshot.segments.items():
+        np.save(tmp_dir / f"segment_{dtype}.npy", segment.matrix)
+        if segment.scales is not None:
+            np.save(tmp_dir / f"scales_{dtype}.npy", segment.scales)
+
+    _write_strings(tmp_dir, "ids", snapshot.ids)
+    _write_strings(tmp_dir, "documents", snapshot.documents)
+    _write_strings(tmp_dir, "metadatas", [json.dumps(m, ensure_ascii=False) for m in snapshot.metadatas])
+
+    columns = snapshot.columns
+    np.save(tmp_dir / "col_year_start.npy", columns.year_start)
+    np.save(tmp_dir / "col_year_end.npy", columns.year_end)
+    np.save(tmp_dir / "col_quarter.npy", columns.quarter)
+    np.save(tmp_dir / "col_portfolio_type.npy", columns.portfolio_type.astype("U8"))
+
+    manifest = {
+        "format": LAYOUT_FORMAT_VERSION,
+        "version": [list(item) for item in snapshot.version],
+        "segments": sorted(snapshot.segments),
+        "locations": {category.value: list(location) for category, location in snapshot.locations.items()},
+        "size": snapshot.size,
+    }
+    (tmp_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    version_dir = root_path / name
+    os.rename(tmp_dir, version_dir)
+    _write_text_atomic(root_path / CURRENT_FILE, name)
+
+    versions = sorted(p for p in root_path.iterdir() if p.is_dir() and p.name.startswith("v"))
+    for old in versions[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    return version_dir
+
+
+def write_knowledge_context(root: str, text: str) -> Path:
+    """Grava o contexto fixo da KnowledgeBase ao lado do layout"""
+    path = Path(root) / KNOWLEDGE_CONTEXT_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write_text_atomic(path, text)
+    return path
+
+
+def current_version_dir(root: str) -> Optional[Path]:
+    try:
+        name = (Path(root) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    version_dir = Path(root) / name
+    return version_dir if (version_dir / MANIFEST_NAME).exists() else None
+
+
+def read_manifest(root: str) -> Optional[Dict[str, Any]]:
+    version_dir = current_version_dir(root)
+    if version_dir is None:
+        return None
+    manifest = json.loads((version_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    return manifest if manifest.get("format") == LAYOUT_FORMAT_VERSION else None
+
+
+def map_layout(root: str, expected_version: Optional[Tuple] = None) -> Optional[IndexSnapshot]:
+    """
+    Mapeia a versão CURRENT como IndexSnapshot somente leitura.
+    Retorna None se não houver layout ou se a versão do corpus for outra.
+    """
+    version_dir = current_version_dir(root)
+    manifest = read_manifest(root)
+    if version_dir is None or manifest is None:
+        return None
+
+    version = tuple(tuple(item) for item in manifest["version"])
+    if expected_version is not None and version != tuple(expected_version):
+        return None
+
+    segments = {}
+    for dtype in manifest["segments"]:
+        scales_path = version_dir / f"scales_{dtype}.npy"
+        segments[dtype] = IndexSegment(
+            dtype=dtype,
+            matrix=np.load(version_dir / f"segment_{dtype}.npy", mmap_mode="r"),
+            scales=np.load(scales_path, mmap_mode="r") if scales_path.exists() else None,
+        )
+
+    columns = FilterColumns(
+        year_start=np.load(version_dir / "col_year_start.npy", mmap_mode="r"),
+        year_end=np.load(version_dir / "col_year_end.npy", mmap_mode="r"),
+        portfolio_type=np.load(version_dir / "col_portfolio_type.npy", mmap_mode="r"),
+        quarter=np.load(version_dir / "col_quarter.npy", mmap_mode="r"),
+    )
+
+    locations: Dict[ChunkCategory, Tuple[str, int, int, int]] = {
+        ChunkCategory(value): tuple(location) for value, location in manifest["locations"].items()
+    }
+
+    return IndexSnapshot(
+        version=version,
+        segments=segments,
+        locations=locations,
+        ids=_map_strings(version_dir, "ids"),
+        documents=_map_strings(version_dir, "documents"),
+        metadatas=_map_strings(version_dir, "metadatas", json.loads),
+        columns=columns,
+    )
+
+
+def read_knowledge_context(root: str) -> Optional[str]:
+    try:
+        return (Path(root) / KNOWLEDGE_CONTEXT_FILE).read_text(encoding="utf-8")
+    except OSError:
+        return None
@@ -19,11 +19,16 @@ from app.agents import (
     TimelineAgent
 )
 from app.services.embedding_service import EmbeddingService
+from app.services.chunk_metadata import SearchFilters
+from app.services.query_analyzer import QueryAnalysis, get_query_analyzer
 from app.services.knowledge_base import KnowledgeBase
 from app.models.chunks import ChunkCategory
-from typing import List, Dict, Any, AsyncGenerator
+from typing import List, Dict, Any, AsyncGenerator, Optional
 from openai import OpenAI
 from app.core.config import settings
+from app.core.telemetry import current_span, set_attributes, span, traced
+from app.core.metrics import LLM_INFLIGHT
+from app.services.usage_tracker import RequestUsage, record_usage, start_tracking, stop_tracking, track_usage
 
 
 class MultiAgentChatService:
@@ -44,6 +49,30 @@ class MultiAgentChatService:
             "context": ContextAgent(),
             "timeline": TimelineAgent()
         }
+        self.query_analyzer = get_query_analyzer()
+
+    def _apply_search_filters(self, query: str, search_filters: Optional[SearchFilters]):
+        """
+        Retorna (query para a busca, query para os agentes). A busca usa a
+        pergunta limpa + filtros de metadata; os agentes recebem a nota do recorte.
+        """
+        if search_filters is None or search_filters.is_empty:
+            return query, query
+        return query, f"{query}{search_filters.describe()}"
+
+    @staticmethod
+    def _resolve_search_filters(
+        search_filters: Optional[SearchFilters],
+        analysis: QueryAnalysis
+    ) -> Optional[SearchFilters]:
+        """
+        Filtros do request têm precedência; o que faltar vem da pergunta.
+        Se o recorte deduzido esvaziar a busca, ela é repetida só com os do request.
+        """
+        detected = analysis.to_search_filters()
+        if search_filters is None or detected is None:
+            return search_filters or detected
+        return search_filters.fill_from(detected)
 
     def _format_conversation_history(self, history: List[Dict]) -> str:
         """Formata o histórico da conversa para incluir no contexto"""
@@ -58,10 +87,12 @@ class MultiAgentChatService:
         formatted += "--- FIM DO HISTÓRICO ---\n\n"
         return formatted
 
+    @traced("chat.process_query")
     async def process_query(
         self,
         query: str,
-        conversation_history: List[Dict] = None
+        conversation_history: List[Dict] = None,
+        search_filters: Optional[SearchFilters] = None
     ) -> Dict[str, Any]:
         """
         Processa uma query usando o sistema multi-agente.
@@ -70,14 +101,43 @@ class MultiAgentChatService:
         1. SEMPRE busca primeiro em COMPLETE_ANALYSIS (fonte principal)
         2. Complementa com FACTS e FORENSIC se necessário
         3. Adiciona CONTEXT, CLIENT, UBS_OFFICIAL apenas quando solicitado
+
+        search_filters (ex.: date_range do request) restringe a busca aos chunks
+        do recorte; os agentes recebem só uma nota curta sobre o recorte.
+        A pergunta é analisada uma vez (QueryAnalyzer) e o resultado vai para o
+        orquestrador, para os filtros da busca e para o ChartAgent.
+
+        O resultado traz o uso real de tokens (tokens_used) e o detalhamento
+        por agente com custo e latência (usage).
         """
+        with track_usage() as usage:
+            result = await self._process_query(query, conversation_history, search_filters)
+        result["tokens_used"] = usage.total_tokens
+        result["usage"] = usage.summary()
+        return result
+
+    async def _process_query(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict]],
+        search_filters: Optional[SearchFilters]
+    ) -> Dict[str, Any]:
+        """Pipeline de process_query (dentro do escopo de contabilidade)"""
+        with span("chat.query_analysis") as current:
+            analysis = self.query_analyzer.analyze(query)
+            set_attributes(current, query__portfolios=list(analysis.portfolios), query__intents=list(analysis.intents))
+        search_query, query = self._apply_search_filters(query, search_filters)
+        request_filters = search_filters
+        search_filters = self._resolve_search_filters(search_filters, analysis)
+
         # Formatar histórico da conversa
         history_context = self._format_conversation_history(conversation_history)
 
         # 1. Orchestrator decide estratégia (com contexto da conversa)
         full_query = f"{history_context}PERGUNTA ATUAL: {query}" if history_context else query
-        decision = self.agents["orchestrator"].decide_agents(full_query)
+        decision = self.agents["orchestrator"].decide_agents(full_query, analysis)
         agents_to_use = decision.agents
+        set_attributes(current_span(), chat__agents=list(agents_to_use))
 
         # 2. Determinar se precisa de fontes terciárias
         include_tertiary = "context" in agents_to_use or "timeline" in agents_to_use
@@ -86,11 +146,13 @@ class MultiAgentChatService:
         # Com fallback para KnowledgeBase se embeddings falharem
         try:
             search_results = await self.agents["search"].search_hierarchical(
-                query=query,
+                query=search_query,
                 n_primary=10,  # Mais resultados da fonte principal
                 n_secondary=5,  # Menos das secundárias
                 include_tertiary=include_tertiary,
-                use_rerank=True
+                use_rerank=True,
+                search_filters=search_filters,
+                fallback_filters=request_filters
             )
         except Exception as e:
             print(f"⚠️ Embedding search failed, using KnowledgeBase fallback: {e}")
@@ -178,7 +240,7 @@ class MultiAgentChatService:
         if "chart" in agents_to_use:
             try:
                 context_text = self.agents["search"].format_context_for_llm(search_results)
-                chart_result = await self.agents["chart"].generate_chart(context_text, query)
+                chart_result = await self.agents["chart"].generate_chart(context_text, query, analysis)
                 result["chart"] = {
                     "type": chart_result.type,
                     "title": chart_result.title,
@@ -208,7 +270,8 @@ class MultiAgentChatService:
     async def process_query_streaming(
         self,
         query: str,
-        conversation_history: List[Dict] = None
+        conversation_history: List[Dict] = None,
+        search_filters: Optional[SearchFilters] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Processa uma query usando o sistema multi-agente COM STREAMING de eventos.
@@ -218,6 +281,28 @@ class MultiAgentChatService:
         1. SEMPRE busca primeiro em COMPLETE_ANALYSIS (fonte principal)
         2. Complementa com FACTS e FORENSIC se necessário
         """
+        usage, token = start_tracking()
+        try:
+            async for event in self._stream_query(usage, query, conversation_history, search_filters):
+                yield event
+        finally:
+            stop_tracking(token)
+
+    async def _stream_query(
+        self,
+        usage: RequestUsage,
+        query: str,
+        conversation_history: Optional[List[Dict]],
+        search_filters: Optional[SearchFilters]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Eventos de process_query_streaming, dentro do escopo de uso do request"""
+        with span("chat.query_analysis") as current:
+            analysis = self.query_analyzer.analyze(query)
+            set_attributes(current, query__portfolios=list(analysis.portfolios), query__intents=list(analysis.intents))
+        search_query, query = self._apply_search_filters(query, search_filters)
+        request_filters = search_filters
+        search_filters = self._resolve_search_filters(search_filters, analysis)
+
         # Formatar histórico da conversa
         history_context = self._format_conversation_history(conversation_history)
 
@@ -225,8 +310,9 @@ class MultiAgentChatService:
         yield {"type": "thinking", "data": {"step": "orchestrator", "message": "Analisando sua pergunta..."}}
 
         full_query = f"{history_context}PERGUNTA ATUAL: {query}" if history_context else query
-        decision = self.agents["orchestrator"].decide_agents(full_query)
+        decision = self.agents["orchestrator"].decide_agents(full_query, analysis)
         agents_to_use = decision.agents
+        set_attributes(current_span(), chat__agents=list(agents_to_use))
 
         yield {
             "type": "agents",
@@ -248,11 +334,13 @@ class MultiAgentChatService:
 
         try:
             search_results = await self.agents["search"].search_hierarchical(
-                query=query,
+                query=search_query,
                 n_primary=10,
                 n_secondary=5,
                 include_tertiary=include_tertiary,
-                use_rerank=True
+                use_rerank=True,
+                search_filters=search_filters,
+                fallback_filters=request_filters
             )
         except Exception as e:
             print(f"⚠️ Embedding search failed, using KnowledgeBase fallback: {e}")
@@ -347,7 +435,7 @@ class MultiAgentChatService:
             yield {"type": "thinking", "data": {"step": "chart", "message": "Agente de Gráficos gerando visualização..."}}
             try:
                 context_text = self.agents["search"].format_context_for_llm(search_results)
-                chart_result = await self.agents["chart"].generate_chart(context_text, query)
+                chart_result = await self.agents["chart"].generate_chart(context_text, query, analysis)
                 result["chart"] = {
                     "type": chart_result.type,
                     "title": chart_result.title,
@@ -373,6 +461,11 @@ class MultiAgentChatService:
             context_text = self.agents["search"].format_context_for_llm(search_results)
             result["response"] = await self._generate_simple_response(query, context_text, history_context)
 
+        # Uso real de tokens/custo do request
+        usage.finish()
+        result["tokens_used"] = usage.total_tokens
+        result["usage"] = usage.summary()
+
         # Enviar resultado completo
         yield {"type": "complete", "data": result}
 
@@ -644,15 +737,18 @@ DADOS IMPORTANTES (use quando relevante):
 Responda agora:"""
 
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4.1",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente que explica casos financeiros de forma natural e conversacional. Fale como um amigo que entende do assunto, não como um robô. Varie seu estilo de resposta."},
-                    {"role": "user", "content": consolidation_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
+            with span("chat.consolidate", chat__responses=len(responses)):
+                with LLM_INFLIGHT.track_inprogress(agent="consolidation"):
+                    response = self.openai_client.chat.completions.create(
+                        model="gpt-4.1",
+                        messages=[
+                            {"role": "system", "content": "Você é um assistente que explica casos financeiros de forma natural e conversacional. Fale como um amigo que entende do assunto, não como um robô. Varie seu estilo de resposta."},
+                            {"role": "user", "content": consolidation_prompt}
+                        ],
+                        temperature=0.7,
+                        max_tokens=2000
+                    )
+                record_usage("consolidation", "gpt-4.1", response.usage)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Erro na consolidação: {e}")
@@ -691,15 +787,18 @@ Responda de forma natural e conversacional, como explicaria para um amigo.
 Use **negrito** para números importantes. Seja direto e evite estruturas rígidas."""
 
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4.1",
-                messages=[
-                    {"role": "system", "content": "Você explica casos financeiros de forma natural e amigável. Fale como um amigo, não como um robô. Varie seu estilo."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500
-            )
+            with span("chat.simple_response"):
+                with LLM_INFLIGHT.track_inprogress(agent="simple_response"):
+                    response = self.openai_client.chat.completions.create(
+                        model="gpt-4.1",
+                        messages=[
+                            {"role": "system", "content": "Você explica casos financeiros de forma natural e amigável. Fale como um amigo, não como um robô. Varie seu estilo."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.7,
+                        max_tokens=1500
+                    )
+                record_usage("simple_response", "gpt-4.1", response.usage)
             return response.choices[0].message.content
         except Exception as e:
             print(f"Erro na resposta simples: {e}")
@@ -0,0 +1,289 @@
+"""
+Análise local da pergunta (sem LLM).
+
+Um único passe de regex/dicionário extrai as restrições estruturadas da
+pergunta — portfolios, período, trimestre, classes de ativo e intenções — por
+exemplo "Portfolio 02 em 2009" -> portfolios=("02",), anos 2009..2009.
+Números seguidos/precedidos de moeda ou unidade ("2000 francos", "CHF 2000",
+"2010%") são valores, não anos; "de 1998 até hoje" deixa o fim do período
+em aberto. "01"/"02" soltos só viram portfolio se a pergunta fala de
+portfolio/carteira e o número não é o dia de uma data ("01 de março").
+
+O resultado (QueryAnalysis) é calculado uma vez por request e compartilhado
+pelo orquestrador (dica de roteamento), pelos filtros da busca
+(SearchFilters) e pelo ChartAgent (qual portfolio/série desenhar).
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.services.chunk_metadata import SearchFilters
+
+
+# Anos plausíveis para o caso (o primeiro portfolio começa em 1998)
+MIN_YEAR = 1990
+MAX_YEAR = 2035
+
+# Classes de ativo -> termos (já sem acento e em minúsculas)
+ASSET_CLASSES: Dict[str, List[str]] = {
+    "real_estate": ["imobiliario", "imoveis", "real estate", "property fund", "global property", "reit"],
+    "equities": ["acoes", "acao", "equities", "equity", "renda variavel", "bolsa"],
+    "bonds": ["renda fixa", "bonds", "bond", "titulos", "obrigacoes", "fixed income"],
+    "hedge_funds": ["hedge fund", "hedge funds", "fundos alternativos", "alternativos"],
+    "liquidity": ["liquidez", "caixa", "cash", "money market", "deposito"],
+    "commodities": ["commodities", "ouro", "gold", "metais preciosos"],
+}
+
+# Intenções -> termos. Espelham as regras de roteamento do OrchestratorAgent.
+INTENTS: Dict[str, List[str]] = {
+    "chart": ["grafico", "visualiz", "plot", "evolucao patrimonial", "evolucao do patrimonio",
+              "saques por ano", "retiradas por ano", "retornos anuais", "performance anual"],
+    "forensic": ["culpa", "violac", "ma conduta", "mau conduta", "responsab", "errou", "erro do banco",
+                 "suitability", "adequacao", "negligencia", "fraude"],
+    "timeline": ["cronologia", "sequencia", "timeline", "linha do tempo", "aconteceu primeiro", "ordem dos eventos"],
+    "context": ["contexto historico", "crise de 2008", "na epoca", "o que acontecia", "mercado caiu",
+                "acontecendo no mundo"],
+    "calculation": ["calcul", "quanto", "percentual", "porcentagem", "soma", "total de", "media"],
+    "emotional": ["roubado", "enganado", "raiva", "frustra", "triste", "decepcion", "absurdo", "injusto",
+                  "revolt", "minha familia"],
+    "next_steps": ["o que fazer", "proximos passos", "como proceder", "posso processar", "tenho direito",
+                   "recomendacao", "o que voce sugere"],
+}
+
+# Séries do ChartAgent -> termos (a primeira que casar, nesta ordem, vence)
+CHART_METRICS: Dict[str, List[str]] = {
+    "withdrawals": ["retirada", "saque", "saida", "outflow", "withdrawal", "resgate"],
+    "cumulative": ["cumulativ", "acumulad", "cumulative", "total performance"],
+    "returns": ["retorno", "return", "performance", "twr", "rendimento", "ganho", "perda anual"],
+    "patrimonio": ["patrimonio", "evolucao", "valor", "ativo", "liquido", "asset", "net asset", "wealth",
+                   "dinheiro", "capital", "montante", "saldo", "total", "periodo"],
+}
+
+_YEAR = r"((?:19|20)\d{2})"
+_YEAR_RANGE_RE = re.compile(
+    rf"(?:de|entre|from|between)?\s*{_YEAR}\s*(?:-|–|a|ate|e|to|and)\s*{_YEAR}(?!\d)"
+)
+_SINCE_RE = re.compile(rf"(?:desde|a partir de|apos|depois de|since|after)\s+(?:o ano de\s+)?{_YEAR}(?!\d)")
+_UNTIL_RE = re.compile(rf"(?:ate|antes de|until|before)\s+(?:o ano de\s+)?{_YEAR}(?!\d)")
+# Fim em aberto: "de 1998 até hoje", "desde 2005 até agora", "como está atualmente"
+_OPEN_END_RE = re.compile(
+    r"\b(?:ate (?:hoje|agora|o presente|os dias (?:de )?hoje)|atualmente|hoje em dia|nos dias (?:de )?hoje"
+    r"|until (?:today|now)|to date|today|nowadays)\b"
+)
+# Moedas e unidades: "2000 francos", "1500 chf", "2010 mil", "2000%"
+_UNITS = (
+    r"francos?|fr\b|chf|usd|eur|euros?|dolares?|reais|libras?|gbp|brl"
+    r"|mil\b|milhao|milhoes|mi\b|bi\b|bilhao|bilhoes|k\b|m\b|pontos?|bps"
+)
+_AMOUNT_SUFFIX = rf"\s*(?:%|(?:{_UNITS}))"
+# Também o início de uma faixa de valores: "2000 a 3000 francos"
+_YEAR_RE = re.compile(
+    rf"(?<![\d.,-]){_YEAR}(?![\d/.,])(?!{_AMOUNT_SUFFIX})"
+    rf"(?!\s*(?:-|–|a|ate|e|to|and)\s*[\d.,]+{_AMOUNT_SUFFIX})"
+)
+_AMOUNT_SUFFIX_RE = re.compile(_AMOUNT_SUFFIX)
+# "chf 2000", "us$ 2000", "r$2000"
+_CURRENCY_BEFORE_RE = re.compile(r"(?:\b(?:chf|usd|eur|gbp|brl|fr)\.?|\$)\s*$")
+
+# "q3", "3o trimestre" (o "º" vira "o" no _fold), "terceiro trimestre", "3rd quarter"
+_QUARTER_ORDINALS = {"primeiro": 1, "segundo": 2, "terceiro": 3, "quarto": 4,
+                     "first": 1, "second": 2, "third": 3, "fourth": 4}
+_QUARTER_RE = re.compile(
+    r"\bq([1-4])\b"
+    r"|\b([1-4])\s*(?:o|°|st|nd|rd|th)?\s*(?:trimestre|tri|quarter)\b"
+    rf"|\b({'|'.join(_QUARTER_ORDINALS)})\s+(?:trimestre|quarter)\b"
+)
+
+# "portfolio 02", "portfólio 2", "carteira 01", "conta 2", "p02"
+_PORTFOLIO_RE = re.compile(r"\b(?:portfolios?|carteiras?|contas?|p)\s*[-#nº°]*\s*0?([12])\b")
+_ORDINAL_RE = re.compile(r"\b(primeiro|segundo)\s+(?:portfolio|carteira|conta)\b")
+# "01" / "02" soltos (não fazem parte de datas como 02/2009 ou 1.02). Só contam
+# se a pergunta fala de portfolio/carteira e o número não é o dia de uma data
+_BARE_ID_RE = re.compile(r"(?<![\d/.,-])0([12])(?![\d/.,%])")
+_PORTFOLIO_WORD_RE = re.compile(r"\b(?:portfolios?|carteiras?)\b")
+_MONTHS = (
+    "janeiro|fevereiro|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro"
+    "|jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez"
+    "|january|february|march|april|may|june|july|august|september|october|november|december"
+)
+_DATE_AFTER_RE = re.compile(rf"\s*(?:de\s+|-\s*)?(?:{_MONTHS})\b")
+_DATE_BEFORE_RE = re.compile(rf"\b(?:dia|{_MONTHS})\s+$")
+_BOTH_RE = re.compile(r"\b(?:ambos|ambas|os dois|as duas|dois portfolios|compar\w*)\b")
+
+
+def _fold(text: str) -> str:
+    """Minúsculas e sem acentos (a mesma normalização dos dicionários)"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def _compile_terms(table: Dict[str, List[str]]) -> re.Pattern:
+    """Uma regex com grupos nomeados para todos os termos de um dicionário"""
+    groups = [
+        f"(?P<{name}>{'|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))})"
+        for name, terms in table.items()
+    ]
+    return re.compile("|".join(groups))
+
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    """Restrições e sinais extraídos de uma pergunta"""
+    portfolios: Tuple[str, ...] = ()
+    year_start: Optional[int] = None
+    year_end: Optional[int] = None
+    asset_classes: Tuple[str, ...] = ()
+    intents: Tuple[str, ...] = ()
+    chart_metric: Optional[str] = None
+    quarter: Optional[int] = None
+    years: Tuple[int, ...] = field(default=(), repr=False)
+
+    @property
+    def portfolio(self) -> Optional[str]:
+        """O portfolio pedido, se for exatamente um"""
+        return self.portfolios[0] if len(self.portfolios) == 1 else None
+
+    def has_intent(self, intent: str) -> bool:
+        return intent in self.intents
+
+    def to_search_filters(self) -> Optional[SearchFilters]:
+        """Filtros de busca para o período, o portfolio e o trimestre (None se a pergunta não restringe nada)"""
+        filters = SearchFilters(
+            year_start=self.year_start,
+            year_end=self.year_end,
+            portfolio_type=self.portfolio,
+            quarter=self.quarter,
+        )
+        return None if filters.is_empty else filters
+
+    def routing_hint(self) -> str:
+        """Resumo para o prompt do orquestrador ("" se nada foi detectado)"""
+        parts = []
+        if self.portfolios:
+            parts.append(f"portfolios: {', '.join(self.portfolios)}")
+        if self.year_start is not None or self.year_end is not None:
+            parts.append(f"período: {self.year_start or '...'}-{self.year_end or '...'}")
+        if self.quarter:
+            parts.append(f"trimestre: Q{self.quarter}")
+        if self.asset_classes:
+            parts.append(f"classes de ativo: {', '.join(self.asset_classes)}")
+        if self.intents:
+            parts.append(f"intenções: {', '.join(self.intents)}")
+        return f"[SINAIS DETECTADOS: {'; '.join(parts)}]" if parts else ""
+
+
+class QueryAnalyzer:
+    """Extrai QueryAnalysis com regex pré-compiladas (microssegundos por pergunta)"""
+
+    def __init__(self):
+        self._asset_re = _compile_terms(ASSET_CLASSES)
+        self._intent_re = _compile_terms(INTENTS)
+        self._metric_re = _compile_terms(CHART_METRICS)
+
+    def analyze(self, query: str) -> QueryAnalysis:
+        text = _fold(query)
+        year_start, year_end, years = self._years(text)
+
+        return QueryAnalysis(
+            portfolios=self._portfolios(text),
+            year_start=year_start,
+            year_end=year_end,
+            quarter=self._quarter(text),
+            years=years,
+            asset_classes=self._matches(self._asset_re, text),
+            intents=self._matches(self._intent_re, text),
+            chart_metric=self._chart_metric(text),
+        )
+
+    @staticmethod
+    def _matches(pattern: re.Pattern, text: str) -> Tuple[str, ...]:
+        """Nomes dos grupos que casaram, na ordem da primeira ocorrência"""
+        found: List[str] = []
+        for match in pattern.finditer(text):
+            if match.lastgroup not in found:
+                found.append(match.lastgroup)
+        return tuple(found)
+
+    def _chart_metric(self, text: str) -> Optional[str]:
+        found = set(self._matches(self._metric_re, text))
+        # A ordem de CHART_METRICS define a precedência, não a posição no texto
+        return next((metric for metric in CHART_METRICS if metric in found), None)
+
+    @staticmethod
+    def _portfolios(text: str) -> Tuple[str, ...]:
+        found = {f"0{number}" for number in _PORTFOLIO_RE.findall(text)}
+        found.update("01" if ordinal == "primeiro" else "02" for ordinal in _ORDINAL_RE.findall(text))
+        if _PORTFOLIO_WORD_RE.search(text):
+            found.update(
+                f"0{match.group(1)}" for match in _BARE_ID_RE.finditer(text)
+                if not _DATE_AFTER_RE.match(text, match.end())
+                and not _DATE_BEFORE_RE.search(text, 0, match.start())
+            )
+
+        if not found and _BOTH_RE.search(text) and ("portfolio" in text or "carteira" in text):
+            found = {"01", "02"}
+        return tuple(sorted(found))
+
+    @staticmethod
+    def _quarter(text: str) -> Optional[int]:
+        """O trimestre pedido, se for exatamente um"""
+        found = set()
+        for match in _QUARTER_RE.finditer(text):
+            number, digit, ordinal = match.groups()
+            found.add(int(number or digit) if (number or digit) else _QUARTER_ORDINALS[ordinal])
+        return found.pop() if len(found) == 1 else None
+
+    @staticmethod
+    def _year_positions(text: str) -> Dict[int, int]:
+        """Posição -> ano, só para números que são anos (não valores com moeda/unidade)"""
+        return {
+            match.start(1): int(match.group(1))
+            for match in _YEAR_RE.finditer(text)
+            if MIN_YEAR <= int(match.group(1)) <= MAX_YEAR
+            and not _CURRENCY_BEFORE_RE.search(text, 0, match.start(1))
+        }
+
+    @classmethod
+    def _years(cls, text: str) -> Tuple[Optional[int], Optional[int], Tuple[int, ...]]:
+        """(ano inicial, ano final, anos citados); intervalos explícitos têm precedência"""
+        positions = cls._year_positions(text)
+        years = tuple(sorted(set(positions.values())))
+        if not years:
+            return None, None, ()
+
+        def first(pattern: re.Pattern) -> Optional[re.Match]:
+            # Primeira ocorrência que começa em um ano válido e não termina em valor
+            return next(
+                (m for m in pattern.finditer(text)
+                 if m.start(1) in positions and not _AMOUNT_SUFFIX_RE.match(text, m.end())),
+                None
+            )
+
+        match = first(_YEAR_RANGE_RE)
+        if match:
+            start, end = sorted((int(match.group(1)), int(match.group(2))))
+            return start, end, years
+
+        since, until = first(_SINCE_RE), first(_UNTIL_RE)
+        # "de 1998 até hoje": começa no (primeiro) ano citado e fica aberto no fim
+        open_end = until is None and _OPEN_END_RE.search(text)
+        if since or until or open_end:
+            return (
+                int(since.group(1)) if since else (years[0] if open_end else None),
+                int(until.group(1)) if until else None,
+                years
+            )
+
+        return years[0], years[-1], years
+
+
+_default_analyzer: Optional[QueryAnalyzer] = None
+
+
+def get_query_analyzer() -> QueryAnalyzer:
+    """Analisador compartilhado (as regex são compiladas uma vez)"""
+    global _default_analyzer
+    if _default_analyzer is None:
+        _default_analyzer = QueryAnalyzer()
+    return _default_analyzer
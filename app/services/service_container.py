@@ -0,0 +1,146 @@
+"""
+Container de serviços da aplicação.
+
+Criado uma única vez no lifespan do FastAPI e guardado em app.state.services.
+Concentra os clientes caros (Chroma, OpenAI, Cohere) e os agentes, para que
+endpoints de chat e de admin compartilhem as mesmas instâncias já aquecidas.
+"""
+import threading
+import time
+from typing import Optional, Dict, Any
+
+from app.agents.orchestrator import AgentDecision
+from app.agents.analysis import FinancialAnalysis
+from app.agents.chart import ChartSpecification
+from app.agents.context import HistoricalContext
+from app.agents.forensic import ViolationAnalysis
+from app.agents.timeline import Timeline
+from app.core.config import settings
+from app.services.embedding_service import EmbeddingService
+from app.services.knowledge_base import KnowledgeBase
+from app.services.multi_agent_service import MultiAgentChatService
+from app.services.storage_service import StorageService, storage_service
+
+
+# response_models usados pelos agentes (instructor)
+RESPONSE_MODELS = [
+    AgentDecision,
+    FinancialAnalysis,
+    ChartSpecification,
+    HistoricalContext,
+    ViolationAnalysis,
+    Timeline,
+]
+
+
+class ServiceContainer:
+    """Instâncias compartilhadas por todo o processo"""
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        chat_service: MultiAgentChatService,
+        storage: StorageService
+    ):
+        self.embedding_service = embedding_service
+        self.chat_service = chat_service
+        self.storage = storage
+
+    @classmethod
+    def create(cls) -> "ServiceContainer":
+        """Constrói todos os serviços (Chroma + collections, OpenAI, Cohere, agentes)"""
+        embedding_service = EmbeddingService()
+        chat_service = MultiAgentChatService(embedding_service)
+        return cls(
+            embedding_service=embedding_service,
+            chat_service=chat_service,
+            storage=storage_service
+        )
+
+    @property
+    def openai_client(self):
+        return self.chat_service.openai_client
+
+    @property
+    def cohere_client(self):
+        return self.chat_service.agents["search"].cohere_client
+
+    def load_index_artifact(self, path: str) -> Dict[str, Any]:
+        """Importa o artefato de índice (se ainda não foi importado neste Chroma)"""
+        from app.services.index_artifact import import_artifact
+
+        return import_artifact(self.embedding_service, path, settings.CHROMA_PERSIST_DIRECTORY)
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Deixa o caminho do /chat quente antes de receber tráfego.
+        Retorna o tempo (ms) de cada etapa e o que foi aquecido.
+        """
+        report: Dict[str, Any] = {}
+
+        # 1. Abrir as collections (carrega segmentos do Chroma)
+        start = time.perf_counter()
+        report["collections"] = self.embedding_service.get_all_collection_stats()
+        report["collections_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 2. Tocar os índices HNSW com uma query de verdade. Com MMAP_INDEX as
+        # buscas saem do layout mapeado e o HNSW não é carregado em cada worker
+        if not settings.MMAP_INDEX:
+            start = time.perf_counter()
+            report["indexes"] = self.embedding_service.warm_up_indexes()
+            report["indexes_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 2b. Carregar o índice vetorial em memória (se habilitado)
+        vector_index = self.embedding_service.vector_index
+        if vector_index is not None:
+            start = time.perf_counter()
+            snapshot = vector_index.ensure_fresh(self.embedding_service.collections)
+            report["vector_index"] = {
+                "vectors": snapshot.size,
+                "bytes": snapshot.nbytes,
+                "mapped": vector_index.mmap_directory is not None,
+            }
+            report["vector_index_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 2c. Carregar o índice lexical BM25 (busca híbrida)
+        if settings.HYBRID_SEARCH:
+            start = time.perf_counter()
+            self.embedding_service.lexical_index.ensure_fresh(self.embedding_service.collections)
+            report["lexical_index"] = {"documents": self.embedding_service.lexical_index.size}
+            report["lexical_index_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 3. Montar o contexto fixo da KnowledgeBase (fica em cache)
+        start = time.perf_counter()
+        report["knowledge_context_chars"] = len(KnowledgeBase.get_fixed_context())
+        report["knowledge_context_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # 4. Gerar os schemas de function calling dos response_models
+        from instructor import openai_schema
+
+        start = time.perf_counter()
+        for model in RESPONSE_MODELS:
+            openai_schema(model).openai_schema
+        report["schemas"] = len(RESPONSE_MODELS)
+        report["schemas_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        return report
+
+
+_lock = threading.Lock()
+
+
+def get_or_create_container(state) -> ServiceContainer:
+    """
+    Retorna o container guardado em state (app.state), criando-o se o
+    lifespan ainda não rodou (ex.: scripts ou TestClient sem lifespan).
+    """
+    container: Optional[ServiceContainer] = getattr(state, "services", None)
+    if container is not None:
+        return container
+
+    with _lock:
+        container = getattr(state, "services", None)
+        if container is None:
+            container = ServiceContainer.create()
+            state.services = container
+    return container
@@ -2,13 +2,51 @@
 Storage Service - Abstrai acesso a imagens (local ou S3/R2)
 """
 import os
+import hashlib
 import logging
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List, BinaryIO
+from typing import Optional, List, Dict, Any, BinaryIO, AsyncIterator
 from abc import ABC, abstractmethod
 
+import anyio
+
+from app.core.metrics import record_cache
+
 logger = logging.getLogger(__name__)
 
+# Multipart do upload para o S3/R2 (scripts/upload_images_to_r2.py): arquivos a
+# partir do threshold vão em partes do tamanho abaixo. O ETag local usa os mesmos
+# valores, para ser igual ao que o S3/R2 reporta para o mesmo arquivo.
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+
+def compute_s3_etag(
+    file_path: Path,
+    size: int,
+    threshold: int = MULTIPART_THRESHOLD,
+    chunksize: int = MULTIPART_CHUNKSIZE
+) -> str:
+    """
+    ETag (sem aspas) que o S3/R2 reporta para o arquivo:
+    - upload simples: MD5 do conteúdo
+    - multipart: MD5 da concatenação dos MD5 das partes + "-<n_partes>"
+    """
+    if size < threshold:
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(block)
+        return md5.hexdigest()
+
+    part_digests = []
+    with open(file_path, "rb") as f:
+        for part in iter(lambda: f.read(chunksize), b""):
+            part_digests.append(hashlib.md5(part).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
 
 class StorageBackend(ABC):
     """Interface abstrata para backends de storage"""
@@ -33,12 +71,23 @@ class StorageBackend(ABC):
     def get_file_url(self, path: str) -> Optional[str]:
         pass
 
+    @abstractmethod
+    def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna metadados para cache HTTP:
+        {"etag": str, "size": int, "last_modified": datetime}
+        """
+        pass
+
 
 class LocalStorageBackend(StorageBackend):
     """Backend para storage local"""
 
     def __init__(self, base_path: str):
         self.base_path = Path(base_path)
+        # Cache de hashes: path -> (mtime_ns, size, etag)
+        self._etag_cache: Dict[str, tuple] = {}
+        self._etag_lock = threading.Lock()
         logger.info(f"LocalStorage initialized with base_path: {self.base_path}")
 
     def _full_path(self, path: str) -> Path:
@@ -73,6 +122,38 @@ class LocalStorageBackend(StorageBackend):
             return full_path
         return None
 
+    def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        ETag calculado como o S3/R2 faz (MD5, ou MD5 das partes acima do
+        threshold de multipart), então o mesmo arquivo tem o mesmo ETag nos
+        dois backends. O hash so e recalculado quando mtime/tamanho mudam.
+        """
+        full_path = self._full_path(path)
+        try:
+            stat = full_path.stat()
+        except OSError:
+            return None
+        if not full_path.is_file():
+            return None
+
+        key = str(full_path)
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+        hit = bool(cached) and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size
+        record_cache("storage_etag", hit)
+        if hit:
+            etag = cached[2]
+        else:
+            etag = f'"{compute_s3_etag(full_path, stat.st_size)}"'
+            with self._etag_lock:
+                self._etag_cache[key] = (stat.st_mtime_ns, stat.st_size, etag)
+
+        return {
+            "etag": etag,
+            "size": stat.st_size,
+            "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        }
+
 
 class S3StorageBackend(StorageBackend):
     """Backend para S3/Cloudflare R2"""
@@ -83,18 +164,22 @@ class S3StorageBackend(StorageBackend):
         endpoint_url: str = None,
         access_key_id: str = None,
         secret_access_key: str = None,
-        region: str = "auto"
+        region: str = "auto",
+        max_pool_connections: int = 10
     ):
         import boto3
         from botocore.config import Config
 
         self.bucket_name = bucket_name
         self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
 
-        # Configurar cliente S3
+        # Configurar cliente S3 (clientes boto3 sao thread-safe; o pool de
+        # conexoes e compartilhado entre o backend sync e o async)
         config = Config(
             signature_version='s3v4',
-            s3={'addressing_style': 'path'}
+            s3={'addressing_style': 'path'},
+            max_pool_connections=max_pool_connections
         )
 
         self.client = boto3.client(
@@ -179,12 +264,188 @@ class S3StorageBackend(StorageBackend):
             logger.error(f"Error generating presigned URL for {path}: {e}")
             return None
 
+    def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        """Metadados via HEAD (o ETag do R2/S3 e o MD5 do conteudo)"""
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=path)
+        except Exception:
+            return None
+        return {
+            "etag": response.get("ETag"),
+            "size": response.get("ContentLength"),
+            "last_modified": response.get("LastModified"),
+        }
+
+
+class AsyncStorageBackend(ABC):
+    """
+    Interface async para backends de storage.
+    Usada pelos endpoints async para que I/O de imagens nao bloqueie o event loop.
+    """
+
+    # Tamanho padrao dos blocos em leituras por streaming
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    @abstractmethod
+    async def file_exists(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def list_directory(self, path: str = "") -> List[str]:
+        pass
+
+    @abstractmethod
+    async def is_directory(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_file(self, path: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def get_file_url(self, path: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def iter_file(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Le o arquivo em blocos; `end` e inclusivo (semantica do header Range)"""
+        pass
+
+    async def get_file_path(self, path: str) -> Optional[Path]:
+        """Caminho local para servir o arquivo direto; None se o backend nao tem disco local"""
+        return None
+
+
+class AsyncLocalStorageBackend(AsyncStorageBackend):
+    """Backend async para storage local (arquivos via anyio, stat/listagem em threads)"""
+
+    def __init__(self, backend: LocalStorageBackend, max_concurrency: int = 32):
+        self.backend = backend
+        self._limiter = anyio.CapacityLimiter(max_concurrency)
+
+    async def _run(self, func, *args):
+        return await anyio.to_thread.run_sync(func, *args, limiter=self._limiter)
+
+    async def file_exists(self, path: str) -> bool:
+        return await self._run(self.backend.file_exists, path)
+
+    async def list_directory(self, path: str = "") -> List[str]:
+        return await self._run(self.backend.list_directory, path)
+
+    async def is_directory(self, path: str) -> bool:
+        return await self._run(self.backend.is_directory, path)
+
+    async def get_file(self, path: str) -> Optional[bytes]:
+        full_path = self.backend._full_path(path)
+        if not await self._run(full_path.is_file):
+            return None
+        async with await anyio.open_file(full_path, "rb") as f:
+            return await f.read()
+
+    async def get_file_url(self, path: str) -> Optional[str]:
+        return None
+
+    async def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.backend.get_file_metadata, path)
+
+    async def get_file_path(self, path: str) -> Optional[Path]:
+        return await self._run(self.backend.get_file_path, path)
+
+    async def iter_file(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = AsyncStorageBackend.STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        full_path = self.backend._full_path(path)
+        async with await anyio.open_file(full_path, "rb") as f:
+            if start:
+                await f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                block = await f.read(size)
+                if not block:
+                    break
+                if remaining is not None:
+                    remaining -= len(block)
+                yield block
+
+
+class AsyncS3StorageBackend(AsyncStorageBackend):
+    """
+    Backend async para S3/R2.
+    Reutiliza o cliente boto3 do backend sync (mesmo pool de conexoes) e
+    executa as chamadas em threads, limitadas ao tamanho do pool.
+    """
+
+    def __init__(self, backend: S3StorageBackend):
+        self.backend = backend
+        self._limiter = anyio.CapacityLimiter(backend.max_pool_connections)
+
+    async def _run(self, func, *args):
+        return await anyio.to_thread.run_sync(func, *args, limiter=self._limiter)
+
+    async def file_exists(self, path: str) -> bool:
+        return await self._run(self.backend.file_exists, path)
+
+    async def list_directory(self, path: str = "") -> List[str]:
+        return await self._run(self.backend.list_directory, path)
+
+    async def is_directory(self, path: str) -> bool:
+        return await self._run(self.backend.is_directory, path)
+
+    async def get_file(self, path: str) -> Optional[bytes]:
+        return await self._run(self.backend.get_file, path)
+
+    async def get_file_url(self, path: str) -> Optional[str]:
+        return await self._run(self.backend.get_file_url, path)
+
+    async def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.backend.get_file_metadata, path)
+
+    async def iter_file(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = AsyncStorageBackend.STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        params = {"Bucket": self.backend.bucket_name, "Key": path}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+        response = await self._run(lambda: self.backend.client.get_object(**params))
+        body = response["Body"]
+        chunks = body.iter_chunks(chunk_size)
+        try:
+            # Cada bloco e uma leitura bloqueante do socket: vai para uma thread
+            while True:
+                block = await self._run(next, chunks, None)
+                if block is None:
+                    break
+                yield block
+        finally:
+            body.close()
+
 
 class StorageService:
     """Servico principal de storage - singleton"""
 
     _instance = None
     _backend: StorageBackend = None
+    _async_backend: AsyncStorageBackend = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -207,7 +468,8 @@ class StorageService:
                 endpoint_url=settings.S3_ENDPOINT_URL or None,
                 access_key_id=settings.S3_ACCESS_KEY_ID or None,
                 secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
-                region=settings.S3_REGION
+                region=settings.S3_REGION,
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS
             )
             logger.info("Storage: Using S3/R2 backend")
         else:
@@ -227,6 +489,21 @@ class StorageService:
             self.initialize()
         return self._backend
 
+    @property
+    def async_backend(self) -> AsyncStorageBackend:
+        """Variante async do backend configurado (compartilha clientes/caches)"""
+        if self._async_backend is None:
+            from app.core.config import settings
+
+            backend = self.backend
+            if isinstance(backend, S3StorageBackend):
+                self._async_backend = AsyncS3StorageBackend(backend)
+            else:
+                self._async_backend = AsyncLocalStorageBackend(
+                    backend, max_concurrency=settings.STORAGE_IO_CONCURRENCY
+                )
+        return self._async_backend
+
     def file_exists(self, path: str) -> bool:
         return self.backend.file_exists(path)
 
@@ -242,6 +519,9 @@ class StorageService:
     def get_file_url(self, path: str) -> Optional[str]:
         return self.backend.get_file_url(path)
 
+    def get_file_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get_file_metadata(path)
+
     def get_local_path(self, path: str) -> Optional[Path]:
         """Retorna caminho local se backend for local"""
         if isinstance(self.backend, LocalStorageBackend):
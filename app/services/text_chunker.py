@@ -0,0 +1,208 @@
+"""
+Chunker de texto orientado a tokens.
+
+Divide o texto respeitando limites de títulos markdown, parágrafos e frases.
+Frases longas demais só são quebradas em espaços em branco, então palavras e
+números não são cortados; a exceção é uma sequência sem espaços maior que o
+orçamento inteiro (ex.: URL ou linha de tabela colada), que vira um chunk
+próprio acima de max_tokens. O orçamento é contado em tokens com o tiktoken
+(cl100k_base, o encoding dos modelos de embedding; está no requirements.txt).
+Se o encoding não puder ser carregado (ex.: servidor sem acesso para baixar o
+arquivo na primeira vez e sem TIKTOKEN_CACHE_DIR), a contagem cai para uma
+aproximação por palavras/pontuação, com um aviso no log.
+
+Padrão 384/48 tokens: no benchmark (scripts/benchmark_chunker.py) gera menos
+chunks que a janela antiga de 1000/200 caracteres (31 x 37 no relatório
+forense), com menos tokens enviados para embedding. Esses números foram
+medidos com a contagem aproximada; rode o benchmark com o tiktoken instalado
+para ver a contagem real.
+"""
+import re
+from typing import Iterator, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dependência opcional
+    tiktoken = None
+
+
+# Título markdown (# ... ######) no início da linha
+HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+\S")
+
+# Parágrafos: uma ou mais linhas em branco
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+
+# Fim de frase: . ! ? seguido de espaço e início de nova frase.
+# Números como 1.234,56 ou 3.5% não têm espaço após o ponto, então não quebram.
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;:])\s+(?=[A-ZÀ-Ý0-9\"“'(\-•*])")
+
+# Aproximação de tokens sem tiktoken: palavras e sinais de pontuação
+APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+DEFAULT_MAX_TOKENS = 384
+DEFAULT_OVERLAP_TOKENS = 48
+
+# Conversão dos tamanhos antigos em caracteres (chunk_size/overlap) para tokens
+CHARS_PER_TOKEN = 4
+
+
+def tokens_from_chars(chars: int) -> int:
+    """Orçamento em tokens equivalente a um tamanho em caracteres"""
+    return max(1, chars // CHARS_PER_TOKEN)
+
+
+class TextChunker:
+    """Agrupa blocos/frases em chunks de até max_tokens, com overlap em frases"""
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        encoding_name: str = "cl100k_base"
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens deve ser menor que max_tokens")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._encoding = None
+
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                print(f"⚠️  tiktoken indisponível ({e}), usando contagem aproximada")
+
+    @property
+    def uses_tiktoken(self) -> bool:
+        return self._encoding is not None
+
+    def count_tokens(self, text: str) -> int:
+        """Número de tokens do texto"""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(APPROX_TOKEN_RE.findall(text))
+
+    def chunk(self, text: str) -> List[str]:
+        """Versão em lista de iter_chunks"""
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """
+        Gera os chunks em ordem.
+        Um título markdown inicia um novo chunk (sem overlap com a seção anterior)
+        quando o chunk atual já tem pelo menos metade do orçamento; seções curtas
+        são agrupadas para não gerar chunks minúsculos.
+        """
+        current: List[tuple] = []  # [(unidade, tokens, separador)]
+        current_tokens = 0
+        min_section_tokens = self.max_tokens // 2
+
+        for unit, separator, starts_section in self._iter_units(text):
+            unit_tokens = self.count_tokens(unit)
+            section_break = starts_section and current_tokens >= min_section_tokens
+
+            if current and (section_break or current_tokens + unit_tokens > self.max_tokens):
+                yield self._join(current)
+                current = [] if section_break else self._overlap_tail(current)
+                current_tokens = sum(tokens for _, tokens, _ in current)
+
+                # Overlap + unidade nova ainda não cabem: descartar o overlap
+                if current_tokens + unit_tokens > self.max_tokens:
+                    current, current_tokens = [], 0
+
+            current.append((unit, unit_tokens, separator))
+            current_tokens += unit_tokens
+
+        if current:
+            yield self._join(current)
+
+    def _iter_units(self, text: str) -> Iterator[tuple]:
+        """
+        Gera (unidade, separador, inicia_seção).
+        Unidade é um parágrafo inteiro quando cabe no orçamento; senão suas
+        frases; frases grandes demais são quebradas por palavras.
+        """
+        for block in self._iter_blocks(text):
+            starts_section = bool(HEADING_RE.match(block))
+
+            if self.count_tokens(block) <= self.max_tokens:
+                yield block, "\n\n", starts_section
+                continue
+
+            first = True
+            for sentence in SENTENCE_SPLIT_RE.split(block):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                for piece in self._split_long_sentence(sentence):
+                    # Primeira unidade do bloco separa por parágrafo, as demais por espaço
+                    yield piece, "\n\n" if first else " ", starts_section and first
+                    first = False
+
+    def _iter_blocks(self, text: str) -> Iterator[str]:
+        """Parágrafos não vazios; títulos markdown viram blocos próprios"""
+        for paragraph in PARAGRAPH_SPLIT_RE.split(text):
+            lines: List[str] = []
+            for line in paragraph.splitlines():
+                if HEADING_RE.match(line) and lines:
+                    block = "\n".join(lines).strip()
+                    if block:
+                        yield block
+                    lines = []
+                lines.append(line)
+            block = "\n".join(lines).strip()
+            if block:
+                yield block
+
+    def _split_long_sentence(self, sentence: str) -> Iterator[str]:
+        """
+        Quebra uma frase maior que o orçamento em pedaços de palavras inteiras
+        (uma palavra sozinha maior que o orçamento sai inteira, acima dele)
+        """
+        if self.count_tokens(sentence) <= self.max_tokens:
+            yield sentence
+            return
+
+        words: List[str] = []
+        words_tokens = 0
+        for word in sentence.split():
+            word_tokens = self.count_tokens(" " + word)
+            if words and words_tokens + word_tokens > self.max_tokens:
+                yield " ".join(words)
+                words, words_tokens = [], 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            yield " ".join(words)
+
+    def _overlap_tail(self, units: List[tuple]) -> List[tuple]:
+        """Últimas unidades do chunk que cabem em overlap_tokens"""
+        tail: List[tuple] = []
+        tokens = 0
+        for unit in reversed(units):
+            if tokens + unit[1] > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+            tokens += unit[1]
+        return tail
+
+    @staticmethod
+    def _join(units: List[tuple]) -> str:
+        parts: List[str] = []
+        for i, (unit, _, separator) in enumerate(units):
+            if i:
+                parts.append(separator)
+            parts.append(unit)
+        return "".join(parts)
+
+
+_default_chunker: Optional[TextChunker] = None
+
+
+def get_text_chunker() -> TextChunker:
+    """Chunker padrão compartilhado (evita recarregar o encoding do tiktoken)"""
+    global _default_chunker
+    if _default_chunker is None:
+        _default_chunker = TextChunker()
+    return _default_chunker
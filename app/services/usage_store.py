@@ -0,0 +1,186 @@
+"""
+Persistência e relatórios do uso de tokens/custo (tabela usage_records).
+
+A rota do chat grava o summary() do RequestUsage junto com a resposta;
+o endpoint admin lê os rollups por dia, usuário e agente, e o custo por
+resposta ao lado da latência.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import User, UsageRecord
+
+
+def persist_usage(
+    db: Session,
+    summary: Optional[Dict[str, Any]],
+    user_id: int,
+    conversation_id: Optional[int] = None,
+    message_id: Optional[int] = None
+) -> Optional[str]:
+    """Adiciona as linhas do request na sessão (o commit fica com a rota). Retorna o request_id"""
+    if not summary or not summary.get("by_agent"):
+        return None
+
+    request_id = str(uuid.uuid4())
+    for entry in summary["by_agent"]:
+        db.add(UsageRecord(
+            request_id=request_id,
+            user_id=user_id,
+            conversation_id=conversation_id,
+            message_id=message_id,
+            agent=entry["agent"],
+            model=entry["model"],
+            calls=entry["calls"],
+            prompt_tokens=entry["prompt_tokens"],
+            completion_tokens=entry["completion_tokens"],
+            total_tokens=entry["total_tokens"],
+            cost_usd=entry["cost_usd"],
+            latency_ms=summary.get("latency_ms")
+        ))
+    return request_id
+
+
+def _start_of_day() -> datetime:
+    # created_at vem do server_default (UTC no PostgreSQL e no SQLite)
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def spend_since(db: Session, since: datetime, user_id: Optional[int] = None) -> float:
+    """Custo (USD) acumulado desde `since`, global ou de um usuário"""
+    query = db.query(func.coalesce(func.sum(UsageRecord.cost_usd), 0.0)).filter(UsageRecord.created_at >= since)
+    if user_id is not None:
+        query = query.filter(UsageRecord.user_id == user_id)
+    return float(query.scalar() or 0.0)
+
+
+def _budget_entry(spent: float, budget: float) -> Dict[str, Any]:
+    ratio = spent / budget if budget > 0 else 0.0
+    return {
+        "spent_usd": round(spent, 6),
+        "budget_usd": budget,
+        "ratio": round(ratio, 4),
+        "alert": budget > 0 and ratio >= settings.USAGE_BUDGET_ALERT_RATIO,
+        "exceeded": budget > 0 and ratio >= 1.0,
+    }
+
+
+def budget_status(db: Session, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Gasto do dia contra USAGE_DAILY_BUDGET_USD (e o do usuário, se informado)"""
+    today = _start_of_day()
+    status = {"global": _budget_entry(spend_since(db, today), settings.USAGE_DAILY_BUDGET_USD)}
+    if user_id is not None:
+        status["user"] = _budget_entry(spend_since(db, today, user_id), settings.USAGE_USER_DAILY_BUDGET_USD)
+    return status
+
+
+def check_budget(db: Session, user_id: int) -> Dict[str, Any]:
+    """Avisa no log quando o gasto do dia passa do limite de alerta ou do orçamento"""
+    status = budget_status(db, user_id)
+    for scope, entry in status.items():
+        if entry["exceeded"]:
+            print(f"⚠️ Orçamento diário ({scope}) excedido: ${entry['spent_usd']:.4f} de ${entry['budget_usd']:.2f}")
+        elif entry["alert"]:
+            print(f"⚠️ Orçamento diário ({scope}) em {entry['ratio']:.0%}: ${entry['spent_usd']:.4f} de ${entry['budget_usd']:.2f}")
+    return status
+
+
+def user_budget_exceeded(db: Session, user_id: int) -> bool:
+    """Usado pela rota com USAGE_ENFORCE_BUDGET ligado"""
+    budget = settings.USAGE_USER_DAILY_BUDGET_USD
+    return budget > 0 and spend_since(db, _start_of_day(), user_id) >= budget
+
+
+def _totals(row) -> Dict[str, Any]:
+    return {
+        "requests": row.requests,
+        "total_tokens": int(row.total_tokens or 0),
+        "cost_usd": round(float(row.cost_usd or 0.0), 6),
+    }
+
+
+def usage_report(db: Session, days: int = 7, recent: int = 20) -> Dict[str, Any]:
+    """Rollups dos últimos `days` dias + as últimas respostas (custo ao lado da latência)"""
+    since = _start_of_day() - timedelta(days=days - 1)
+    base = db.query(UsageRecord).filter(UsageRecord.created_at >= since).subquery()
+
+    totals = [
+        func.count(func.distinct(base.c.request_id)).label("requests"),
+        func.sum(base.c.total_tokens).label("total_tokens"),
+        func.sum(base.c.cost_usd).label("cost_usd"),
+    ]
+
+    day = func.date(base.c.created_at).label("day")
+    by_day = db.query(day, *totals).group_by(day).order_by(day).all()
+
+    by_user = (
+        db.query(base.c.user_id, User.email, *totals)
+        .join(User, User.id == base.c.user_id)
+        .group_by(base.c.user_id, User.email)
+        .order_by(func.sum(base.c.cost_usd).desc())
+        .all()
+    )
+
+    by_agent = (
+        db.query(base.c.agent, base.c.model, func.sum(base.c.calls).label("calls"), *totals)
+        .group_by(base.c.agent, base.c.model)
+        .order_by(func.sum(base.c.cost_usd).desc())
+        .all()
+    )
+
+    answers = (
+        db.query(
+            base.c.request_id,
+            func.min(base.c.user_id).label("user_id"),
+            func.min(base.c.conversation_id).label("conversation_id"),
+            func.min(base.c.message_id).label("message_id"),
+            func.max(base.c.latency_ms).label("latency_ms"),
+            func.max(base.c.created_at).label("created_at"),
+            func.sum(base.c.total_tokens).label("total_tokens"),
+            func.sum(base.c.cost_usd).label("cost_usd"),
+        )
+        .group_by(base.c.request_id)
+        .order_by(func.max(base.c.created_at).desc(), func.max(base.c.id).desc())
+        .limit(recent)
+        .all()
+    )
+
+    request_count = sum(row.requests for row in by_day)
+    total_cost = sum(float(row.cost_usd or 0.0) for row in by_day)
+    latencies = [row.latency_ms for row in answers if row.latency_ms is not None]
+
+    recent_answers: List[Dict[str, Any]] = [
+        {
+            "request_id": row.request_id,
+            "user_id": row.user_id,
+            "conversation_id": row.conversation_id,
+            "message_id": row.message_id,
+            "created_at": str(row.created_at),
+            "latency_ms": row.latency_ms,
+            "total_tokens": int(row.total_tokens or 0),
+            "cost_usd": round(float(row.cost_usd or 0.0), 6),
+        }
+        for row in answers
+    ]
+
+    return {
+        "days": days,
+        "since": since.date().isoformat(),
+        "requests": request_count,
+        "cost_usd": round(total_cost, 6),
+        "avg_cost_per_answer_usd": round(total_cost / request_count, 6) if request_count else 0.0,
+        "avg_latency_ms_recent": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        "by_day": [{"day": str(row.day), **_totals(row)} for row in by_day],
+        "by_user": [{"user_id": row.user_id, "email": row.email, **_totals(row)} for row in by_user],
+        "by_agent": [
+            {"agent": row.agent, "model": row.model, "calls": int(row.calls or 0), **_totals(row)}
+            for row in by_agent
+        ],
+        "recent": recent_answers,
+        "budget": budget_status(db),
+    }
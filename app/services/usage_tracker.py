@@ -0,0 +1,183 @@
+"""
+Contabilidade de tokens e custo por agente e por request.
+
+Cada request do chat abre um escopo (track_usage) guardado em um ContextVar;
+toda chamada à OpenAI (completions, instructor via create_with_completion e
+embeddings) chama record_usage com o `usage` da resposta. Fora de um escopo
+(ex.: scripts de ingestão) record_usage só anota o span atual.
+
+O custo usa PRICING (USD por 1M tokens), com override por USAGE_PRICING_OVERRIDES.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import LLM_CALLS, LLM_COST, LLM_TOKENS
+from app.core.telemetry import current_span, set_attributes
+
+
+# USD por 1M tokens (entrada, saída)
+PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+
+def parse_pricing_overrides(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Lê "modelo=entrada:saída,..." (USD por 1M tokens), ex.: "gpt-4.1=2:8" """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, prices = item.partition("=")
+        prompt_price, _, completion_price = prices.partition(":")
+        try:
+            overrides[model.strip()] = (float(prompt_price), float(completion_price or 0))
+        except ValueError:
+            raise ValueError(f"Preço inválido para {model}: {prices} (use modelo=entrada:saída)")
+    return overrides
+
+
+_pricing = {**PRICING, **parse_pricing_overrides(settings.USAGE_PRICING_OVERRIDES)}
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Custo de uma chamada (0 para modelos sem preço conhecido)"""
+    prompt_price, completion_price = _pricing.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@dataclass
+class UsageEntry:
+    """Tokens acumulados de um agente com um modelo"""
+    agent: str
+    model: str
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent,
+            "model": self.model,
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+@dataclass
+class RequestUsage:
+    """Uso de um request do chat, por (agente, modelo)"""
+    entries: Dict[Tuple[str, str], UsageEntry] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    latency_ms: Optional[float] = None
+
+    def add(self, agent: str, model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+        entry = self.entries.setdefault((agent, model), UsageEntry(agent=agent, model=model))
+        cost = cost_usd(model, prompt_tokens, completion_tokens)
+        entry.calls += 1
+        entry.prompt_tokens += prompt_tokens
+        entry.completion_tokens += completion_tokens
+        entry.cost_usd += cost
+        return cost
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(entry.total_tokens for entry in self.entries.values())
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(entry.cost_usd for entry in self.entries.values())
+
+    def finish(self) -> "RequestUsage":
+        self.latency_ms = round((time.perf_counter() - self.started_at) * 1000, 1)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo serializável (vai no resultado do chat e é persistido pela rota)"""
+        return {
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_ms": self.latency_ms,
+            "by_agent": [entry.to_dict() for entry in self.entries.values()],
+        }
+
+
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """Escopo de contabilidade de um request; devolve o RequestUsage"""
+    usage = RequestUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        usage.finish()
+        _current_usage.reset(token)
+
+
+def start_tracking() -> Tuple[RequestUsage, Token]:
+    """
+    Como track_usage, para geradores (process_query_streaming): o escopo
+    fica aberto até o fim do request, sem atravessar o yield com um `with`.
+    Devolve o RequestUsage e o token para stop_tracking, chamado no finally
+    do gerador (senão o uso vaza para o resto da task, ex.: a rota de SSE).
+    """
+    usage = RequestUsage()
+    return usage, _current_usage.set(usage)
+
+
+def stop_tracking(token: Token) -> None:
+    """Fecha o escopo aberto por start_tracking"""
+    try:
+        _current_usage.reset(token)
+    except ValueError:
+        # Gerador finalizado em outro contexto (ex.: cliente desconectou e o
+        # aclose veio do event loop): não há escopo a restaurar nesse contexto
+        pass
+
+
+def record_usage(agent: str, model: str, usage: Any) -> None:
+    """
+    Registra o `usage` de uma resposta da OpenAI (completion ou embedding) no
+    request atual, nas métricas llm_* e no span da etapa.
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+    request_usage = _current_usage.get()
+    cost = (
+        request_usage.add(agent, model, prompt_tokens, completion_tokens)
+        if request_usage is not None
+        else cost_usd(model, prompt_tokens, completion_tokens)
+    )
+    LLM_CALLS.inc(agent=agent, model=model)
+    LLM_TOKENS.inc(prompt_tokens, agent=agent, model=model, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, agent=agent, model=model, kind="completion")
+    LLM_COST.inc(cost, agent=agent, model=model)
+    set_attributes(
+        current_span(),
+        llm__model=model,
+        llm__prompt_tokens=prompt_tokens,
+        llm__completion_tokens=completion_tokens,
+        llm__cost_usd=round(cost, 6)
+    )
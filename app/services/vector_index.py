@@ -0,0 +1,349 @@
+"""
+Índice vetorial exato em memória (NumPy) sobre todas as collections do Chroma.
+
+Os embeddings ficam em matrizes contíguas (linhas normalizadas), uma por tipo
+de armazenamento (float32, float16 ou int8), com um offset [início, fim) por
+categoria. Uma busca em N categorias é um produto matriz-vetor por matriz +
+argpartition por categoria — busca de cosseno exata, sem round-trips ao
+SQLite do Chroma.
+
+O tipo de armazenamento pode ser escolhido por collection: int8 usa uma
+escala por linha (quantização simétrica) e ocupa 1/4 da memória do float32.
+
+Filtros estruturados (SearchFilters) viram uma máscara sobre as colunas de
+metadata do snapshot, aplicada antes do top-k.
+
+O snapshot é imutável e trocado atomicamente quando a versão das collections
+muda (nome + quantidade de documentos de cada uma).
+
+Com mmap_directory, o snapshot vem do layout em disco (ver mmap_index) em vez
+de cópias privadas lidas do Chroma: vários workers mapeiam os mesmos arquivos.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import FilterColumns, SearchFilters
+
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+
+@dataclass(frozen=True)
+class IndexSegment:
+    """Matriz contígua de um tipo de armazenamento"""
+    dtype: str
+    matrix: np.ndarray                # (n, D)
+    scales: Optional[np.ndarray]      # int8: escala por linha (n,)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Cosseno (float32) das linhas [start, end) com a query normalizada"""
+        if self.dtype == "int8":
+            block = self.matrix[start:end].astype(np.float32)
+            return (block @ query) * self.scales[start:end]
+        scores = self.matrix[start:end] @ query.astype(self.matrix.dtype)
+        return scores.astype(np.float32, copy=False)
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Estado imutável do índice (substituído por inteiro a cada reload)"""
+    version: Tuple
+    segments: Dict[str, IndexSegment]
+    # categoria -> (dtype do segmento, início no segmento, fim no segmento, início global)
+    locations: Dict[ChunkCategory, Tuple[str, int, int, int]]
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    columns: FilterColumns
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(segment.nbytes for segment in self.segments.values())
+
+    @property
+    def dimensions(self) -> int:
+        for segment in self.segments.values():
+            return segment.matrix.shape[1]
+        return 0
+
+
+def collections_version(collections: Dict[ChunkCategory, Any]) -> Tuple:
+    """Versão barata das collections: (categoria, nome, count) de cada uma"""
+    return tuple(
+        (category.value, collection.name, collection.count())
+        for category, collection in collections.items()
+    )
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Converte uma matriz float32 normalizada para o tipo de armazenamento"""
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    return matrix.astype(np.float16 if dtype == "float16" else np.float32), None
+
+
+def parse_dtype_overrides(spec: str) -> Dict[str, str]:
+    """
+    Lê "collection=dtype,collection=dtype" (ex.: "portfolio_facts=int8").
+    Aceita o nome da collection ou o valor da categoria.
+    """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, dtype = item.partition("=")
+        dtype = dtype.strip()
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype não suportado para {name}: {dtype} (use {', '.join(SUPPORTED_DTYPES)})")
+        overrides[name.strip()] = dtype
+    return overrides
+
+
+class LocalVectorIndex:
+    """Busca exata por cosseno em todas as categorias com um matmul por tipo de armazenamento"""
+
+    def __init__(
+        self,
+        dtype: str = "float32",
+        refresh_seconds: float = 30.0,
+        dtype_overrides: Optional[Dict[str, str]] = None,
+        mmap_directory: Optional[str] = None
+    ):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype não suportado: {dtype} (use {', '.join(SUPPORTED_DTYPES)})")
+
+        self.dtype = dtype
+        self.dtype_overrides = dtype_overrides or {}
+        self.refresh_seconds = refresh_seconds
+        self.mmap_directory = mmap_directory
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        return self._snapshot
+
+    def dtype_for(self, category: ChunkCategory, collection_name: Optional[str] = None) -> str:
+        """Tipo de armazenamento de uma categoria (override por collection ou padrão)"""
+        if collection_name and collection_name in self.dtype_overrides:
+            return self.dtype_overrides[collection_name]
+        return self.dtype_overrides.get(category.value, self.dtype)
+
+    def ensure_fresh(self, collections: Dict[ChunkCategory, Any]) -> IndexSnapshot:
+        """
+        Retorna o snapshot atual, recarregando se a versão mudou.
+        A versão é verificada no máximo a cada refresh_seconds.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+
+        if snapshot is not None and now - self._last_check < self.refresh_seconds:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._last_check < self.refresh_seconds:
+                return snapshot
+
+            version = collections_version(collections)
+            if snapshot is None or snapshot.version != version:
+                if self.mmap_directory:
+                    snapshot = self.map_shared(collections, version)
+                else:
+                    snapshot = self.load(collections, version)
+            self._last_check = time.monotonic()
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Força a verificação de versão na próxima busca"""
+        self._last_check = 0.0
+
+    def map_shared(self, collections: Dict[ChunkCategory, Any], version: Optional[Tuple] = None) -> IndexSnapshot:
+        """
+        Mapeia o layout em disco da versão atual. Se ele não existir ou estiver
+        desatualizado, o primeiro worker a chegar lê o Chroma e grava o layout;
+        os demais esperam o lock e só mapeiam.
+        """
+        from app.services.mmap_index import layout_lock, map_layout, write_layout
+
+        version = version or collections_version(collections)
+        with layout_lock(self.mmap_directory):
+            mapped = map_layout(self.mmap_directory, version)
+            if mapped is None:
+                write_layout(self.load(collections, version), self.mmap_directory)
+                mapped = map_layout(self.mmap_directory, version)
+
+        self._snapshot = mapped
+        return mapped
+
+    def share(self) -> Optional[IndexSnapshot]:
+        """Grava o snapshot atual no layout em disco e passa a usar a versão mapeada"""
+        from app.services.mmap_index import layout_lock, map_layout, write_layout
+
+        if not self.mmap_directory or self._snapshot is None:
+            return self._snapshot
+        with layout_lock(self.mmap_directory):
+            write_layout(self._snapshot, self.mmap_directory)
+            self._snapshot = map_layout(self.mmap_directory)
+        return self._snapshot
+
+    def load(self, collections: Dict[ChunkCategory, Any], version: Optional[Tuple] = None) -> IndexSnapshot:
+        """Lê todas as collections do Chroma e troca o snapshot atomicamente"""
+        version = version or collections_version(collections)
+
+        data = {}
+        dtypes = {}
+        for category, collection in collections.items():
+            data[category] = collection.get(include=["embeddings", "documents", "metadatas"])
+            dtypes[category] = self.dtype_for(category, collection.name)
+
+        return self.build(data, version, dtypes)
+
+    def build(
+        self,
+        data: Dict[ChunkCategory, Dict[str, Any]],
+        version: Tuple = (),
+        dtypes: Optional[Dict[ChunkCategory, str]] = None
+    ) -> IndexSnapshot:
+        """
+        Monta o snapshot a partir de {categoria: {ids, embeddings, documents, metadatas}}
+        e o torna o snapshot atual.
+        """
+        dtypes = dtypes or {category: self.dtype_for(category) for category in data}
+
+        blocks: Dict[str, List[np.ndarray]] = {}
+        segment_sizes: Dict[str, int] = {}
+        locations: Dict[ChunkCategory, Tuple[str, int, int, int]] = {}
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+
+        for category, items in data.items():
+            dtype = dtypes[category]
+            count = len(items["ids"])
+            seg_start = segment_sizes.get(dtype, 0)
+
+            if count:
+                blocks.setdefault(dtype, []).append(np.asarray(items["embeddings"], dtype=np.float32))
+                segment_sizes[dtype] = seg_start + count
+
+            locations[category] = (dtype, seg_start, seg_start + count, len(ids))
+            ids.extend(items["ids"])
+            documents.extend(items.get("documents") or [""] * count)
+            metadatas.extend(items.get("metadatas") or [{}] * count)
+
+        segments = {}
+        for dtype, dtype_blocks in blocks.items():
+            matrix, scales = quantize(_normalize_rows(np.vstack(dtype_blocks)), dtype)
+            segments[dtype] = IndexSegment(dtype=dtype, matrix=np.ascontiguousarray(matrix), scales=scales)
+
+        snapshot = IndexSnapshot(
+            version=version,
+            segments=segments,
+            locations=locations,
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            columns=FilterColumns.from_metadatas(metadatas)
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def search(
+        self,
+        query_embedding: List[float],
+        n_by_category: Dict[ChunkCategory, int],
+        snapshot: Optional[IndexSnapshot] = None,
+        search_filters: Optional[SearchFilters] = None
+    ) -> Dict[ChunkCategory, Dict[str, Any]]:
+        """
+        Top-n por categoria para um embedding de query (só entre as linhas que
+        passam por search_filters, se informado).
+        Retorna o mesmo formato de EmbeddingService.search_collection
+        (distances = 1 - cosseno, como no Chroma com hnsw:space=cosine).
+        """
+        snapshot = snapshot or self._snapshot
+        results: Dict[ChunkCategory, Dict[str, Any]] = {}
+
+        if snapshot is None or snapshot.size == 0:
+            return {category: _empty_result() for category in n_by_category}
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != snapshot.dimensions:
+            raise ValueError(
+                f"Embedding da query com {query.shape[-1] if query.ndim else 0} dimensões, índice com "
+                f"{snapshot.dimensions}: re-indexe as collections ou ajuste EMBEDDING_DIMENSIONS"
+            )
+
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        # Um único matmul por segmento, cobrindo as categorias pedidas
+        ranges: Dict[str, Tuple[int, int]] = {}
+        for category in n_by_category:
+            dtype, start, end, _ = snapshot.locations.get(category, (None, 0, 0, 0))
+            if dtype is None or end <= start:
+                continue
+            lo, hi = ranges.get(dtype, (start, end))
+            ranges[dtype] = (min(lo, start), max(hi, end))
+
+        scores = {
+            dtype: (lo, snapshot.segments[dtype].scores(query, lo, hi))
+            for dtype, (lo, hi) in ranges.items()
+        }
+
+        for category, n_results in n_by_category.items():
+            dtype, start, end, global_start = snapshot.locations.get(category, (None, 0, 0, 0))
+            if dtype is None or end <= start or n_results <= 0:
+                results[category] = _empty_result()
+                continue
+
+            lo, segment_scores = scores[dtype]
+            block = segment_scores[start - lo:end - lo]
+            candidates = None
+            if search_filters is not None:
+                candidates = np.flatnonzero(search_filters.mask(snapshot.columns, global_start, global_start + end - start))
+                block = block[candidates]
+
+            k = min(n_results, len(block))
+            if k == 0:
+                results[category] = _empty_result()
+                continue
+            top = np.argpartition(-block, k - 1)[:k] if k < len(block) else np.arange(len(block))
+            top = top[np.argsort(-block[top], kind="stable")]
+
+            rows = (candidates[top] if candidates is not None else top) + global_start
+            results[category] = {
+                "ids": [snapshot.ids[i] for i in rows],
+                "documents": [snapshot.documents[i] for i in rows],
+                "metadatas": [snapshot.metadatas[i] for i in rows],
+                "distances": [float(1.0 - s) for s in block[top]]
+            }
+
+        return results
+
+
+def _empty_result() -> Dict[str, Any]:
+    return {"ids": [], "documents": [], "metadatas": [], "distances": []}
@@ -0,0 +1,128 @@
+"""
+Profiler de startup: mede o custo de import de cada módulo.
+
+Roda `python -X importtime -c "import <módulo>"` em um processo novo (cache de
+imports frio) e resume o resultado por módulo e por pacote de topo.
+
+Uso:
+    python -m app.startup_profile                      # app.main, top 25
+    python -m app.startup_profile --module scripts.ingest_forensic
+    python -m app.startup_profile --top 50 --json
+    python -m app.startup_profile --max-total-ms 1500  # falha (exit 1) se passar do limite
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Dependências pesadas que não deveriam ser importadas pelo app.main
+HEAVY_MODULES = ["chromadb", "cohere", "instructor", "pandas", "PyPDF2", "boto3"]
+
+
+def run_importtime(module: str) -> str:
+    """Executa o import em um subprocesso e devolve a saída do -X importtime"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH", "")]))
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+    return result.stderr
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """
+    Converte as linhas "import time: self | cumulative | módulo" em
+    [(módulo, self_us, cumulative_us)].
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows: List[Tuple[str, int, int]], top: int) -> Dict:
+    """Top módulos por tempo cumulativo, tempo por pacote de topo e total"""
+    by_package: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    imported = {name for name, _, _ in rows}
+
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _ in rows) / 1000, 1),
+        "modules_imported": len(rows),
+        "top_modules": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cum_us / 1000, 1)}
+            for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+        ],
+        "top_packages": [
+            {"package": package, "ms": round(us / 1000, 1)}
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in imported],
+    }
+
+
+def print_report(module: str, report: Dict) -> None:
+    print("=" * 70)
+    print(f"STARTUP PROFILE: import {module}")
+    print("=" * 70)
+    print(f"Total: {report['total_ms']} ms ({report['modules_imported']} módulos)")
+
+    print(f"\n{'Módulo':<50} {'self ms':>9} {'cum ms':>9}")
+    print("-" * 70)
+    for row in report["top_modules"]:
+        print(f"{row['module'][:50]:<50} {row['self_ms']:>9} {row['cumulative_ms']:>9}")
+
+    print(f"\n{'Pacote':<50} {'ms':>9}")
+    print("-" * 70)
+    for row in report["top_packages"]:
+        print(f"{row['package'][:50]:<50} {row['ms']:>9}")
+
+    heavy = report["heavy_modules_loaded"]
+    print(f"\nDependências pesadas carregadas: {', '.join(heavy) if heavy else 'nenhuma'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Custo de import por módulo (cold start)")
+    parser.add_argument("--module", default="app.main", help="Módulo a importar (padrão: app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Quantidade de linhas por tabela")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    parser.add_argument("--max-total-ms", type=float, help="Falhar se o total passar deste valor")
+    args = parser.parse_args()
+
+    report = summarize(parse_importtime(run_importtime(args.module)), args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(args.module, report)
+
+    if args.max_total_ms is not None and report["total_ms"] > args.max_total_ms:
+        print(f"\n❌ Import de {args.module} levou {report['total_ms']} ms (limite: {args.max_total_ms} ms)")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
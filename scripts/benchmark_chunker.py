@@ -0,0 +1,132 @@
+"""
+Benchmark do chunker: janela fixa de caracteres (antigo) x TextChunker (tokens).
+
+Reporta, para cada estratégia: número de chunks, chunks/seg, média de tokens
+por chunk e quantos chunks começam/terminam cortando uma palavra ou número.
+
+Uso:
+    python scripts/benchmark_chunker.py                  # arquivos .txt/.md de data/raw
+    python scripts/benchmark_chunker.py arquivo1.txt ...  # arquivos específicos
+    python scripts/benchmark_chunker.py --max-tokens 384 --repeat 5
+"""
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.text_chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, TextChunker
+
+DEFAULT_DATA_PATH = Path(__file__).parent.parent / "data" / "raw"
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+# Texto sintético usado quando não há arquivos (números, títulos, parágrafos)
+SAMPLE_TEXT = """# Portfolio 2008 - Q3
+
+O portfolio apresentou perda de 23,45% no trimestre. O valor total caiu de USD 1.234.567,89 para USD 945.123,10. A exposição a produtos estruturados chegou a 41,2% do patrimônio.
+
+## Taxas
+
+As taxas de administração somaram USD 12.345,67 no período. Foram cobradas taxas de performance mesmo com retorno negativo de -8,7% sobre o benchmark.
+
+## Violações
+
+O perfil do cliente era conservador (risco 2 de 5). A alocação em renda variável de 62% viola o mandato acordado em 15/03/2006. Nenhuma comunicação de risco foi enviada entre 01/07/2008 e 30/09/2008.
+"""
+
+NUMBER_OR_WORD_EDGE = re.compile(r"\w")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list:
+    """Chunker antigo: janela fixa de caracteres"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += (chunk_size - overlap)
+    return chunks
+
+
+def collapse_whitespace(text: str) -> str:
+    """O TextChunker refaz os separadores (espaço / linha em branco); comparar sem eles"""
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def count_broken_edges(text: str, chunks: list) -> int:
+    """Chunks cujo início ou fim corta uma palavra/número do texto original"""
+    text = collapse_whitespace(text)
+    broken = 0
+    position = 0
+    for chunk in chunks:
+        chunk = collapse_whitespace(chunk)
+        start = text.find(chunk, max(0, position - len(chunk)))
+        if start < 0:
+            start = text.find(chunk)
+        if start < 0:
+            continue
+        end = start + len(chunk)
+        cut_start = start > 0 and NUMBER_OR_WORD_EDGE.match(text[start - 1]) and NUMBER_OR_WORD_EDGE.match(text[start])
+        cut_end = end < len(text) and NUMBER_OR_WORD_EDGE.match(text[end - 1]) and NUMBER_OR_WORD_EDGE.match(text[end])
+        if cut_start or cut_end:
+            broken += 1
+        position = start + 1
+    return broken
+
+
+def load_texts(paths: list) -> list:
+    if not paths:
+        if DEFAULT_DATA_PATH.exists():
+            paths = [p for p in DEFAULT_DATA_PATH.rglob("*") if p.suffix.lower() in TEXT_EXTENSIONS]
+        if not paths:
+            print("Nenhum arquivo encontrado, usando texto sintético (x200)")
+            return [SAMPLE_TEXT * 200]
+    return [Path(p).read_text(encoding="utf-8", errors="ignore") for p in paths]
+
+
+def run(name: str, chunk_fn, texts: list, chunker: TextChunker, repeat: int) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [chunk_fn(text) for text in texts]
+    elapsed = (time.perf_counter() - start) / repeat
+
+    all_chunks = [chunk for chunks in results for chunk in chunks]
+    total = len(all_chunks)
+    tokens = [chunker.count_tokens(chunk) for chunk in all_chunks]
+    broken = sum(count_broken_edges(text, chunks) for text, chunks in zip(texts, results))
+
+    print(f"\n{name}")
+    print(f"  Chunks:              {total}")
+    print(f"  Chunks/seg:          {total / elapsed:,.0f}" if elapsed else "  Chunks/seg:          -")
+    print(f"  Média tokens/chunk:  {sum(tokens) / total:.1f}" if total else "  Média tokens/chunk:  -")
+    print(f"  Máx tokens/chunk:    {max(tokens) if tokens else 0}")
+    print(f"  Total tokens (embed): {sum(tokens)}")
+    print(f"  Cortes no meio de palavra/número: {broken}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do chunker de texto")
+    parser.add_argument("files", nargs="*", help="Arquivos de texto (padrão: data/raw)")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_texts(args.files)
+    chunker = TextChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+
+    print("=" * 60)
+    print("BENCHMARK DO CHUNKER")
+    print("=" * 60)
+    print(f"Textos: {len(texts)} ({sum(len(t) for t in texts):,} caracteres)")
+    print(f"Contagem de tokens: {'tiktoken' if chunker.uses_tiktoken else 'aproximada'}")
+
+    run("Janela de caracteres (1000/200)", legacy_chunk_text, texts, chunker, args.repeat)
+    run(f"TextChunker ({args.max_tokens}/{args.overlap_tokens} tokens)", chunker.chunk, texts, chunker, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark de embeddings reduzidos e quantizados no índice vetorial local.
+
+Para cada combinação (dimensão x tipo de armazenamento) reporta:
+- recall@k contra a busca exata float32 com 1536 dimensões
+- memória do índice
+- latência da busca (todas as categorias de uma vez)
+
+As perguntas são as 50 perguntas golden de scripts/test_ai_responses.py.
+Os embeddings das perguntas são gerados uma vez (OpenAI) e ficam em cache.
+
+Dimensões reduzidas são simuladas truncando os vetores de 1536 dimensões e
+renormalizando — o mesmo resultado do parâmetro `dimensions` do
+text-embedding-3-small — então o corpus não precisa ser re-embedado.
+
+Uso:
+    python scripts/benchmark_embeddings.py
+    python scripts/benchmark_embeddings.py --k 8 --dims 1536,512,256 --dtypes float32,int8
+    python scripts/benchmark_embeddings.py --synthetic 5000   # sem Chroma/OpenAI
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.chunks import ChunkCategory
+from app.services.vector_index import LocalVectorIndex, SUPPORTED_DTYPES
+
+DEFAULT_QUERY_CACHE = Path(__file__).parent.parent / "data" / "benchmarks" / "golden_query_embeddings.json"
+
+
+def load_golden_questions() -> list:
+    from scripts.test_ai_responses import PERGUNTAS
+    return [item["pergunta"] for item in PERGUNTAS]
+
+
+def embed_questions(questions: list, cache_path: Path) -> np.ndarray:
+    """Embeddings das perguntas em 1536 dimensões (com cache em disco)"""
+    if cache_path.exists():
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("questions") == questions:
+            return np.asarray(cached["embeddings"], dtype=np.float32)
+
+    from openai import OpenAI
+    from app.core.config import settings
+
+    print("Gerando embeddings das perguntas golden (OpenAI)...")
+    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    response = client.embeddings.create(model="text-embedding-3-small", input=questions)
+    embeddings = [item.embedding for item in response.data]
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps({"questions": questions, "embeddings": embeddings}), encoding="utf-8")
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def load_corpus_from_chroma() -> dict:
+    """{categoria: {ids, embeddings, documents, metadatas}} de todas as collections"""
+    from app.services.embedding_service import EmbeddingService
+
+    service = EmbeddingService()
+    corpus = {}
+    for category, collection in service.collections.items():
+        data = collection.get(include=["embeddings"])
+        if data["ids"]:
+            corpus[category] = {
+                "ids": data["ids"],
+                "embeddings": np.asarray(data["embeddings"], dtype=np.float32),
+            }
+    return corpus
+
+
+def synthetic_corpus(size: int, dims: int = 1536, n_queries: int = 50, seed: int = 42):
+    """
+    Corpus aleatório com variância decrescente por dimensão (como embeddings
+    Matryoshka: as primeiras dimensões carregam mais informação).
+    """
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dims) / 64.0)
+    categories = list(ChunkCategory)
+
+    corpus = {}
+    per_category = max(1, size // len(categories))
+    for category in categories:
+        vectors = (rng.normal(size=(per_category, dims)) * decay).astype(np.float32)
+        corpus[category] = {
+            "ids": [f"{category.value}_{i}" for i in range(per_category)],
+            "embeddings": vectors,
+        }
+
+    # Queries = vetores do corpus com ruído
+    all_vectors = np.vstack([items["embeddings"] for items in corpus.values()])
+    picks = rng.choice(len(all_vectors), size=n_queries, replace=False)
+    queries = all_vectors[picks] + rng.normal(size=(n_queries, dims)).astype(np.float32) * decay * 0.5
+    return corpus, queries
+
+
+def truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    truncated = matrix[:, :dims]
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
+
+
+def build_index(corpus: dict, dims: int, dtype: str) -> LocalVectorIndex:
+    index = LocalVectorIndex(dtype=dtype)
+    index.build({
+        category: {"ids": items["ids"], "embeddings": truncate(items["embeddings"], dims)}
+        for category, items in corpus.items()
+    })
+    return index
+
+
+def run_queries(index: LocalVectorIndex, queries: np.ndarray, n_by_category: dict):
+    """Retorna (resultados por query, latências em µs)"""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        result = index.search(query, n_by_category)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        results.append({category: set(r["ids"]) for category, r in result.items()})
+    return results, latencies
+
+
+def recall_at_k(results: list, truth: list) -> float:
+    hits = total = 0
+    for result, expected in zip(results, truth):
+        for category, expected_ids in expected.items():
+            if expected_ids:
+                hits += len(result[category] & expected_ids)
+                total += len(expected_ids)
+    return hits / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de dimensões/quantização dos embeddings")
+    parser.add_argument("--k", type=int, default=5, help="Top-k por categoria")
+    parser.add_argument("--dims", default="1536,1024,512,256", help="Dimensões a testar")
+    parser.add_argument("--dtypes", default=",".join(SUPPORTED_DTYPES), help="Tipos de armazenamento")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Recall mínimo para a recomendação")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usar corpus sintético com N vetores")
+    parser.add_argument("--query-cache", default=str(DEFAULT_QUERY_CACHE), help="Cache dos embeddings das perguntas")
+    args = parser.parse_args()
+
+    dims_list = [int(d) for d in args.dims.split(",")]
+    dtypes = [d.strip() for d in args.dtypes.split(",")]
+
+    if args.synthetic:
+        corpus, queries = synthetic_corpus(args.synthetic)
+        source = f"sintético ({args.synthetic} vetores)"
+    else:
+        corpus = load_corpus_from_chroma()
+        if not corpus:
+            print("❌ Nenhum embedding no Chroma. Rode a ingestão ou use --synthetic N")
+            return
+        queries = embed_questions(load_golden_questions(), Path(args.query_cache))
+        source = "Chroma + perguntas golden"
+
+    full_dims = next(iter(corpus.values()))["embeddings"].shape[1]
+    dims_list = [d for d in dims_list if d <= full_dims]
+    n_by_category = {category: args.k for category in corpus}
+
+    print("=" * 78)
+    print("BENCHMARK DE EMBEDDINGS (dimensão x quantização)")
+    print("=" * 78)
+    print(f"Fonte: {source}")
+    print(f"Vetores: {sum(len(i['ids']) for i in corpus.values())} em {len(corpus)} categorias | "
+          f"queries: {len(queries)} | k={args.k} | referência: float32 {full_dims}d")
+
+    # Referência: busca exata float32 com todas as dimensões
+    reference = build_index(corpus, full_dims, "float32")
+    truth, _ = run_queries(reference, queries, n_by_category)
+
+    rows = []
+    for dims in dims_list:
+        for dtype in dtypes:
+            index = build_index(corpus, dims, dtype)
+            # Queries reduzidas como o corpus (o índice exige a mesma dimensão)
+            dims_queries = truncate(queries, dims)
+            run_queries(index, dims_queries[:5], n_by_category)  # aquecer
+            results, latencies = run_queries(index, dims_queries, n_by_category)
+            rows.append({
+                "dims": dims,
+                "dtype": dtype,
+                "recall": recall_at_k(results, truth),
+                "memory_mb": index.snapshot.nbytes / 1024 / 1024,
+                "p50_us": float(np.percentile(latencies, 50)),
+                "p95_us": float(np.percentile(latencies, 95)),
+            })
+
+    print(f"\n{'dims':>6} {'dtype':>8} {'recall@k':>9} {'memória MB':>11} {'p50 µs':>9} {'p95 µs':>9}")
+    print("-" * 58)
+    for row in rows:
+        print(f"{row['dims']:>6} {row['dtype']:>8} {row['recall']:>9.3f} {row['memory_mb']:>11.2f} "
+              f"{row['p50_us']:>9.0f} {row['p95_us']:>9.0f}")
+
+    eligible = [row for row in rows if row["recall"] >= args.min_recall]
+    if eligible:
+        best = min(eligible, key=lambda row: (row["memory_mb"], row["p50_us"]))
+        print(f"\n✅ Mais barato com recall@{args.k} >= {args.min_recall}: "
+              f"{best['dims']} dims / {best['dtype']} ({best['memory_mb']:.2f} MB, recall {best['recall']:.3f})")
+        print(f"   EMBEDDING_DIMENSIONS={best['dims']}  LOCAL_VECTOR_INDEX_DTYPE={best['dtype']}")
+    else:
+        print(f"\n⚠️  Nenhuma configuração atingiu recall@{args.k} >= {args.min_recall}")
+
+
+if __name__ == "__main__":
+    main()
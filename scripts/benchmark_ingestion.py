@@ -0,0 +1,277 @@
+"""
+Benchmark de throughput da ingestão (processadores de app/processors).
+
+Roda o process_all() de cada processador (statements, fees, timeline,
+forensic, ubs_docs) sobre data/raw e sobre cópias escaladas (10x, 100x...) e
+reporta arquivos/s, chunks/s, pico de RSS e a divisão do tempo entre:
+- parse: json.load, divisão do markdown em seções, extração de texto dos PDFs
+- chunks: construção dos modelos de chunk (o resto do process_all)
+- metadata: model_dump + normalize_metadata, como a ingestão prepara cada chunk
+Embeddings e Chroma ficam de fora (ver scripts/benchmark_embeddings.py).
+
+Cada (processador, escala) roda em um subprocesso próprio, para o pico de RSS
+não herdar memória das rodadas anteriores (o RSS dos workers do pool de PDFs
+sai como "filhos"). As cópias de PDF recebem um comentário no fim do arquivo,
+para não caírem no cache de texto por hash; o cache é sempre um diretório
+temporário (extração a frio).
+
+Uso:
+    python scripts/benchmark_ingestion.py
+    python scripts/benchmark_ingestion.py --scales 1,10                  # mais rápido que o padrão 1,10,100
+    python scripts/benchmark_ingestion.py --processors statements,ubs_docs --scales 1,10
+    python scripts/benchmark_ingestion.py --data-dir /caminho/arquivo_cliente --output ingestion.json
+"""
+import sys
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_DATA_PATH = Path(__file__).parent.parent / "data" / "raw"
+RESULT_PREFIX = "RESULT "
+
+# Processador -> subpasta de data/raw e arquivos que o process_all lê
+PROCESSORS = {
+    "statements": {"dir": "statements", "pattern": "*.json"},
+    "fees": {"dir": "fees", "pattern": "*.json"},
+    "timeline": {"dir": "timeline", "pattern": "*.json"},
+    "forensic": {"dir": "forensic", "pattern": "*.md"},
+    "ubs_docs": {"dir": "ubs_official", "pattern": "*.pdf"},
+}
+
+# Mesmo exclude de scripts/ingest_forensic.py
+METADATA_EXCLUDE = {"content", "chunk_id", "content_pt"}
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ============================================================
+# Worker (um processador em um subprocesso)
+# ============================================================
+
+class PhaseClock:
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed_attribute(owner: Any, name: str, clock: PhaseClock, phase: str, generator: bool = False):
+    """Troca owner.name por uma versão que soma o tempo gasto em `phase`"""
+    original = getattr(owner, name)
+
+    if generator:
+        def wrapper(*args, **kwargs):
+            iterator = original(*args, **kwargs)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    clock.add(phase, time.perf_counter() - start)
+                    return
+                clock.add(phase, time.perf_counter() - start)
+                yield item
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                clock.add(phase, time.perf_counter() - start)
+
+    setattr(owner, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(owner, name, original)
+
+
+def build_processor(name: str, directory: Path, cache_dir: str):
+    from app.processors import FeesProcessor, ForensicProcessor, StatementsProcessor, TimelineProcessor, UBSDocsProcessor
+
+    if name == "statements":
+        return StatementsProcessor(str(directory))
+    if name == "fees":
+        return FeesProcessor(str(directory))
+    if name == "timeline":
+        return TimelineProcessor(str(directory))
+    if name == "forensic":
+        return ForensicProcessor(str(directory))
+    return UBSDocsProcessor(str(directory), cache_dir=cache_dir)
+
+
+def parse_phase(name: str, processor: Any, clock: PhaseClock):
+    """Onde cada processador faz o parsing do arquivo de origem"""
+    if name == "forensic":
+        return timed_attribute(type(processor), "_split_by_sections", clock, "parse")
+    if name == "ubs_docs":
+        return timed_attribute(type(processor), "_iter_pdf_pages", clock, "parse", generator=True)
+    return timed_attribute(json, "load", clock, "parse")
+
+
+def run_worker(name: str, directory: Path) -> Dict[str, Any]:
+    from app.services.chunk_metadata import normalize_metadata
+
+    baseline_rss = peak_rss_mb()
+    files = sorted(directory.glob(PROCESSORS[name]["pattern"]))
+    clock = PhaseClock()
+    output = io.StringIO()
+
+    with tempfile.TemporaryDirectory(prefix="bench_ingestion_cache_") as cache_dir:
+        processor = build_processor(name, directory, cache_dir)
+        start = time.perf_counter()
+        with parse_phase(name, processor, clock), redirect_stdout(output):
+            result = processor.process_all()
+        process_seconds = time.perf_counter() - start
+
+    chunks = [chunk for group in result.values() for chunk in group] if isinstance(result, dict) else result
+
+    start = time.perf_counter()
+    prepared = [
+        {
+            "chunk_id": chunk.chunk_id,
+            "content": chunk.content,
+            "metadata": normalize_metadata(chunk.model_dump(exclude=METADATA_EXCLUDE)),
+        }
+        for chunk in chunks
+    ]
+    metadata_seconds = time.perf_counter() - start
+
+    parse_seconds = clock.seconds.get("parse", 0.0)
+    total_seconds = process_seconds + metadata_seconds
+    return {
+        "processor": name,
+        "files": len(files),
+        "bytes": sum(path.stat().st_size for path in files),
+        "chunks": len(prepared),
+        "errors": sum(1 for line in output.getvalue().splitlines() if line.strip().startswith("✗")),
+        "seconds": {
+            "parse": round(parse_seconds, 4),
+            "chunks": round(max(process_seconds - parse_seconds, 0.0), 4),
+            "metadata": round(metadata_seconds, 4),
+            "total": round(total_seconds, 4),
+        },
+        "files_per_s": round(len(files) / total_seconds, 2) if total_seconds else 0.0,
+        "chunks_per_s": round(len(prepared) / total_seconds, 1) if total_seconds else 0.0,
+        "rss_baseline_mb": round(baseline_rss, 1),
+        "rss_peak_mb": round(peak_rss_mb(), 1),
+        "rss_children_peak_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+
+
+# ============================================================
+# Cópias escaladas e orquestração
+# ============================================================
+
+def build_scaled_copy(source: Path, target: Path, pattern: str, scale: int) -> None:
+    """scale cópias de cada arquivo; PDFs ganham um comentário final (hash diferente)"""
+    target.mkdir(parents=True, exist_ok=True)
+    for path in sorted(source.glob(pattern)):
+        for copy in range(scale):
+            destination = target / f"copy{copy:03d}_{path.name}"
+            shutil.copyfile(path, destination)
+            if path.suffix.lower() == ".pdf":
+                with open(destination, "ab") as f:
+                    f.write(f"\n% benchmark copy {copy}\n".encode("ascii"))
+
+
+def run_in_subprocess(name: str, directory: Path) -> Dict[str, Any]:
+    command = [sys.executable, __file__, "--worker", name, "--data-dir", str(directory)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{name}: worker saiu com código {completed.returncode}\n{completed.stderr[-2000:]}")
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'processador':<12} {'escala':>6} {'arquivos':>8} {'chunks':>7} {'arq/s':>8} {'chunks/s':>9} "
+          f"{'parse':>6} {'chunks':>7} {'meta':>6} {'total s':>8} {'RSS MB':>7} {'filhos':>7}")
+    print("-" * 104)
+    for result in results:
+        seconds = result["seconds"]
+        total = seconds["total"] or 1.0
+        print(f"{result['processor']:<12} {str(result['scale']) + 'x':>6} {result['files']:>8} {result['chunks']:>7} "
+              f"{result['files_per_s']:>8.1f} {result['chunks_per_s']:>9.0f} "
+              f"{seconds['parse'] / total:>6.0%} {seconds['chunks'] / total:>7.0%} {seconds['metadata'] / total:>6.0%} "
+              f"{seconds['total']:>8.2f} {result['rss_peak_mb']:>7.0f} {result['rss_children_peak_mb']:>7.0f}")
+        if result["errors"]:
+            print(f"   ⚠️ {result['errors']} arquivos com erro no process_all")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput dos processadores de ingestão")
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_PATH), help="Pasta com as subpastas de data/raw")
+    parser.add_argument("--processors", default=",".join(PROCESSORS), help="Processadores a medir")
+    parser.add_argument("--scales", default="1,10,100", help="Escalas do conjunto de dados (ex.: 1,10)")
+    parser.add_argument("--output", default="", help="Gravar o resultado (JSON)")
+    # Uso interno: o próprio script como processo de medição
+    parser.add_argument("--worker", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(run_worker(args.worker, Path(args.data_dir))))
+        return
+
+    data_dir = Path(args.data_dir)
+    names = [name.strip() for name in args.processors.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROCESSORS]
+    if unknown:
+        parser.error(f"processadores desconhecidos: {', '.join(unknown)} (use {', '.join(PROCESSORS)})")
+    scales = [int(scale) for scale in args.scales.split(",")]
+
+    print("=" * 104)
+    print("BENCHMARK DE INGESTÃO (processadores)")
+    print("=" * 104)
+    print(f"Dados: {data_dir} | escalas: {', '.join(f'{s}x' for s in scales)} | CPUs: {os.cpu_count()}")
+
+    results = []
+    for name in names:
+        source = data_dir / PROCESSORS[name]["dir"]
+        if not source.exists():
+            print(f"⚠️  {source} não existe, pulando {name}")
+            continue
+        for scale in scales:
+            if scale == 1:
+                result = run_in_subprocess(name, source)
+            else:
+                with tempfile.TemporaryDirectory(prefix=f"bench_ingestion_{name}_{scale}x_") as temp_dir:
+                    build_scaled_copy(source, Path(temp_dir), PROCESSORS[name]["pattern"], scale)
+                    result = run_in_subprocess(name, Path(temp_dir))
+            result["scale"] = scale
+            results.append(result)
+            print(f"  ✓ {name} {scale}x: {result['files']} arquivos, {result['chunks']} chunks "
+                  f"em {result['seconds']['total']:.2f}s")
+
+    print_results(results)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(
+            json.dumps({"data_dir": str(data_dir), "cpus": os.cpu_count(), "results": results},
+                       ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        print(f"💾 Resultado gravado: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
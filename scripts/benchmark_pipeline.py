@@ -0,0 +1,286 @@
+"""
+Benchmark offline de latência do pipeline de chat (MultiAgentChatService em processo).
+
+Roda as perguntas golden de scripts/test_ai_responses.py contra provedores
+falsos ou gravados (scripts/fake_providers.py) com latência simulada e
+reporta p50/p95/p99 por etapa (os spans do pipeline: orquestrador, busca,
+rerank, cada agente, consolidação) e ponta a ponta. Não usa rede: o Chroma
+é um diretório temporário com corpus sintético (ou --chroma-dir).
+
+Com --baseline, compara com um resultado salvo e sai com código 1 se alguma
+etapa piorou além da tolerância (relativa e absoluta).
+
+As configurações do app (.env / variáveis: LOCAL_VECTOR_INDEX, HYBRID_SEARCH,
+MMAP_INDEX...) valem normalmente, então dá para comparar configurações.
+
+Uso:
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --questions 20 --repeat 3 --concurrency 4
+    python scripts/benchmark_pipeline.py --latency-scale 0              # só o custo de CPU do pipeline
+    python scripts/benchmark_pipeline.py --save-baseline
+    python scripts/benchmark_pipeline.py --baseline data/benchmarks/pipeline_baseline.json
+    python scripts/benchmark_pipeline.py --record data/benchmarks/fixtures.json   # APIs reais
+    python scripts/benchmark_pipeline.py --fixtures data/benchmarks/fixtures.json # replay
+"""
+import sys
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.fake_providers import FakeProviders, FixtureStore, LatencyProfile, install_providers, seed_synthetic_corpus
+
+DEFAULT_BASELINE = Path(__file__).parent.parent / "data" / "benchmarks" / "pipeline_baseline.json"
+PERCENTILES = (50, 95, 99)
+
+
+def configure_environment(args) -> Optional[str]:
+    """Variáveis lidas por app.core.config (precisa rodar antes de importar o app)"""
+    temp_dir = None
+    if args.chroma_dir:
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = args.chroma_dir
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = temp_dir
+    os.environ.setdefault("TELEMETRY_EXPORTER", "none")
+    if not args.record:
+        os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    return temp_dir
+
+
+def build_service(args, providers: FakeProviders):
+    from app.services.embedding_service import EmbeddingService
+    from app.services.multi_agent_service import MultiAgentChatService
+
+    embedding_service = EmbeddingService()
+    service = MultiAgentChatService(embedding_service)
+    install_providers(service, providers, rerank=not args.no_rerank)
+
+    print(f"Semeando corpus sintético ({args.corpus_size} chunks por categoria)...")
+    if not seed_synthetic_corpus(embedding_service, providers, args.corpus_size, seed=args.seed):
+        print("   Chroma já tem dados, usando o corpus existente")
+    return service
+
+
+def load_questions(limit: int) -> List[str]:
+    from scripts.test_ai_responses import PERGUNTAS
+
+    questions = [item["pergunta"] for item in PERGUNTAS]
+    return questions[:limit] if limit else questions
+
+
+async def run_one(service, question: str) -> Dict[str, Any]:
+    """Uma pergunta: tempo ponta a ponta + soma do tempo de cada etapa (spans)"""
+    from app.core.profiling import start_profiler
+
+    profiler = start_profiler("benchmark", sample=False)
+    start = time.perf_counter()
+    try:
+        result = await service.process_query(query=question, conversation_history=[])
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        report = profiler.stop(write=False)
+
+    stages: Dict[str, float] = {}
+    for stage in report["stages"]:
+        if stage["duration_ms"] is not None:
+            stages[stage["name"]] = stages.get(stage["name"], 0.0) + stage["duration_ms"]
+    usage = result.get("usage") or {}
+    return {
+        "e2e_ms": elapsed_ms,
+        "stages": stages,
+        "tokens": result.get("tokens_used", 0),
+        "cost_usd": usage.get("cost_usd", 0.0),
+    }
+
+
+async def run_all(service, questions: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(question: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_one(service, question)
+
+    return await asyncio.gather(*(guarded(question) for question in questions))
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    array = np.asarray(values, dtype=np.float64)
+    stats = {"count": int(array.size), "mean": round(float(array.mean()), 2)}
+    for percentile in PERCENTILES:
+        stats[f"p{percentile}"] = round(float(np.percentile(array, percentile)), 2)
+    return stats
+
+
+def summarize(runs: List[Dict[str, Any]], wall_seconds: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    stage_values: Dict[str, List[float]] = {}
+    for run in runs:
+        for name, duration in run["stages"].items():
+            stage_values.setdefault(name, []).append(duration)
+    return {
+        "config": config,
+        "requests": len(runs),
+        "throughput_rps": round(len(runs) / wall_seconds, 3) if wall_seconds else 0.0,
+        "tokens_per_request": round(sum(run["tokens"] for run in runs) / len(runs), 1),
+        "cost_per_request_usd": round(sum(run["cost_usd"] for run in runs) / len(runs), 6),
+        "e2e": distribution([run["e2e_ms"] for run in runs]),
+        "stages": {name: distribution(values) for name, values in stage_values.items()},
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print(f"\n{'etapa':<28} {'n':>5} {'média':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    print("-" * 76)
+    rows = [("ponta a ponta", summary["e2e"])] + sorted(
+        summary["stages"].items(), key=lambda item: item[1]["p50"], reverse=True
+    )
+    for name, stats in rows:
+        print(f"{name:<28} {stats['count']:>5} {stats['mean']:>9.1f} {stats['p50']:>9.1f} "
+              f"{stats['p95']:>9.1f} {stats['p99']:>9.1f}")
+    print(f"\nRequests: {summary['requests']} | throughput: {summary['throughput_rps']:.2f} req/s | "
+          f"tokens/req: {summary['tokens_per_request']:.0f} | custo/req: ${summary['cost_per_request_usd']:.4f}")
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    metrics: List[str],
+    tolerance: float,
+    min_delta_ms: float
+) -> List[str]:
+    """Regressões: pior que o baseline em mais de `tolerance` (relativo) E `min_delta_ms` (absoluto)"""
+    regressions = []
+    rows = [("ponta a ponta", current["e2e"], baseline.get("e2e"))] + [
+        (name, stats, baseline.get("stages", {}).get(name)) for name, stats in current["stages"].items()
+    ]
+    for name, stats, base in rows:
+        if not base:
+            continue
+        for metric in metrics:
+            before, after = base[metric], stats[metric]
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                change = (after / before - 1) * 100 if before else float("inf")
+                regressions.append(f"{name} {metric}: {before:.1f} -> {after:.1f} ms (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de latência do pipeline de chat")
+    parser.add_argument("--questions", type=int, default=0, help="Usar só as N primeiras perguntas (0 = todas)")
+    parser.add_argument("--repeat", type=int, default=1, help="Rodadas sobre o conjunto de perguntas")
+    parser.add_argument("--warmup", type=int, default=3, help="Perguntas de aquecimento (fora das estatísticas)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests simultâneos no mesmo event loop")
+    parser.add_argument("--llm-ms", type=float, default=600.0, help="Latência simulada por chamada LLM")
+    parser.add_argument("--embedding-ms", type=float, default=60.0, help="Latência simulada por embedding")
+    parser.add_argument("--rerank-ms", type=float, default=120.0, help="Latência simulada por rerank")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Variação relativa da latência (±)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplica todas as latências (0 = sem sleep)")
+    parser.add_argument("--answer-tokens", type=int, default=350, help="Tamanho da resposta fake da consolidação")
+    parser.add_argument("--no-rerank", action="store_true", help="Desligar o rerank (Cohere)")
+    parser.add_argument("--corpus-size", type=int, default=60, help="Chunks sintéticos por categoria")
+    parser.add_argument("--chroma-dir", default="", help="Usar um Chroma existente em vez do corpus sintético")
+    parser.add_argument("--fixtures", default="", help="Replay de respostas gravadas (fallback: fake)")
+    parser.add_argument("--record", default="", help="Chamar as APIs reais e gravar as respostas neste arquivo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="Gravar o resultado (JSON)")
+    parser.add_argument("--baseline", default="", help="Comparar com um resultado salvo (sai com 1 se regredir)")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), default="",
+                        help=f"Gravar este resultado como baseline (padrão: {DEFAULT_BASELINE})")
+    parser.add_argument("--check", default="p50,p95", help="Percentis comparados com o baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Piora relativa tolerada (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Piora absoluta mínima para contar")
+    args = parser.parse_args()
+
+    if args.fixtures and args.record:
+        parser.error("use --fixtures ou --record, não os dois")
+
+    temp_dir = configure_environment(args)
+    try:
+        latency = LatencyProfile(
+            llm_ms=args.llm_ms, embedding_ms=args.embedding_ms, rerank_ms=args.rerank_ms,
+            jitter=args.jitter, scale=args.latency_scale, seed=args.seed
+        )
+        if args.record:
+            from scripts.fake_providers import real_clients
+
+            providers = FakeProviders(latency, mode="record", fixtures=FixtureStore(args.record),
+                                      answer_tokens=args.answer_tokens, **real_clients())
+        elif args.fixtures:
+            providers = FakeProviders(latency, mode="replay", fixtures=FixtureStore(args.fixtures),
+                                      answer_tokens=args.answer_tokens)
+        else:
+            providers = FakeProviders(latency, answer_tokens=args.answer_tokens)
+
+        service = build_service(args, providers)
+        questions = load_questions(args.questions)
+        workload = questions * args.repeat
+
+        config = {
+            "questions": len(questions),
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "mode": providers.mode,
+            "latency": {"llm_ms": args.llm_ms, "embedding_ms": args.embedding_ms, "rerank_ms": args.rerank_ms,
+                        "jitter": args.jitter, "scale": args.latency_scale},
+            "rerank": not args.no_rerank,
+            "corpus": args.chroma_dir or f"sintético ({args.corpus_size}/categoria)",
+        }
+
+        print("=" * 76)
+        print("BENCHMARK DO PIPELINE DE CHAT (offline)")
+        print("=" * 76)
+        print(f"Perguntas: {len(questions)} x {args.repeat} | concorrência: {args.concurrency} | "
+              f"provedores: {providers.mode} | latência x{args.latency_scale}")
+
+        if args.warmup:
+            asyncio.run(run_all(service, questions[:args.warmup], 1))
+
+        start = time.perf_counter()
+        runs = asyncio.run(run_all(service, workload, args.concurrency))
+        summary = summarize(runs, time.perf_counter() - start, config)
+        summary["provider_calls"] = providers.calls
+        if providers.mode == "replay":
+            summary["fixtures"] = {"hits": providers.fixtures.hits, "misses": providers.fixtures.misses}
+            print(f"Fixtures: {providers.fixtures.hits} hits, {providers.fixtures.misses} misses (fake)")
+        print_summary(summary)
+
+        if args.record:
+            providers.fixtures.save()
+            print(f"\n💾 Fixtures gravadas: {args.record} ({len(providers.fixtures.entries)} respostas)")
+
+        for path in filter(None, (args.output, args.save_baseline)):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"💾 Resultado gravado: {path}")
+
+        if args.baseline:
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+            if baseline.get("config") != config:
+                print("\n⚠️  Configuração diferente do baseline (comparação pode não fazer sentido)")
+            regressions = compare(
+                summary, baseline, [m.strip() for m in args.check.split(",")], args.tolerance, args.min_delta_ms
+            )
+            if regressions:
+                print(f"\n❌ {len(regressions)} regressões contra {args.baseline}:")
+                for line in regressions:
+                    print(f"   {line}")
+                sys.exit(1)
+            print(f"\n✅ Sem regressões contra {args.baseline} (tolerância {args.tolerance:.0%}, "
+                  f"mínimo {args.min_delta_ms:.0f} ms)")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
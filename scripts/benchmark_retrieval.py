@@ -0,0 +1,422 @@
+"""
+Benchmark de qualidade e velocidade da busca (SearchAgent.search_hierarchical).
+
+Roda as perguntas golden de scripts/test_ai_responses.py em variantes da busca
+(Chroma HNSW, índice local float32/int8, híbrida BM25, com/sem rerank,
+parâmetros de n_primary/n_secondary...) e reporta por variante:
+- recall@k: fração dos itens esperados encontrados nos k primeiros chunks
+  (na ordem em que o contexto vai para o LLM: fonte principal, depois secundárias)
+- MRR: 1 / posição do primeiro chunk relevante
+- latência p50/p95 da busca (sem a latência de rede das APIs, por padrão)
+
+Itens esperados por pergunta vêm do arquivo golden (data/benchmarks/retrieval_golden.json):
+chunk_ids e/ou documentos (source_document). Sem o arquivo o benchmark não roda;
+perguntas sem itens no golden ficam de fora (e são listadas). --init-golden gera
+o arquivo a partir do corpus (chunks com vários pontos-chave), para revisão
+manual. Com --synthetic o golden é montado do mesmo jeito, em memória.
+
+Sem rede: embeddings das perguntas e respostas do rerank vêm de fixtures
+(scripts/fake_providers.py), gravadas uma vez com --record.
+
+Com --baseline, sai com código 1 se alguma variante perder recall/MRR ou
+ficar mais lenta que o resultado salvo: mudanças na busca (chunking, rerank,
+híbrida, quantização) devem passar por aqui antes do merge.
+
+Uso:
+    python scripts/benchmark_retrieval.py --record                  # APIs reais -> fixtures (uma vez)
+    python scripts/benchmark_retrieval.py                           # replay offline
+    python scripts/benchmark_retrieval.py --variants baseline,hybrid,local_int8 --k 5,10
+    python scripts/benchmark_retrieval.py --variant "maior:n_primary=12,n_secondary=4"
+    python scripts/benchmark_retrieval.py --init-golden
+    python scripts/benchmark_retrieval.py --save-baseline
+    python scripts/benchmark_retrieval.py --baseline data/benchmarks/retrieval_baseline.json
+    python scripts/benchmark_retrieval.py --synthetic 60             # corpus sintético, sem Chroma
+"""
+import sys
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.fake_providers import FakeProviders, FixtureStore, LatencyProfile, seed_synthetic_corpus
+from scripts.test_ai_responses import PERGUNTAS, check_pontos_chave
+
+BENCHMARKS_DIR = Path(__file__).parent.parent / "data" / "benchmarks"
+DEFAULT_GOLDEN = BENCHMARKS_DIR / "retrieval_golden.json"
+DEFAULT_FIXTURES = BENCHMARKS_DIR / "retrieval_fixtures.json"
+DEFAULT_BASELINE = BENCHMARKS_DIR / "retrieval_baseline.json"
+
+# Configuração comum a todas as variantes (independente do .env); cada variante sobrescreve
+BASE_SETTINGS = {
+    "HYBRID_SEARCH": False,
+    "LOCAL_VECTOR_INDEX": False,
+    "LOCAL_VECTOR_INDEX_DTYPE": "float32",
+    "LOCAL_VECTOR_INDEX_DTYPE_OVERRIDES": "",
+    "MMAP_INDEX": False,
+}
+SEARCH_PARAMS = {"n_primary": 8, "n_secondary": 3, "include_tertiary": False, "use_rerank": True}
+
+VARIANTS = {
+    "baseline": {},
+    "no_rerank": {"use_rerank": False},
+    "local_index": {"LOCAL_VECTOR_INDEX": True},
+    "local_int8": {"LOCAL_VECTOR_INDEX": True, "LOCAL_VECTOR_INDEX_DTYPE": "int8"},
+    "hybrid": {"HYBRID_SEARCH": True},
+    "tertiary": {"include_tertiary": True},
+}
+
+
+def parse_variant(spec: str) -> tuple:
+    """"nome:CHAVE=valor,chave=valor" (settings em maiúsculas, parâmetros da busca em minúsculas)"""
+    name, _, assignments = spec.partition(":")
+    overrides: Dict[str, Any] = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, _, raw = assignment.partition("=")
+        key, raw = key.strip(), raw.strip()
+        if key not in SEARCH_PARAMS and key not in BASE_SETTINGS and not key.isupper():
+            raise ValueError(f"Chave desconhecida na variante {name}: {key}")
+        if raw.lower() in ("true", "false"):
+            value: Any = raw.lower() == "true"
+        else:
+            try:
+                value = int(raw)
+            except ValueError:
+                try:
+                    value = float(raw)
+                except ValueError:
+                    value = raw
+        overrides[key] = value
+    return name.strip(), overrides
+
+
+@contextmanager
+def patched_settings(overrides: Dict[str, Any]):
+    from app.core.config import settings
+
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+# ============================================================
+# Golden set
+# ============================================================
+
+def load_golden(path: Path) -> Dict[str, Dict[str, Any]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {entry["id"]: entry for entry in data["questions"]}
+
+
+def expected_items(question: Dict[str, Any], golden: Dict[str, Dict[str, Any]]) -> Set[str]:
+    """Chunks/documentos esperados do golden (vazio se a pergunta não tem entrada)"""
+    entry = golden.get(question["id"], {})
+    items = {f"chunk:{chunk_id}" for chunk_id in entry.get("expected_chunk_ids", [])}
+    return items | {f"source:{source}" for source in entry.get("expected_sources", [])}
+
+
+def chunk_items(chunk: Dict[str, Any]) -> Set[str]:
+    return {f"chunk:{chunk['id']}", f"source:{chunk['source']}"}
+
+
+def build_golden(embedding_service, min_key_points: int, max_chunks: int) -> List[Dict[str, Any]]:
+    """Golden a partir do corpus: chunks com pelo menos min_key_points pontos-chave da pergunta"""
+    corpus = []
+    for category, collection in embedding_service.collections.items():
+        data = collection.get(include=["documents", "metadatas"])
+        for chunk_id, document, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            corpus.append((chunk_id, document or "", (metadata or {}).get("source_document", "")))
+
+    questions = []
+    for question in PERGUNTAS:
+        scored = []
+        for chunk_id, document, source in corpus:
+            found = check_pontos_chave(document, question["pontos_chave"])["encontrados"]
+            if found >= min_key_points:
+                scored.append((found, chunk_id, source))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        selected = scored[:max_chunks]
+        questions.append({
+            "id": question["id"],
+            "pergunta": question["pergunta"],
+            "expected_chunk_ids": [chunk_id for _, chunk_id, _ in selected],
+            "expected_sources": sorted({source for _, _, source in selected if source}),
+        })
+    return questions
+
+
+def init_golden(embedding_service, path: Path, min_key_points: int, max_chunks: int) -> None:
+    """Golden inicial gravado em disco (revisar à mão antes de usar)"""
+    questions = build_golden(embedding_service, min_key_points, max_chunks)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = {
+        "version": 1,
+        "note": f"Gerado por --init-golden (>= {min_key_points} pontos-chave por chunk); revisar antes de usar",
+        "questions": questions,
+    }
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(content, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+    empty = sum(1 for entry in questions if not entry["expected_chunk_ids"])
+    print(f"💾 Golden gravado: {path} ({len(questions)} perguntas, {empty} sem chunks ficam fora do benchmark)")
+
+
+# ============================================================
+# Execução das variantes
+# ============================================================
+
+def ranked_chunks(results: Dict[Any, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Chunks na ordem do contexto do LLM (a ordem das categorias no resultado)"""
+    chunks = []
+    for category, result in results.items():
+        ids = result.get("ids", [])
+        metadatas = result.get("metadatas", [])
+        for index, document in enumerate(result.get("documents", [])):
+            metadata = (metadatas[index] if index < len(metadatas) else None) or {}
+            chunks.append({
+                "id": ids[index] if index < len(ids) else "",
+                "content": document or "",
+                "source": metadata.get("source_document", ""),
+                "category": category.value,
+            })
+    return chunks
+
+
+def score_question(chunks: List[Dict[str, Any]], expected: Set[str], ks: List[int]) -> Dict:
+    found: Set[str] = set()
+    recall = {}
+    first_relevant = None
+    for rank, chunk in enumerate(chunks, 1):
+        matched = chunk_items(chunk) & expected
+        if matched and first_relevant is None:
+            first_relevant = rank
+        found |= matched
+        for k in ks:
+            if rank == k:
+                recall[k] = len(found) / len(expected)
+    for k in ks:
+        recall.setdefault(k, len(found) / len(expected))
+    return {"recall": recall, "rr": 1 / first_relevant if first_relevant else 0.0}
+
+
+async def run_variant(agent, params: Dict[str, Any], questions: List[Dict], golden: Dict, ks: List[int], warmup: int):
+    for question in questions[:warmup]:
+        await agent.search_hierarchical(question["pergunta"], **params)
+
+    scores, latencies, sizes = [], [], []
+    for question in questions:
+        start = time.perf_counter()
+        results = await agent.search_hierarchical(question["pergunta"], **params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        chunks = ranked_chunks(results)
+        sizes.append(len(chunks))
+        scores.append(score_question(chunks, expected_items(question, golden), ks))
+
+    return {
+        "recall": {str(k): round(float(np.mean([s["recall"][k] for s in scores])), 4) for k in ks},
+        "mrr": round(float(np.mean([s["rr"] for s in scores])), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "chunks_per_query": round(float(np.mean(sizes)), 1),
+    }
+
+
+def build_agent(providers: FakeProviders, rerank_available: bool):
+    from app.agents.search import SearchAgent
+    from app.services.embedding_service import EmbeddingService
+
+    embedding_service = EmbeddingService()
+    embedding_service.openai_client = providers.openai
+    agent = SearchAgent(embedding_service)
+    agent.cohere_client = providers.cohere if rerank_available else None
+    return agent
+
+
+def compare(current: Dict, baseline: Dict, max_drop: float, tolerance: float, min_delta_ms: float) -> List[str]:
+    """Regressões por variante: perda de recall/MRR acima de max_drop ou p95 mais lento"""
+    regressions = []
+    for name, stats in current["variants"].items():
+        base = baseline.get("variants", {}).get(name)
+        if not base:
+            continue
+        for k, value in stats["recall"].items():
+            before = base["recall"].get(k)
+            if before is not None and before - value > max_drop:
+                regressions.append(f"{name} recall@{k}: {before:.3f} -> {value:.3f}")
+        if base["mrr"] - stats["mrr"] > max_drop:
+            regressions.append(f"{name} MRR: {base['mrr']:.3f} -> {stats['mrr']:.3f}")
+        before, after = base["p95_ms"], stats["p95_ms"]
+        if after > before * (1 + tolerance) and after - before > min_delta_ms:
+            regressions.append(f"{name} p95: {before:.1f} -> {after:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recall/MRR/latência da busca hierárquica")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help=f"Variantes pré-definidas ({', '.join(VARIANTS)})")
+    parser.add_argument("--variant", action="append", default=[], help='Variante extra: "nome:CHAVE=valor,..."')
+    parser.add_argument("--k", default="5,10,20", help="Cortes do recall@k")
+    parser.add_argument("--questions", type=int, default=0, help="Usar só as N primeiras perguntas (0 = todas)")
+    parser.add_argument("--warmup", type=int, default=3, help="Buscas de aquecimento por variante")
+    parser.add_argument("--golden", default=str(DEFAULT_GOLDEN), help="Chunks/documentos esperados por pergunta")
+    parser.add_argument("--init-golden", action="store_true", help="Gerar o golden a partir do corpus e sair")
+    parser.add_argument("--min-key-points", type=int, default=2, help="Pontos-chave mínimos por chunk no --init-golden")
+    parser.add_argument("--golden-max-chunks", type=int, default=10, help="Chunks esperados por pergunta no --init-golden")
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES), help="Embeddings/rerank gravados")
+    parser.add_argument("--record", action="store_true", help="Chamar OpenAI/Cohere de verdade e gravar as fixtures")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Aplicar a latência gravada das APIs (1 = real; 0 = só o custo local)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Corpus sintético com N chunks por categoria")
+    parser.add_argument("--chroma-dir", default="", help="Chroma a usar (padrão: CHROMA_PERSIST_DIRECTORY)")
+    parser.add_argument("--output", default="", help="Gravar o resultado (JSON)")
+    parser.add_argument("--baseline", default="", help="Comparar com um resultado salvo (sai com 1 se regredir)")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), default="",
+                        help=f"Gravar este resultado como baseline (padrão: {DEFAULT_BASELINE})")
+    parser.add_argument("--max-drop", type=float, default=0.02, help="Perda máxima de recall/MRR tolerada")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Piora relativa tolerada no p95")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Piora absoluta mínima no p95 para contar")
+    args = parser.parse_args()
+
+    variants = {}
+    for name in filter(None, (value.strip() for value in args.variants.split(","))):
+        if name not in VARIANTS:
+            parser.error(f"variante desconhecida: {name}")
+        variants[name] = VARIANTS[name]
+    try:
+        variants.update(parse_variant(spec) for spec in args.variant)
+    except ValueError as e:
+        parser.error(str(e))
+    ks = sorted(int(k) for k in args.k.split(","))
+
+    # Sem golden não há o que medir (sem fallback para os pontos-chave)
+    if not (args.synthetic or args.init_golden or Path(args.golden).exists()):
+        print(f"❌ Golden não encontrado: {args.golden}. Gere com --init-golden e revise os chunks esperados")
+        sys.exit(2)
+
+    # Variáveis lidas por app.core.config: antes de importar o app
+    temp_dir = None
+    if args.synthetic:
+        temp_dir = tempfile.mkdtemp(prefix="bench_retrieval_")
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = temp_dir
+    elif args.chroma_dir:
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = args.chroma_dir
+    os.environ.setdefault("TELEMETRY_EXPORTER", "none")
+    if not args.record:
+        os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+    try:
+        latency = LatencyProfile(scale=args.latency_scale)
+        if args.synthetic:
+            providers = FakeProviders(latency)
+            rerank_available = True
+        elif args.record:
+            from scripts.fake_providers import real_clients
+
+            providers = FakeProviders(latency, mode="record", fixtures=FixtureStore(args.fixtures), **real_clients())
+            rerank_available = providers.real_cohere is not None
+        else:
+            if not Path(args.fixtures).exists() and not args.init_golden:
+                print(f"❌ Fixtures não encontradas: {args.fixtures}. Rode com --record uma vez (ou use --synthetic N)")
+                sys.exit(2)
+            providers = FakeProviders(latency, mode="replay", fixtures=FixtureStore(args.fixtures))
+            rerank_available = True
+
+        with patched_settings(BASE_SETTINGS):
+            agent = build_agent(providers, rerank_available)
+        if args.synthetic:
+            seed_synthetic_corpus(agent.embedding_service, providers, args.synthetic)
+        elif not sum(agent.embedding_service.get_all_collection_stats().values()):
+            print("❌ Nenhum chunk no Chroma. Rode a ingestão, use --chroma-dir ou --synthetic N")
+            sys.exit(2)
+
+        if args.init_golden:
+            init_golden(agent.embedding_service, Path(args.golden), args.min_key_points, args.golden_max_chunks)
+            return
+
+        if args.synthetic:
+            golden_questions = build_golden(agent.embedding_service, args.min_key_points, args.golden_max_chunks)
+            golden = {entry["id"]: entry for entry in golden_questions}
+        else:
+            golden = load_golden(Path(args.golden))
+
+        questions = PERGUNTAS[:args.questions] if args.questions else PERGUNTAS
+        skipped = [question["id"] for question in questions if not expected_items(question, golden)]
+        questions = [question for question in questions if question["id"] not in skipped]
+        if not questions:
+            print(f"❌ Nenhuma pergunta com chunks/documentos esperados no golden ({args.golden})")
+            sys.exit(2)
+
+        print("=" * 92)
+        print("BENCHMARK DE RETRIEVAL (search_hierarchical)")
+        print("=" * 92)
+        print(f"Corpus: {sum(agent.embedding_service.get_all_collection_stats().values())} chunks | "
+              f"perguntas: {len(questions)} | "
+              f"provedores: {providers.mode} | rerank: {'sim' if rerank_available else 'não configurado'}")
+        if skipped:
+            print(f"⚠️  {len(skipped)} perguntas sem itens no golden ficaram de fora: {', '.join(map(str, skipped))}")
+
+        summary = {"config": {"questions": len(questions), "k": ks, "mode": providers.mode,
+                              "golden": "synthetic" if args.synthetic else args.golden,
+                              "skipped": skipped}, "variants": {}}
+        for name, overrides in variants.items():
+            params = {**SEARCH_PARAMS, **{k: v for k, v in overrides.items() if k in SEARCH_PARAMS}}
+            setting_overrides = {**BASE_SETTINGS, **{k: v for k, v in overrides.items() if k not in SEARCH_PARAMS}}
+            with patched_settings(setting_overrides):
+                variant_agent = build_agent(providers, rerank_available)
+                stats = asyncio.run(run_variant(variant_agent, params, questions, golden, ks, args.warmup))
+            stats["overrides"] = overrides
+            summary["variants"][name] = stats
+
+        if providers.mode == "replay":
+            summary["fixtures"] = {"hits": providers.fixtures.hits, "misses": providers.fixtures.misses}
+            if providers.fixtures.misses:
+                print(f"⚠️  {providers.fixtures.misses} chamadas sem fixture (respostas fake): "
+                      f"rode --record de novo para estas variantes")
+        if args.record:
+            providers.fixtures.save()
+            print(f"💾 Fixtures gravadas: {args.fixtures} ({len(providers.fixtures.entries)} respostas)")
+
+        recall_headers = "".join(f"{'R@' + str(k):>8}" for k in ks)
+        print(f"\n{'variante':<16}{recall_headers} {'MRR':>7} {'p50 ms':>8} {'p95 ms':>8} {'chunks':>7}")
+        print("-" * (16 + 8 * len(ks) + 32))
+        for name, stats in summary["variants"].items():
+            recalls = "".join(f"{stats['recall'][str(k)]:>8.3f}" for k in ks)
+            print(f"{name:<16}{recalls} {stats['mrr']:>7.3f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                  f"{stats['chunks_per_query']:>7.1f}")
+
+        for path in filter(None, (args.output, args.save_baseline)):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"💾 Resultado gravado: {path}")
+
+        if args.baseline:
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+            regressions = compare(summary, baseline, args.max_drop, args.tolerance, args.min_delta_ms)
+            if regressions:
+                print(f"\n❌ {len(regressions)} regressões contra {args.baseline}:")
+                for line in regressions:
+                    print(f"   {line}")
+                sys.exit(1)
+            print(f"\n✅ Sem regressões contra {args.baseline}")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Servidor Chroma local para testar CHROMA_MODE=http.
+
+Sobe `chroma run` em um diretório próprio, espera o heartbeat e roda um teste
+de fumaça pelo mesmo cliente da API (pool, timeout e retry de
+app/services/chroma_client.py). Depois é só apontar uma ou mais instâncias
+da API para ele:
+
+    CHROMA_MODE=http CHROMA_HOST=localhost CHROMA_PORT=8001 \\
+        uvicorn app.main:app --port 8000
+
+Uso:
+    python scripts/chroma_server.py                         # sobe e fica rodando
+    python scripts/chroma_server.py --port 8001 --path ./data/chroma_server
+    python scripts/chroma_server.py --check-only            # só o teste contra um servidor já no ar
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def wait_for_heartbeat(host: str, port: int, timeout: float) -> bool:
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://{host}:{port}/api/v1/heartbeat", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    return False
+
+
+def smoke_test() -> None:
+    """Cria uma collection temporária, escreve, consulta e apaga"""
+    from app.services.chroma_client import create_chroma_client
+
+    client = create_chroma_client()
+    name = f"smoke_test_{os.getpid()}"
+    collection = client.create_collection(name=name, metadata={"hnsw:space": "cosine"})
+    try:
+        collection.add(ids=["a", "b"], embeddings=[[1.0, 0.0], [0.0, 1.0]], documents=["a", "b"])
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[[1.0, 0.1]], n_results=1)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert result["ids"][0] == ["a"], result
+        print(f"✅ Teste OK: query em {elapsed:.1f} ms, {len(client.list_collections())} collections no servidor")
+    finally:
+        client.delete_collection(name)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Servidor Chroma local (CHROMA_MODE=http)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8001, help="Padrão 8001 (a API usa a 8000)")
+    parser.add_argument("--path", default="./data/chroma_server", help="Diretório de dados do servidor")
+    parser.add_argument("--check-only", action="store_true", help="Não sobe servidor, só testa o que está no ar")
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    # O teste de fumaça usa as mesmas settings da API
+    os.environ.update({"CHROMA_MODE": "http", "CHROMA_HOST": args.host, "CHROMA_PORT": str(args.port)})
+
+    process = None
+    if not args.check_only:
+        Path(args.path).mkdir(parents=True, exist_ok=True)
+        print(f"Subindo Chroma em {args.host}:{args.port} (dados em {args.path})...")
+        process = subprocess.Popen([
+            sys.executable, "-m", "chromadb.cli.cli", "run",
+            "--path", args.path, "--host", args.host, "--port", str(args.port)
+        ])
+
+    try:
+        if not wait_for_heartbeat(args.host, args.port, args.startup_timeout):
+            print(f"❌ Chroma não respondeu em {args.host}:{args.port}")
+            return 1
+
+        smoke_test()
+        if process is None:
+            return 0
+
+        print("\nPara usar na API:")
+        print(f"  CHROMA_MODE=http CHROMA_HOST={args.host} CHROMA_PORT={args.port}")
+        print("Ctrl+C para parar.")
+        return process.wait()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if process is not None and process.poll() is None:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
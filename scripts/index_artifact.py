@@ -0,0 +1,100 @@
+"""
+Export/import do artefato pré-construído do índice.
+
+Gera um único .zip (embeddings + textos + metadata + versão do corpus, com
+sha256 por arquivo) a partir das collections ativas, para ser enviado junto
+com o deploy. Na instância nova, o import carrega os vetores prontos nas
+collections sem chamar a OpenAI (o startup faz isso sozinho quando
+INDEX_ARTIFACT_PATH está definido).
+
+Uso:
+    python scripts/index_artifact.py export data/artifacts/index.zip
+    python scripts/index_artifact.py inspect data/artifacts/index.zip
+    python scripts/index_artifact.py import data/artifacts/index.zip [--force]
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.index_artifact import (
+    ArtifactError,
+    export_artifact,
+    file_sha256,
+    import_artifact,
+    read_artifact,
+)
+
+
+def cmd_export(args) -> int:
+    from app.services.embedding_service import EmbeddingService
+
+    manifest = export_artifact(EmbeddingService(), args.path)
+    size_mb = Path(args.path).stat().st_size / 1024 / 1024
+    print(f"✅ Artefato gerado: {args.path} ({size_mb:.2f} MB)")
+    print(f"   sha256: {manifest['sha256']}")
+    print(f"   modelo: {manifest['model']} ({manifest['dimensions']} dims)")
+    for category, count in manifest["categories"].items():
+        print(f"   {category}: {count} chunks")
+    return 0
+
+
+def cmd_inspect(args) -> int:
+    try:
+        artifact = read_artifact(args.path, verify=True)
+    except ArtifactError as e:
+        print(f"❌ {e}")
+        return 1
+
+    manifest = artifact["manifest"]
+    print(f"✅ Checksums OK - sha256 {file_sha256(Path(args.path))}")
+    print(json.dumps({k: v for k, v in manifest.items() if k != "files"}, indent=2))
+    return 0
+
+
+def cmd_import(args) -> int:
+    from app.services.embedding_service import EmbeddingService
+
+    try:
+        result = import_artifact(EmbeddingService(), args.path, settings.CHROMA_PERSIST_DIRECTORY, force=args.force)
+    except ArtifactError as e:
+        print(f"❌ {e}")
+        return 1
+
+    if not result["imported"]:
+        print(f"Artefato já importado (sha256 {result['sha256'][:12]}...). Use --force para reimportar.")
+        return 0
+
+    print(f"✅ Importado em {result['ms']:.0f} ms")
+    for category, count in result["categories"].items():
+        print(f"   {category}: {count} chunks")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Artefato pré-construído do índice vetorial")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Empacotar as collections ativas")
+    export_parser.add_argument("path", help="Arquivo .zip de saída")
+    export_parser.set_defaults(func=cmd_export)
+
+    inspect_parser = subparsers.add_parser("inspect", help="Verificar checksums e mostrar o manifest")
+    inspect_parser.add_argument("path")
+    inspect_parser.set_defaults(func=cmd_inspect)
+
+    import_parser = subparsers.add_parser("import", help="Carregar o artefato no Chroma local")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--force", action="store_true", help="Reimportar mesmo se já importado")
+    import_parser.set_defaults(func=cmd_import)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
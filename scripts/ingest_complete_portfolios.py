@@ -260,14 +260,6 @@ def main():
     # Inicializar serviço
     embedding_service = EmbeddingService()
 
-    # Limpar collection existente
-    print("\nLimpando collection complete_analysis...")
-    try:
-        embedding_service.clear_collection(ChunkCategory.COMPLETE_ANALYSIS)
-        print("  Collection limpa com sucesso!")
-    except Exception as e:
-        print(f"  Aviso: {e}")
-
     # Diretório dos arquivos
     forensic_dir = Path(__file__).parent.parent / "data" / "raw" / "forensic"
 
@@ -283,10 +275,34 @@ def main():
     for f in complete_files:
         print(f"  - {f.name}")
 
+    # Construir uma versão nova ao lado da ativa (queries continuam na ativa)
+    build_name = embedding_service.begin_rebuild(ChunkCategory.COMPLETE_ANALYSIS)
+    print(f"\nConstruindo nova versão: {build_name}")
+
     # Processar cada arquivo
     total_chunks = 0
-    for filepath in complete_files:
-        total_chunks += process_complete_portfolio(str(filepath), embedding_service)
+    try:
+        for filepath in complete_files:
+            total_chunks += process_complete_portfolio(str(filepath), embedding_service)
+    except BaseException:
+        embedding_service.discard_rebuild(ChunkCategory.COMPLETE_ANALYSIS)
+        raise
+
+    # Validar e trocar o alias (a versão anterior fica para rollback)
+    try:
+        published = embedding_service.publish_rebuild(ChunkCategory.COMPLETE_ANALYSIS)
+        print(f"  Publicada {published['active']} (anterior: {published['previous']})")
+    except ValueError as e:
+        print(f"  Versão nova descartada, a ativa foi mantida: {e}")
+
+    # Índice lexical (BM25) para a busca híbrida
+    print("\nReconstruindo índice lexical (BM25)...")
+    print(f"  {embedding_service.rebuild_lexical_index()} documentos indexados")
+
+    # Layout memory-mapped para os workers da API (MMAP_INDEX)
+    mapped = embedding_service.write_mmap_index()
+    if mapped:
+        print(f"  Layout mmap: {mapped['vectors']} vetores em {mapped['directory']}")
 
     # Estatísticas finais
     print("\n" + "="*60)
@@ -64,6 +64,13 @@ def ingest_documents(data_folder: str = "./data/raw"):
                 print(f"⚠️  Tipo não suportado: {suffix}")
                 continue
 
+            # Dividir páginas/planilhas longas em chunks por tokens (limites de frase)
+            chunks = [
+                {**chunk, "content": piece}
+                for chunk in chunks
+                for piece in processor.iter_text_chunks(chunk["content"])
+            ]
+
             # Criar registro do documento
             doc = Document(
                 filename=file_path.name,
@@ -24,6 +24,16 @@ from app.processors import (
 )
 
 
+# Collections reconstruídas por este script
+REBUILT_CATEGORIES = [
+    ChunkCategory.FACTS,
+    ChunkCategory.CONTEXT,
+    ChunkCategory.CLIENT,
+    ChunkCategory.FORENSIC,
+    ChunkCategory.UBS_OFFICIAL,
+]
+
+
 def print_header(text: str):
     """Imprime header formatado"""
     print("\n" + "=" * 60)
@@ -194,16 +204,55 @@ def main():
     print("\n🔧 Inicializando serviço de embeddings...")
     embedding_service = EmbeddingService()
 
-    # Limpar collections antes de popular (evita duplicatas)
-    print("\n🧹 Limpando collections existentes...")
-    for category in ChunkCategory:
+    # Novas versões das collections deste script, construídas ao lado das
+    # ativas (complete_analysis é de ingest_complete_portfolios.py)
+    print("\n🧱 Criando novas versões das collections...")
+    for category in REBUILT_CATEGORIES:
+        print(f"  ✓ {category.value} -> {embedding_service.begin_rebuild(category)}")
+
+    try:
+        stats = ingest_all(embedding_service, base_path)
+    except BaseException:
+        for category in REBUILT_CATEGORIES:
+            embedding_service.discard_rebuild(category)
+        raise
+
+    # Validar e trocar os aliases (versões anteriores ficam para rollback)
+    print("\n🔀 Publicando novas versões...")
+    for category in REBUILT_CATEGORIES:
         try:
-            embedding_service.clear_collection(category)
-            print(f"  ✓ {category.value} limpa")
-        except Exception as e:
-            print(f"  ⚠️ {category.value}: {e}")
+            published = embedding_service.publish_rebuild(category)
+            print(f"  ✓ {published['active']} ({published['count']} docs, anterior: {published['previous']})")
+        except ValueError as e:
+            print(f"  ⚠️ Mantida a versão ativa - {e}")
+
+    # Índice lexical (BM25) para a busca híbrida - só texto, sem chamadas de API
+    print("\n🔤 Reconstruindo índice lexical (BM25)...")
+    print(f"  ✓ {embedding_service.rebuild_lexical_index()} documentos indexados")
+
+    # Layout memory-mapped (vetores + contexto fixo) mapeado pelos workers da API
+    mapped = embedding_service.write_mmap_index()
+    if mapped:
+        print(f"\n🗺️  Layout mmap: {mapped['vectors']} vetores ({mapped['bytes'] / 1024 / 1024:.1f} MB) em {mapped['directory']}")
+
+    # Resumo final
+    print_header("✅ INGESTÃO COMPLETA!")
+    print_stats(stats)
+
+    # Estatísticas do ChromaDB
+    print("\n📊 Estatísticas do ChromaDB:")
+    chroma_stats = embedding_service.get_all_collection_stats()
+    for collection, count in chroma_stats.items():
+        if count > 0:
+            print(f"  {collection}: {count} documentos")
 
-    # Estatísticas
+    print("\n" + "=" * 60)
+    print("  🎉 Pronto para usar o RAG Forense!")
+    print("=" * 60 + "\n")
+
+
+def ingest_all(embedding_service: EmbeddingService, base_path: Path) -> dict:
+    """Ingere todas as pastas de dados; retorna as estatísticas por tipo"""
     stats = {}
 
     # 1. Statements
@@ -238,20 +287,7 @@ def main():
     else:
         print("\n⚠️  Pasta ubs_official/ não encontrada, pulando...")
 
-    # Resumo final
-    print_header("✅ INGESTÃO COMPLETA!")
-    print_stats(stats)
-
-    # Estatísticas do ChromaDB
-    print("\n📊 Estatísticas do ChromaDB:")
-    chroma_stats = embedding_service.get_all_collection_stats()
-    for collection, count in chroma_stats.items():
-        if count > 0:
-            print(f"  {collection}: {count} documentos")
-
-    print("\n" + "=" * 60)
-    print("  🎉 Pronto para usar o RAG Forense!")
-    print("=" * 60 + "\n")
+    return stats
 
 
 if __name__ == "__main__":
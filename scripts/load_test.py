@@ -0,0 +1,453 @@
+"""
+Teste de carga do /chat/ e /chat/stream com usuários simultâneos.
+
+Cada usuário virtual faz login em /auth/login e envia as perguntas golden
+(scripts/test_ai_responses.py) em loop durante --duration segundos. Para cada
+nível de --users (ex.: 1,5,10,20) mede throughput, taxa de erro e p50/p95/p99 de:
+- ttfb: até os headers da resposta
+- first_event: até o primeiro evento SSE (só /chat/stream)
+- answer: até a resposta chegar (evento "complete" no stream; corpo no /chat/)
+- total: até a conexão fechar
+
+Sem --url, sobe o app de verdade em um subprocesso local (uvicorn, 1 worker)
+com provedores falsos (scripts/fake_providers.py: as chamadas síncronas e o
+time.sleep bloqueiam o event loop como as da OpenAI), Chroma com corpus
+sintético e SQLite temporário (ou --database-url, ex.: um Postgres local,
+para testar o pool 2+3). Com --url, usa um servidor já rodando e as APIs reais
+(custa tokens).
+
+Uso:
+    python scripts/load_test.py --users 1,5,10,20 --duration 30
+    python scripts/load_test.py --endpoint stream --users 10 --llm-ms 1500
+    python scripts/load_test.py --database-url postgresql://localhost/ubs_load --users 5,10
+    python scripts/load_test.py --url http://localhost:8000 --email dev@ubs.com --password dev123 --users 2
+"""
+import sys
+import os
+import json
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.test_ai_responses import PERGUNTAS
+
+LOCAL_EMAIL = "loadtest{index:03d}@ubs.com"
+LOCAL_PASSWORD = "loadtest123"
+ENDPOINTS = {"chat": "/chat/", "stream": "/chat/stream"}
+TIMINGS = ("ttfb_ms", "first_event_ms", "answer_ms", "total_ms")
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: str  # ok | http_<código> | sse_error | timeout | error
+    ttfb_ms: Optional[float] = None
+    first_event_ms: Optional[float] = None
+    answer_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+
+
+# ============================================================
+# Servidor local (subprocesso)
+# ============================================================
+
+def create_accounts(count: int) -> None:
+    from app.core.security import get_password_hash
+    from app.models.database import SessionLocal
+    from app.models.document import User, UserRole
+
+    db = SessionLocal()
+    try:
+        password_hash = get_password_hash(LOCAL_PASSWORD)
+        for index in range(count):
+            email = LOCAL_EMAIL.format(index=index)
+            if not db.query(User).filter(User.email == email).first():
+                db.add(User(
+                    email=email,
+                    full_name=f"Load Test {index}",
+                    hashed_password=password_hash,
+                    role=UserRole.OFICIAL.value,
+                    is_active=True,
+                    is_superuser=False
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def serve(args) -> None:
+    """Processo do servidor: app real, provedores falsos, contas de teste"""
+    import uvicorn
+    from app.main import app
+    from app.models.database import init_db
+    from app.services.service_container import ServiceContainer
+    from scripts.fake_providers import FakeProviders, LatencyProfile, install_providers, seed_synthetic_corpus
+
+    init_db()
+    create_accounts(args.accounts)
+
+    providers = FakeProviders(
+        LatencyProfile(llm_ms=args.llm_ms, embedding_ms=args.embedding_ms, rerank_ms=args.rerank_ms,
+                       jitter=args.jitter, scale=args.latency_scale, seed=args.seed),
+        answer_tokens=args.answer_tokens
+    )
+    container = ServiceContainer.create()
+    install_providers(container.chat_service, providers, rerank=not args.no_rerank)
+    seed_synthetic_corpus(container.embedding_service, providers, args.corpus_size, seed=args.seed)
+    # O lifespan reaproveita o container já guardado em app.state
+    app.state.services = container
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(args, accounts: int):
+    """Sobe o subprocesso e espera o /ready. Retorna (processo, url, diretório temporário)"""
+    temp_dir = tempfile.mkdtemp(prefix="load_test_")
+    port = _free_port()
+    env = dict(os.environ)
+    env["CHROMA_PERSIST_DIRECTORY"] = os.path.join(temp_dir, "chroma")
+    # Nunca herdar o DATABASE_URL do ambiente (poderia ser o banco de produção)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'load_test.db')}"
+    env.setdefault("OPENAI_API_KEY", "offline-load-test")
+    env.setdefault("TELEMETRY_EXPORTER", "none")
+    # O /chat/stream loga cada evento SSE em INFO
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONPATH"] = str(Path(__file__).parent.parent) + os.pathsep + env.get("PYTHONPATH", "")
+
+    command = [
+        sys.executable, __file__, "--serve",
+        "--port", str(port), "--accounts", str(accounts),
+        "--llm-ms", str(args.llm_ms), "--embedding-ms", str(args.embedding_ms),
+        "--rerank-ms", str(args.rerank_ms), "--jitter", str(args.jitter),
+        "--latency-scale", str(args.latency_scale), "--answer-tokens", str(args.answer_tokens),
+        "--corpus-size", str(args.corpus_size), "--seed", str(args.seed),
+    ] + (["--no-rerank"] if args.no_rerank else [])
+    process = subprocess.Popen(command, env=env)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise RuntimeError(f"Servidor local saiu com código {process.returncode}")
+        try:
+            if httpx.get(f"{url}/ready", timeout=2.0).status_code == 200:
+                return process, url, temp_dir
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    stop_local_server(process, temp_dir)
+    raise RuntimeError(f"Servidor local não ficou pronto em {args.startup_timeout}s")
+
+
+def stop_local_server(process: subprocess.Popen, temp_dir: str) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# ============================================================
+# Cliente
+# ============================================================
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> tuple:
+    start = time.perf_counter()
+    response = await client.post("/auth/login", data={"username": email, "password": password})
+    sample = Sample("login", "ok" if response.status_code == 200 else f"http_{response.status_code}",
+                    total_ms=_elapsed_ms(start))
+    token = response.json()["access_token"] if response.status_code == 200 else None
+    return token, sample
+
+
+async def send_chat(client: httpx.AsyncClient, token: str, question: str) -> Sample:
+    sample = Sample("chat", "ok")
+    start = time.perf_counter()
+    async with client.stream(
+        "POST", ENDPOINTS["chat"],
+        json={"message": question, "conversation_history": []},
+        headers={"Authorization": f"Bearer {token}"}
+    ) as response:
+        sample.ttfb_ms = _elapsed_ms(start)
+        await response.aread()
+        sample.answer_ms = sample.total_ms = _elapsed_ms(start)
+        if response.status_code != 200:
+            sample.status = f"http_{response.status_code}"
+    return sample
+
+
+async def send_stream(client: httpx.AsyncClient, token: str, question: str) -> Sample:
+    sample = Sample("stream", "ok")
+    start = time.perf_counter()
+    async with client.stream(
+        "POST", ENDPOINTS["stream"],
+        json={"message": question, "conversation_history": []},
+        headers={"Authorization": f"Bearer {token}", "Accept": "text/event-stream"}
+    ) as response:
+        sample.ttfb_ms = _elapsed_ms(start)
+        if response.status_code != 200:
+            await response.aread()
+            sample.status = f"http_{response.status_code}"
+        else:
+            async for line in response.aiter_lines():
+                if not line.startswith("event:"):
+                    continue
+                event = line[len("event:"):].strip()
+                if sample.first_event_ms is None:
+                    sample.first_event_ms = _elapsed_ms(start)
+                if event == "complete":
+                    sample.answer_ms = _elapsed_ms(start)
+                elif event == "error":
+                    sample.status = "sse_error"
+            if sample.status == "ok" and sample.answer_ms is None:
+                sample.status = "sse_error"
+        sample.total_ms = _elapsed_ms(start)
+    return sample
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, token: str, question: str) -> Sample:
+    sender = send_stream if endpoint == "stream" else send_chat
+    try:
+        return await sender(client, token, question)
+    except httpx.TimeoutException:
+        return Sample(endpoint, "timeout")
+    except httpx.HTTPError as e:
+        print(f"   ⚠️ {endpoint}: {type(e).__name__}: {e}")
+        return Sample(endpoint, "error")
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    index: int,
+    users: int,
+    token: str,
+    args,
+    deadline: float,
+    samples: List[Sample]
+) -> None:
+    step = index
+    while time.perf_counter() < deadline:
+        question = PERGUNTAS[step % len(PERGUNTAS)]["pergunta"]
+        endpoint = args.endpoint if args.endpoint != "mixed" else ("stream" if step % 2 else "chat")
+        samples.append(await send(client, endpoint, token, question))
+        step += users
+        if args.think_time:
+            await asyncio.sleep(args.think_time)
+
+
+async def run_level(url: str, users: int, args, credentials: List[tuple]) -> Dict:
+    """Um nível de concorrência: login de todos, depois carga por --duration segundos"""
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        logins = await asyncio.gather(*(
+            login(client, *credentials[index % len(credentials)]) for index in range(users)
+        ))
+        samples: List[Sample] = [sample for _, sample in logins]
+        tokens = [token for token, _ in logins]
+        if not all(tokens):
+            return {"users": users, "error": "login falhou", "samples": [asdict(s) for s in samples]}
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, index, users, tokens[index], args, deadline, samples) for index in range(users)
+        ))
+        wall_seconds = time.perf_counter() - start
+
+    return summarize_level(users, samples, wall_seconds)
+
+
+# ============================================================
+# Relatório
+# ============================================================
+
+def distribution(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    array = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": round(float(np.percentile(array, p)), 1) for p in (50, 95, 99)}
+
+
+def summarize_level(users: int, samples: List[Sample], wall_seconds: float) -> Dict:
+    endpoints = {}
+    for endpoint in ["login"] + list(ENDPOINTS):
+        selected = [s for s in samples if s.endpoint == endpoint]
+        if not selected:
+            continue
+        ok = [s for s in selected if s.status == "ok"]
+        errors: Dict[str, int] = {}
+        for s in selected:
+            if s.status != "ok":
+                errors[s.status] = errors.get(s.status, 0) + 1
+        endpoints[endpoint] = {
+            "requests": len(selected),
+            "throughput_rps": round(len(ok) / wall_seconds, 3) if endpoint != "login" else None,
+            "error_rate": round(1 - len(ok) / len(selected), 4),
+            "errors": errors,
+            **{name: distribution([getattr(s, name) for s in ok if getattr(s, name) is not None]) for name in TIMINGS},
+        }
+    chat_samples = [s for s in samples if s.endpoint != "login"]
+    chat_ok = [s for s in chat_samples if s.status == "ok"]
+    return {
+        "users": users,
+        "duration_s": round(wall_seconds, 2),
+        "throughput_rps": round(len(chat_ok) / wall_seconds, 3),
+        "error_rate": round(1 - len(chat_ok) / len(chat_samples), 4) if chat_samples else 0.0,
+        "answer_ms": distribution([s.answer_ms for s in chat_ok]),
+        "endpoints": endpoints,
+    }
+
+
+def _ms(stats: Optional[Dict[str, float]], key: str) -> str:
+    return f"{stats[key]:>8.0f}" if stats else f"{'-':>8}"
+
+
+def print_level(level: Dict) -> None:
+    print(f"\n👥 {level['users']} usuários | {level['duration_s']:.0f}s | "
+          f"{level['throughput_rps']:.2f} req/s | erros: {level['error_rate']:.1%}")
+    print(f"   {'endpoint':<8} {'reqs':>5} {'erro%':>6} {'ttfb p50':>8} {'p95':>8} {'1º ev p50':>9} {'p95':>8} "
+          f"{'resp p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, stats in level["endpoints"].items():
+        answer = stats["answer_ms"] or stats["total_ms"]
+        print(f"   {endpoint:<8} {stats['requests']:>5} {stats['error_rate'] * 100:>5.1f}% "
+              f"{_ms(stats['ttfb_ms'], 'p50')} {_ms(stats['ttfb_ms'], 'p95')} "
+              f"{_ms(stats['first_event_ms'], 'p50'):>9} {_ms(stats['first_event_ms'], 'p95')} "
+              f"{_ms(answer, 'p50')} {_ms(answer, 'p95')} {_ms(answer, 'p99')}")
+        if stats["errors"]:
+            print(f"            erros: {stats['errors']}")
+
+
+def healthy(level: Dict, args) -> bool:
+    if "error" in level or level["error_rate"] > args.max_error_rate:
+        return False
+    return not (args.max_p95_s and level["answer_ms"] and level["answer_ms"]["p95"] > args.max_p95_s * 1000)
+
+
+# ============================================================
+# Main
+# ============================================================
+
+def add_provider_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("servidor local (provedores falsos)")
+    group.add_argument("--llm-ms", type=float, default=600.0, help="Latência simulada por chamada LLM")
+    group.add_argument("--embedding-ms", type=float, default=60.0, help="Latência simulada por embedding")
+    group.add_argument("--rerank-ms", type=float, default=120.0, help="Latência simulada por rerank")
+    group.add_argument("--jitter", type=float, default=0.2, help="Variação relativa da latência (±)")
+    group.add_argument("--latency-scale", type=float, default=1.0, help="Multiplica todas as latências")
+    group.add_argument("--answer-tokens", type=int, default=350, help="Tamanho da resposta fake")
+    group.add_argument("--no-rerank", action="store_true", help="Desligar o rerank (Cohere)")
+    group.add_argument("--corpus-size", type=int, default=60, help="Chunks sintéticos por categoria")
+    group.add_argument("--database-url", default="", help="Banco do servidor local (padrão: SQLite temporário)")
+    group.add_argument("--seed", type=int, default=42)
+    group.add_argument("--startup-timeout", type=float, default=120.0)
+    # Uso interno: o próprio script como processo do servidor
+    group.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    group.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    group.add_argument("--accounts", type=int, default=1, help=argparse.SUPPRESS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do /chat/ e /chat/stream")
+    parser.add_argument("--users", default="1,5,10", help="Níveis de usuários simultâneos (ex.: 1,5,10,20)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga por nível")
+    parser.add_argument("--endpoint", choices=["chat", "stream", "mixed"], default="mixed")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa entre perguntas de um usuário (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por request (s)")
+    parser.add_argument("--max-error-rate", type=float, default=0.05, help="Para a rampa acima desta taxa de erro")
+    parser.add_argument("--max-p95-s", type=float, default=0.0, help="Para a rampa se o p95 da resposta passar disto")
+    parser.add_argument("--url", default="", help="Servidor já rodando (sem isso, sobe um local com provedores falsos)")
+    parser.add_argument("--email", default="dev@ubs.com", help="Login usado com --url")
+    parser.add_argument("--password", default="dev123", help="Senha usada com --url")
+    parser.add_argument("--output", default="", help="Gravar o resultado (JSON)")
+    add_provider_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    levels = [int(value) for value in args.users.split(",") if value.strip()]
+
+    print("=" * 90)
+    print("TESTE DE CARGA /chat")
+    print("=" * 90)
+
+    process = temp_dir = None
+    if args.url:
+        url = args.url.rstrip("/")
+        credentials = [(args.email, args.password)]
+        print(f"⚠️  Servidor externo {url}: as chamadas usam as APIs reais (custo de tokens)")
+    else:
+        print(f"Subindo servidor local (LLM {args.llm_ms:.0f} ms x{args.latency_scale}, "
+              f"banco: {args.database_url or 'SQLite temporário'})...")
+        process, url, temp_dir = start_local_server(args, accounts=max(levels))
+        credentials = [(LOCAL_EMAIL.format(index=index), LOCAL_PASSWORD) for index in range(max(levels))]
+    print(f"Endpoint: {args.endpoint} | níveis: {levels} | {args.duration:.0f}s por nível")
+
+    results = []
+    capacity = None
+    try:
+        for users in levels:
+            level = asyncio.run(run_level(url, users, args, credentials))
+            results.append(level)
+            if "error" in level:
+                print(f"\n❌ {users} usuários: {level['error']}")
+                break
+            print_level(level)
+            if not healthy(level, args):
+                print(f"\n⛔ Limite atingido com {users} usuários")
+                break
+            capacity = users
+    finally:
+        if process is not None:
+            stop_local_server(process, temp_dir)
+
+    print("\n" + "=" * 90)
+    print(f"{'usuários':>8} {'req/s':>8} {'erro%':>7} {'resp p50':>9} {'p95':>8} {'p99':>8}  (ms)")
+    for level in results:
+        if "error" in level:
+            continue
+        print(f"{level['users']:>8} {level['throughput_rps']:>8.2f} {level['error_rate'] * 100:>6.1f}% "
+              f"{_ms(level['answer_ms'], 'p50'):>9} {_ms(level['answer_ms'], 'p95')} {_ms(level['answer_ms'], 'p99')}")
+    if capacity:
+        print(f"\n✅ Maior nível saudável: {capacity} usuários simultâneos")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        config = {key: value for key, value in vars(args).items() if key not in ("password", "serve", "port", "accounts")}
+        Path(args.output).write_text(
+            json.dumps({"config": config, "capacity_users": capacity, "levels": results}, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+        print(f"💾 Resultado gravado: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
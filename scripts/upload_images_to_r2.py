@@ -2,8 +2,16 @@
 """
 Script para fazer upload das imagens de portfolios para Cloudflare R2.
 
+Modo incremental (padrao): uma unica listagem do bucket e comparada com
+tamanho/MD5 locais; so arquivos novos ou alterados sao enviados. Um manifest
+local guarda os hashes ja calculados e os uploads concluidos, entao execucoes
+interrompidas retomam de onde pararam e re-sincronizacoes sao rapidas.
+
 Uso:
-    python scripts/upload_images_to_r2.py
+    python scripts/upload_images_to_r2.py            # sync incremental
+    python scripts/upload_images_to_r2.py --full     # reenvia tudo
+    python scripts/upload_images_to_r2.py --dry-run  # apenas mostra o plano
+    python scripts/upload_images_to_r2.py --yes      # sem confirmacao
 
 Variaveis de ambiente necessarias:
     S3_BUCKET_NAME - Nome do bucket R2
@@ -14,6 +22,9 @@ Variaveis de ambiente necessarias:
 
 import os
 import sys
+import json
+import argparse
+import threading
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import mimetypes
@@ -22,9 +33,13 @@ import mimetypes
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 from dotenv import load_dotenv
 
+# Mesmos parametros de multipart usados para calcular o ETag local (storage_service)
+from app.services.storage_service import MULTIPART_CHUNKSIZE, MULTIPART_THRESHOLD, compute_s3_etag
+
 # Carregar variaveis de ambiente
 load_dotenv()
 
@@ -41,6 +56,19 @@ LOCAL_IMAGES_PATH = Path(__file__).parent.parent.parent / "portfolios_corrigidos
 # Extensoes de imagem suportadas
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
 
+# Manifest local do sync (hashes calculados + uploads concluidos)
+MANIFEST_PATH = LOCAL_IMAGES_PATH / ".r2_sync_manifest.json"
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+    max_concurrency=4,
+    use_threads=True
+)
+
+# Salvar o manifest a cada N uploads (para retomar execucoes interrompidas)
+MANIFEST_FLUSH_EVERY = 25
+
 
 def validate_config():
     """Valida as configuracoes necessarias"""
@@ -65,11 +93,12 @@ def validate_config():
         sys.exit(1)
 
 
-def create_s3_client():
+def create_s3_client(max_pool_connections: int = 10):
     """Cria cliente S3 configurado para R2"""
     config = Config(
         signature_version='s3v4',
-        s3={'addressing_style': 'path'}
+        s3={'addressing_style': 'path'},
+        max_pool_connections=max_pool_connections
     )
 
     return boto3.client(
@@ -88,9 +117,115 @@ def get_content_type(filename: str) -> str:
     return content_type or 'application/octet-stream'
 
 
+class SyncManifest:
+    """Manifest local: {s3_key: {size, mtime_ns, etag, uploaded}} (thread-safe)"""
+
+    def __init__(self, path: Path, bucket: str):
+        self.path = path
+        self.bucket = bucket
+        self.files = {}
+        self._lock = threading.Lock()
+        self._dirty = 0
+
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                # Manifest de outro bucket nao vale para este
+                if data.get("bucket") == bucket:
+                    self.files = data.get("files", {})
+            except Exception as e:
+                print(f"Aviso: manifest ignorado ({e})")
+
+    def local_etag(self, local_path: Path, s3_key: str) -> tuple[str, int, int]:
+        """Retorna (etag, size, mtime_ns), reaproveitando o hash se o arquivo nao mudou"""
+        stat = local_path.stat()
+        with self._lock:
+            entry = self.files.get(s3_key)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["etag"], stat.st_size, stat.st_mtime_ns
+
+        etag = compute_s3_etag(local_path, stat.st_size)
+        with self._lock:
+            self.files[s3_key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "etag": etag,
+                "uploaded": False
+            }
+        return etag, stat.st_size, stat.st_mtime_ns
+
+    def is_uploaded(self, s3_key: str, etag: str) -> bool:
+        with self._lock:
+            entry = self.files.get(s3_key)
+        return bool(entry and entry.get("uploaded") and entry.get("etag") == etag)
+
+    def mark_uploaded(self, s3_key: str) -> None:
+        with self._lock:
+            if s3_key in self.files:
+                self.files[s3_key]["uploaded"] = True
+            self._dirty += 1
+            should_flush = self._dirty >= MANIFEST_FLUSH_EVERY
+        if should_flush:
+            self.save()
+
+    def save(self) -> None:
+        """Grava de forma atomica (tmp + rename)"""
+        with self._lock:
+            payload = json.dumps({"bucket": self.bucket, "files": self.files})
+            self._dirty = 0
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def list_remote_objects(client) -> dict[str, tuple[int, str]]:
+    """
+    Lista o bucket inteiro de uma vez (paginado, 1000 objetos por chamada).
+    Retorna: {key: (size, etag)}
+    """
+    remote = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME):
+        for obj in page.get("Contents", []):
+            remote[obj["Key"]] = (obj["Size"], obj["ETag"].strip('"'))
+    return remote
+
+
+def plan_uploads(
+    files: list[tuple[Path, str]],
+    remote: dict[str, tuple[int, str]],
+    manifest: SyncManifest,
+    full: bool = False
+) -> list[tuple[Path, str]]:
+    """
+    Decide quais arquivos precisam ser enviados. O hash local entra no manifest
+    em todos os modos (inclusive --full), para o mark_uploaded registrar o upload.
+    """
+    pending = []
+    for local_path, s3_key in files:
+        etag, size, _ = manifest.local_etag(local_path, s3_key)
+        if full:
+            pending.append((local_path, s3_key))
+            continue
+
+        remote_entry = remote.get(s3_key)
+
+        if remote_entry and remote_entry[0] == size:
+            remote_etag = remote_entry[1]
+            # ETag igual = conteudo igual. Se o ETag remoto usa outro tamanho
+            # de parte (multipart), confiar no registro do nosso proprio upload.
+            if remote_etag == etag or manifest.is_uploaded(s3_key, etag):
+                manifest.files[s3_key]["uploaded"] = True
+                continue
+
+        pending.append((local_path, s3_key))
+
+    return pending
+
+
 def upload_file(client, local_path: Path, s3_key: str) -> tuple[str, bool, str]:
     """
-    Faz upload de um arquivo para o S3/R2.
+    Faz upload de um arquivo para o S3/R2 (multipart automatico acima do threshold).
     Retorna: (s3_key, success, message)
     """
     try:
@@ -103,7 +238,8 @@ def upload_file(client, local_path: Path, s3_key: str) -> tuple[str, bool, str]:
             ExtraArgs={
                 'ContentType': content_type,
                 'CacheControl': 'public, max-age=31536000'  # 1 ano de cache
-            }
+            },
+            Config=TRANSFER_CONFIG
         )
         return (s3_key, True, "OK")
     except Exception as e:
@@ -127,7 +263,18 @@ def collect_files() -> list[tuple[Path, str]]:
     return files
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sync de imagens de portfolios para Cloudflare R2")
+    parser.add_argument("--full", action="store_true", help="Reenviar todos os arquivos (ignora comparacao)")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas mostrar o que seria enviado")
+    parser.add_argument("--yes", "-y", action="store_true", help="Nao pedir confirmacao")
+    parser.add_argument("--workers", type=int, default=10, help="Uploads em paralelo (padrao: 10)")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
     print("=" * 60)
     print("Upload de Imagens para Cloudflare R2")
     print("=" * 60)
@@ -139,9 +286,9 @@ def main():
     print(f"Endpoint: {ENDPOINT_URL}")
     print(f"Pasta local: {LOCAL_IMAGES_PATH}")
 
-    # Criar cliente S3
+    # Criar cliente S3 (pool suficiente para workers x partes em paralelo)
     print("\nConectando ao R2...")
-    client = create_s3_client()
+    client = create_s3_client(max_pool_connections=args.workers * TRANSFER_CONFIG.max_request_concurrency)
 
     # Testar conexao
     try:
@@ -165,37 +312,72 @@ def main():
         print("Nenhum arquivo para upload!")
         return
 
-    # Confirmar upload
-    response = input(f"\nDeseja fazer upload de {total_files} arquivos? (s/n): ")
-    if response.lower() != 's':
-        print("Upload cancelado.")
+    # Comparar com o bucket (uma unica listagem) e o manifest local
+    manifest = SyncManifest(MANIFEST_PATH, BUCKET_NAME)
+    if args.full:
+        remote = {}
+    else:
+        print("\nListando objetos remotos...")
+        remote = list_remote_objects(client)
+        print(f"Encontrados {len(remote)} objetos no bucket")
+
+    pending = plan_uploads(files, remote, manifest, full=args.full)
+    manifest.save()
+
+    skipped = total_files - len(pending)
+    print(f"\nInalterados (pulados): {skipped}")
+    print(f"Novos ou alterados: {len(pending)}")
+
+    if not pending:
+        print("\nTudo sincronizado!")
         return
 
+    if args.dry_run:
+        for _, s3_key in pending[:50]:
+            print(f"  + {s3_key}")
+        if len(pending) > 50:
+            print(f"  ... e mais {len(pending) - 50}")
+        return
+
+    # Confirmar upload
+    if not args.yes:
+        response = input(f"\nDeseja fazer upload de {len(pending)} arquivos? (s/n): ")
+        if response.lower() != 's':
+            print("Upload cancelado.")
+            return
+
     # Fazer upload em paralelo
     print("\nIniciando upload...")
     success_count = 0
     error_count = 0
+    total_pending = len(pending)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {
-            executor.submit(upload_file, client, local_path, s3_key): s3_key
-            for local_path, s3_key in files
-        }
-
-        for i, future in enumerate(as_completed(futures), 1):
-            s3_key, success, message = future.result()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(upload_file, client, local_path, s3_key): s3_key
+                for local_path, s3_key in pending
+            }
 
-            if success:
-                success_count += 1
-                # Mostrar progresso a cada 50 arquivos
-                if success_count % 50 == 0 or i == total_files:
-                    print(f"  Progresso: {i}/{total_files} ({100*i//total_files}%)")
-            else:
-                error_count += 1
-                print(f"  Erro: {s3_key} - {message}")
+            for i, future in enumerate(as_completed(futures), 1):
+                s3_key, success, message = future.result()
+
+                if success:
+                    success_count += 1
+                    manifest.mark_uploaded(s3_key)
+                    # Mostrar progresso a cada 50 arquivos
+                    if success_count % 50 == 0 or i == total_pending:
+                        print(f"  Progresso: {i}/{total_pending} ({100*i//total_pending}%)")
+                else:
+                    error_count += 1
+                    print(f"  Erro: {s3_key} - {message}")
+    finally:
+        # Sempre persistir o progresso, mesmo se interrompido (Ctrl+C)
+        manifest.save()
 
     print("\n" + "=" * 60)
     print("Upload concluido!")
+    print(f"  Pulados (inalterados): {skipped}")
     print(f"  Sucesso: {success_count}")
     print(f"  Erros: {error_count}")
     print("=" * 60)
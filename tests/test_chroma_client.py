@@ -0,0 +1,72 @@
+"""Retry da sessão HTTP do Chroma: escritas não são repetidas"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.services.chroma_client import configure_http_session, is_read_only_post
+
+
+class Unavailable(BaseHTTPRequestHandler):
+    hits = {}
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        key = (self.command, self.path)
+        self.hits[key] = self.hits.get(key, 0) + 1
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Unavailable.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Unavailable)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def session():
+    session = requests.Session()
+    configure_http_session(session, pool_size=2, timeout=(1.0, 1.0), max_retries=2, backoff_seconds=0)
+    return session
+
+
+def test_read_only_post_paths():
+    assert is_read_only_post("http://chroma:8000/api/v1/collections/abc/query")
+    assert is_read_only_post("/api/v1/collections/abc/get/")
+    assert not is_read_only_post("/api/v1/collections/abc/upsert")
+    assert not is_read_only_post("/api/v1/collections")
+
+
+def test_query_post_is_retried(server, session):
+    response = session.post(f"{server}/api/v1/collections/abc/query", json={})
+
+    assert response.status_code == 503
+    assert Unavailable.hits[("POST", "/api/v1/collections/abc/query")] == 3
+
+
+def test_write_post_is_not_retried(server, session):
+    response = session.post(f"{server}/api/v1/collections/abc/upsert", json={})
+
+    assert response.status_code == 503
+    assert Unavailable.hits[("POST", "/api/v1/collections/abc/upsert")] == 1
+
+
+def test_get_is_retried(server, session):
+    response = session.get(f"{server}/api/v1/collections/abc/count")
+
+    assert response.status_code == 503
+    assert Unavailable.hits[("GET", "/api/v1/collections/abc/count")] == 3
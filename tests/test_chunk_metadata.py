@@ -0,0 +1,118 @@
+"""Filtros estruturados: a mesma regra para campo ausente em todos os backends"""
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.chunk_metadata import (
+    ALL_PORTFOLIOS, TYPED_WHERE, FilterColumns, SearchFilters, normalize_metadata
+)
+from app.services.embedding_service import filter_results
+
+
+TYPED = [
+    normalize_metadata({"year": 2008, "portfolio_type": "01", "quarter": "Q3"}),
+    normalize_metadata({"period_start": "2005-01-01", "period_end": "2009-12-31", "portfolio_type": "02"}),
+    normalize_metadata({"reference_date": "2012-06-30", "portfolio_type": "both"}),
+    normalize_metadata({"document_date": "1999-03-01", "portfolio_type": "PORTFOLIO 01", "quarter": 1}),
+    normalize_metadata({"source_document": "sem data"}),
+]
+
+# Ingeridos antes da metadata tipada: nenhum ou só parte dos campos
+LEGACY = [
+    {"source_document": "legado.md"},
+    {"year_start": 2001, "year_end": 2001},
+    {"portfolio_type": "02"},
+    {"quarter": 2},
+]
+
+FILTERS = [
+    SearchFilters(year_start=2008),
+    SearchFilters(year_end=2004),
+    SearchFilters(year_start=2007, year_end=2008),
+    SearchFilters(portfolio_type="01"),
+    SearchFilters(portfolio_type="02", year_start=2010),
+    SearchFilters(quarter=3),
+    SearchFilters(quarter=2, portfolio_type="02"),
+    SearchFilters(portfolio_type=ALL_PORTFOLIOS),
+]
+
+
+@pytest.mark.parametrize("search_filters", FILTERS, ids=repr)
+def test_mask_and_matches_agree_including_missing_fields(search_filters):
+    metadatas = TYPED + LEGACY
+    columns = FilterColumns.from_metadatas(metadatas)
+    expected = [search_filters.matches(metadata) for metadata in metadatas]
+
+    assert search_filters.mask(columns).tolist() == expected
+    # Faixa parcial (fatias por collection no índice global)
+    assert search_filters.mask(columns, 2, 6).tolist() == expected[2:6]
+
+
+def test_missing_field_passes():
+    search_filters = SearchFilters(year_start=2008, year_end=2008, portfolio_type="01", quarter=3)
+    assert search_filters.matches({})
+    assert search_filters.matches(None)
+    assert search_filters.matches({"portfolio_type": "01"})
+    assert not search_filters.matches({"portfolio_type": "02"})
+    assert not search_filters.matches({"year_start": 2001, "year_end": 2001})
+
+
+def test_empty_filters_pass_everything():
+    search_filters = SearchFilters(portfolio_type=ALL_PORTFOLIOS)
+    assert search_filters.is_empty
+    assert search_filters.to_where() is None
+    assert search_filters.mask(FilterColumns.from_metadatas(TYPED + LEGACY)).all()
+
+
+def test_merge_where_keeps_existing_clause():
+    existing = {"source_document": "a.md"}
+    assert SearchFilters().merge_where(existing) == existing
+    assert SearchFilters(quarter=1).merge_where(existing) == {"$and": [existing, {"quarter": {"$in": [1, 0]}}]}
+
+
+@pytest.fixture(scope="module")
+def chroma_collection():
+    chromadb = pytest.importorskip("chromadb")
+    from chromadb.config import Settings
+
+    client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False, allow_reset=True))
+    collection = client.create_collection(f"filters_{uuid.uuid4().hex[:8]}")
+    metadatas = TYPED + LEGACY
+    collection.add(
+        ids=[f"c{i}" for i in range(len(metadatas))],
+        embeddings=[[float(i), 1.0] for i in range(len(metadatas))],
+        documents=[f"doc {i}" for i in range(len(metadatas))],
+        metadatas=metadatas,
+    )
+    return collection
+
+
+@pytest.mark.parametrize("search_filters", [f for f in FILTERS if not f.is_empty], ids=repr)
+def test_to_where_matches_rule_on_typed_chunks(chroma_collection, search_filters):
+    found = set(chroma_collection.get(where=search_filters.to_where(), include=[])["ids"])
+
+    for i, metadata in enumerate(TYPED):
+        assert (f"c{i}" in found) == search_filters.matches(metadata)
+
+
+def test_typed_where_selects_only_typed_chunks(chroma_collection):
+    found = set(chroma_collection.get(where=TYPED_WHERE, include=[])["ids"])
+    assert found == {f"c{i}" for i in range(len(TYPED))}
+
+
+def test_filter_results_applies_rule_and_keeps_order():
+    metadatas = LEGACY + TYPED
+    results = {
+        "ids": [f"c{i}" for i in range(len(metadatas))],
+        "documents": [f"doc {i}" for i in range(len(metadatas))],
+        "metadatas": metadatas,
+        "distances": list(np.linspace(0.1, 0.9, len(metadatas))),
+    }
+    search_filters = SearchFilters(portfolio_type="01")
+    expected = [f"c{i}" for i, m in enumerate(metadatas) if search_filters.matches(m)]
+
+    filtered = filter_results(results, search_filters, n=3)
+    assert filtered["ids"] == expected[:3]
+    assert filtered["distances"] == sorted(filtered["distances"])
+    assert len(filtered["metadatas"]) == len(filtered["documents"]) == 3
@@ -0,0 +1,106 @@
+"""Alias blue/green das collections: publish e rollback"""
+import uuid
+
+import pytest
+
+from app.services.collection_registry import CollectionRegistry, versioned_name
+
+
+@pytest.fixture
+def client():
+    chromadb = pytest.importorskip("chromadb")
+    from chromadb.config import Settings
+
+    return chromadb.EphemeralClient(Settings(anonymized_telemetry=False, allow_reset=True))
+
+
+@pytest.fixture
+def base():
+    # EphemeralClient é compartilhado no processo: uma base por teste
+    return f"facts_{uuid.uuid4().hex[:8]}"
+
+
+def names(client, base):
+    return sorted(c.name for c in client.list_collections() if c.name.startswith(base))
+
+
+def test_publish_flips_alias_and_keeps_previous(client, base, tmp_path):
+    registry = CollectionRegistry(client, str(tmp_path))
+    registry.get_active(base)  # layout antigo: collection com o nome base
+
+    build = registry.begin_build(base)
+    assert build.name == versioned_name(base, 1)
+    assert registry.active_name(base) == base
+
+    entry = registry.publish(base, build.name)
+
+    assert entry["active"] == build.name
+    assert entry["previous"] == base
+    assert names(client, base) == sorted([base, build.name])
+    # Outra réplica/processo lendo o mesmo diretório vê a troca
+    assert CollectionRegistry(client, str(tmp_path)).active_name(base) == build.name
+
+
+def test_publish_deletes_versions_older_than_previous(client, base, tmp_path):
+    registry = CollectionRegistry(client, str(tmp_path))
+    registry.get_active(base)
+    first = registry.begin_build(base).name
+    registry.publish(base, first)
+    second = registry.begin_build(base).name
+
+    registry.publish(base, second)
+
+    assert second == versioned_name(base, 2)
+    assert registry.previous_name(base) == first
+    assert names(client, base) == sorted([first, second])
+
+
+def test_rollback_swaps_active_and_previous(client, base, tmp_path):
+    registry = CollectionRegistry(client, str(tmp_path))
+    first = registry.begin_build(base).name
+    registry.publish(base, first)
+    second = registry.begin_build(base).name
+    registry.publish(base, second)
+    generation = registry.generation
+
+    entry = registry.rollback(base)
+
+    assert entry == {"active": first, "previous": second, "published_at": entry["published_at"]}
+    assert registry.active_name(base) == first
+    assert registry.generation == generation + 1
+    # Rollback do rollback volta para a versão nova
+    assert registry.rollback(base)["active"] == second
+
+
+def test_rollback_without_previous_version_fails(client, base, tmp_path):
+    registry = CollectionRegistry(client, str(tmp_path))
+
+    with pytest.raises(ValueError, match="Nenhuma versão anterior"):
+        registry.rollback(base)
+
+    build = registry.begin_build(base).name
+    registry.publish(base, build, keep_previous=False)
+    with pytest.raises(ValueError, match="Nenhuma versão anterior"):
+        registry.rollback(base)
+
+
+def test_rollback_fails_when_previous_collection_is_gone(client, base, tmp_path):
+    registry = CollectionRegistry(client, str(tmp_path))
+    registry.get_active(base)
+    registry.publish(base, registry.begin_build(base).name)
+    client.delete_collection(base)
+
+    with pytest.raises(ValueError, match="não existe mais"):
+        registry.rollback(base)
+
+
+def test_refresh_picks_up_publish_from_another_registry(client, base, tmp_path):
+    reader = CollectionRegistry(client, str(tmp_path))
+    writer = CollectionRegistry(client, str(tmp_path))
+
+    writer.publish(base, writer.begin_build(base).name)
+
+    assert reader.active_name(base) == base
+    assert reader.refresh() is True
+    assert reader.active_name(base) == versioned_name(base, 1)
+    assert reader.refresh() is False
@@ -0,0 +1,247 @@
+"""Revalidação das imagens: If-None-Match / If-Modified-Since e ETag igual ao do S3/R2"""
+import asyncio
+import hashlib
+import io
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from dateutil.tz import tzutc
+from botocore.response import StreamingBody
+from starlette.requests import Request
+
+from app.api.routes.documents import _build_cache_headers, _is_not_modified, get_portfolio_image
+from app.services.storage_service import (
+    AsyncLocalStorageBackend,
+    AsyncS3StorageBackend,
+    AsyncStorageBackend,
+    LocalStorageBackend,
+    compute_s3_etag,
+    storage_service,
+)
+
+
+LAST_MODIFIED = datetime(2024, 5, 10, 12, 30, 15, 123456, tzinfo=timezone.utc)
+ETAG = '"0cc175b9c0f1b6a831c399e269772661"'
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("Fri, 10 May 2024 12:30:15 GMT", True),
+    ("Fri, 10 May 2024 12:30:15 -0000", True),   # naive no parsedate_to_datetime
+    ("Fri, 10 May 2024 14:30:15 +0200", True),
+    ("Fri, 10 May 2024 12:30:14 GMT", False),
+    ("Fri, 10 May 2024 12:30:14 -0000", False),
+    ("não é uma data", False),
+])
+def test_if_modified_since(header, expected):
+    request = make_request(if_modified_since=header)
+    assert _is_not_modified(request, {"etag": ETAG, "last_modified": LAST_MODIFIED}) is expected
+
+
+def test_if_modified_since_with_naive_last_modified():
+    request = make_request(if_modified_since="Fri, 10 May 2024 12:30:15 GMT")
+    naive = LAST_MODIFIED.replace(tzinfo=None)
+    assert _is_not_modified(request, {"last_modified": naive})
+
+
+def test_if_none_match_takes_precedence():
+    request = make_request(if_none_match='"outro"', if_modified_since="Fri, 10 May 2030 00:00:00 GMT")
+    assert not _is_not_modified(request, {"etag": ETAG, "last_modified": LAST_MODIFIED})
+
+
+@pytest.mark.parametrize("header, expected", [
+    (ETAG, True),
+    (f'"a", W/{ETAG}', True),
+    ("*", True),
+    ('"b"', False),
+])
+def test_if_none_match(header, expected):
+    assert _is_not_modified(make_request(if_none_match=header), {"etag": ETAG}) is expected
+
+
+def test_if_none_match_without_etag():
+    assert not _is_not_modified(make_request(if_none_match="*"), {"last_modified": LAST_MODIFIED})
+
+
+def test_cache_headers_accept_boto3_timezone():
+    headers = _build_cache_headers(
+        {"etag": ETAG, "last_modified": LAST_MODIFIED.astimezone(tzutc())},
+        "public"
+    )
+    assert headers["Last-Modified"] == "Fri, 10 May 2024 12:30:15 GMT"
+    assert headers["ETag"] == ETAG
+
+
+def test_s3_etag_single_part_is_md5(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(b"a" * 1000)
+    assert compute_s3_etag(path, 1000) == hashlib.md5(b"a" * 1000).hexdigest()
+
+
+def test_s3_etag_multipart(tmp_path):
+    data = b"x" * 250
+    path = tmp_path / "scan.png"
+    path.write_bytes(data)
+    parts = [data[i:i + 100] for i in range(0, len(data), 100)]
+    expected = hashlib.md5(b"".join(hashlib.md5(part).digest() for part in parts)).hexdigest()
+
+    assert compute_s3_etag(path, len(data), threshold=200, chunksize=100) == f"{expected}-3"
+
+
+def test_local_backend_etag_matches_s3(tmp_path):
+    (tmp_path / "2008").mkdir()
+    path = tmp_path / "2008" / "page_1.jpg"
+    path.write_bytes(b"imagem")
+
+    metadata = LocalStorageBackend(str(tmp_path)).get_file_metadata("2008/page_1.jpg")
+    assert metadata["etag"] == f'"{compute_s3_etag(path, path.stat().st_size)}"'
+    assert metadata["last_modified"].tzinfo is not None
+
+
+class RemoteBackend(AsyncStorageBackend):
+    """Backend sem disco local (como o S3/R2): usa o get_file_path da base"""
+
+    def __init__(self, url="https://r2.example/{path}?sig=1"):
+        self.url = url
+
+    async def file_exists(self, path):
+        return True
+
+    async def list_directory(self, path=""):
+        return []
+
+    async def is_directory(self, path):
+        return False
+
+    async def get_file(self, path):
+        raise AssertionError("a rota não deve carregar o arquivo inteiro")
+
+    async def get_file_url(self, path):
+        return self.url.format(path=path) if self.url else None
+
+    async def get_file_metadata(self, path):
+        return {"etag": ETAG, "size": 6, "last_modified": LAST_MODIFIED}
+
+    async def iter_file(self, path, start=0, end=None, chunk_size=2):
+        data = b"imagem"[start:None if end is None else end + 1]
+        for offset in range(0, len(data), chunk_size):
+            yield data[offset:offset + chunk_size]
+
+
+async def read_body(response):
+    return b"".join([block async for block in response.body_iterator])
+
+
+def test_image_route_redirects_when_backend_has_no_local_path(monkeypatch):
+    monkeypatch.setattr(storage_service, "_async_backend", RemoteBackend())
+
+    response = asyncio.run(get_portfolio_image("2008/page_1.jpg", make_request()))
+
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://r2.example/2008/page_1.jpg?sig=1"
+    assert response.headers["etag"] == ETAG
+
+
+def test_image_route_streams_when_no_presigned_url(monkeypatch):
+    monkeypatch.setattr(storage_service, "_async_backend", RemoteBackend(url=None))
+
+    async def serve():
+        response = await get_portfolio_image("2008/page_1.jpg", make_request())
+        return response, await read_body(response)
+
+    response, body = asyncio.run(serve())
+
+    assert response.status_code == 200
+    assert body == b"imagem"
+    assert response.headers["content-length"] == "6"
+
+
+@pytest.fixture
+def local_image(tmp_path):
+    (tmp_path / "2008").mkdir()
+    (tmp_path / "2008" / "page_1.jpg").write_bytes(b"0123456789")
+    return tmp_path
+
+
+def serve_local(monkeypatch, root, **headers):
+    async def serve():
+        # CapacityLimiter do backend precisa de um event loop rodando
+        backend = AsyncLocalStorageBackend(LocalStorageBackend(str(root)))
+        monkeypatch.setattr(storage_service, "_async_backend", backend)
+        response = await get_portfolio_image("2008/page_1.jpg", make_request(**headers))
+        body = await read_body(response) if hasattr(response, "body_iterator") else response.body
+        return response, body
+
+    return asyncio.run(serve())
+
+
+def test_image_route_streams_local_file(monkeypatch, local_image):
+    response, body = serve_local(monkeypatch, local_image)
+
+    assert response.status_code == 200
+    assert body == b"0123456789"
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    revalidated, _ = serve_local(monkeypatch, local_image, if_none_match=response.headers["etag"])
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.parametrize("header, status, body, content_range", [
+    ("bytes=2-5", 206, b"2345", "bytes 2-5/10"),
+    ("bytes=7-", 206, b"789", "bytes 7-9/10"),
+    ("bytes=-3", 206, b"789", "bytes 7-9/10"),
+    ("bytes=8-100", 206, b"89", "bytes 8-9/10"),
+    ("bytes=0-1,4-5", 200, b"0123456789", None),
+    ("items=0-1", 200, b"0123456789", None),
+])
+def test_image_route_range(monkeypatch, local_image, header, status, body, content_range):
+    response, content = serve_local(monkeypatch, local_image, range=header)
+
+    assert response.status_code == status
+    assert content == body
+    assert response.headers["content-length"] == str(len(body))
+    assert response.headers.get("content-range") == content_range
+
+
+def test_image_route_range_not_satisfiable(monkeypatch, local_image):
+    response, _ = serve_local(monkeypatch, local_image, range="bytes=10-")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_image_route_ignores_range_with_stale_if_range(monkeypatch, local_image):
+    response, body = serve_local(monkeypatch, local_image, range="bytes=2-5", if_range='"outro"')
+
+    assert response.status_code == 200
+    assert body == b"0123456789"
+
+
+def test_s3_iter_file_streams_body_in_chunks():
+    data = bytes(range(256)) * 4
+    calls = []
+
+    def get_object(**params):
+        calls.append(params)
+        return {"Body": StreamingBody(io.BytesIO(data), len(data))}
+
+    client = SimpleNamespace(get_object=get_object)
+    backend = SimpleNamespace(bucket_name="bucket", max_pool_connections=2, client=client)
+
+    async def read(**kwargs):
+        storage = AsyncS3StorageBackend(backend)
+        return [block async for block in storage.iter_file("2008/page_1.jpg", chunk_size=100, **kwargs)]
+
+    blocks = asyncio.run(read())
+    assert b"".join(blocks) == data
+    assert max(len(block) for block in blocks) == 100
+    assert "Range" not in calls[0]
+
+    asyncio.run(read(start=10, end=19))
+    assert calls[1]["Range"] == "bytes=10-19"
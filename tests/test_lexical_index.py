@@ -0,0 +1,132 @@
+"""BM25 e reciprocal rank fusion"""
+import threading
+
+import pytest
+
+from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import SearchFilters, normalize_metadata
+from app.services.lexical_index import LexicalIndex, _CategoryIndex, reciprocal_rank_fusion, tokenize
+
+
+class StubCollection:
+    def __init__(self, name, ids, documents, metadatas):
+        self.name = name
+        self._data = {"ids": ids, "documents": documents, "metadatas": metadatas}
+
+    def count(self):
+        return len(self._data["ids"])
+
+    def get(self, include=None, **kwargs):
+        return self._data
+
+
+@pytest.fixture
+def collections():
+    return {
+        ChunkCategory.FACTS: StubCollection(
+            "portfolio_facts",
+            ["a", "b", "c"],
+            ["Global Property Fund perdeu 256.4 mil em 2008",
+             "Taxas de administração do portfolio 02",
+             "ISIN LU0123456789 no Global Property Fund"],
+            [normalize_metadata({"year": 2008, "portfolio_type": "01"}),
+             normalize_metadata({"portfolio_type": "02"}),
+             {}],
+        )
+    }
+
+
+def test_tokenize_keeps_numbers_and_codes():
+    assert tokenize("Perda de 256.4 no LU0123456789 em 2008") == ["perda", "256.4", "lu0123456789", "2008"]
+
+
+def test_search_ranks_exact_terms(collections):
+    index = LexicalIndex("/nonexistent")
+    index.build(collections)
+    result = index.search("256.4 Global Property", {ChunkCategory.FACTS: 3})[ChunkCategory.FACTS]
+    assert result["ids"][0] == "a"
+    assert set(result["ids"]) == {"a", "c"}
+
+
+def test_search_filters_keep_chunks_without_typed_fields(collections):
+    index = LexicalIndex("/nonexistent")
+    index.build(collections)
+    result = index.search("Global Property", {ChunkCategory.FACTS: 3},
+                          SearchFilters(portfolio_type="02"))[ChunkCategory.FACTS]
+    assert result["ids"] == ["c"]
+
+
+def test_save_and_load_round_trip(tmp_path, collections):
+    index = LexicalIndex(str(tmp_path))
+    index.build(collections)
+    index.save()
+
+    loaded = LexicalIndex(str(tmp_path))
+    assert loaded.load()
+    assert loaded.version == index.version
+    query = {ChunkCategory.FACTS: 2}
+    assert loaded.search("portfolio 02", query) == index.search("portfolio 02", query)
+
+
+def test_concurrent_saves_use_private_tmp_files(tmp_path, collections):
+    indexes = [LexicalIndex(str(tmp_path)) for _ in range(8)]
+    for index in indexes:
+        index.build(collections)
+
+    errors = []
+
+    def save(index):
+        try:
+            for _ in range(20):
+                index.save()
+        except Exception as e:  # pragma: no cover - só em caso de falha
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(index,)) for index in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert LexicalIndex(str(tmp_path)).load()
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".tmp"] == []
+
+
+def test_rrf_combines_rankings():
+    vector = {"ids": ["a", "b", "c"], "documents": ["A", "B", "C"], "metadatas": [{}, {}, {}],
+              "distances": [0.1, 0.2, 0.3]}
+    lexical = {"ids": ["c", "d"], "documents": ["C", "D"], "metadatas": [{}, {"x": 1}], "scores": [5.0, 1.0]}
+
+    fused = reciprocal_rank_fusion([vector, lexical], n_results=3)
+    assert fused["ids"] == ["c", "a", "b"]
+    assert fused["documents"] == ["C", "A", "B"]
+    assert fused["distances"] == [0.3, 0.1, 0.2]
+    assert fused["rrf_scores"][0] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_rrf_ties_keep_first_ranking_order_and_fill_missing_fields():
+    fused = reciprocal_rank_fusion([{"ids": ["a"]}, {"ids": ["b"], "documents": ["B"]}], n_results=5)
+    assert fused["ids"] == ["a", "b"]
+    assert fused["documents"] == ["", "B"]
+    assert fused["distances"] == [None, None]
+
+
+def test_workers_rebuild_once_under_lock(tmp_path, collections, monkeypatch):
+    builds = []
+    original_build = LexicalIndex.build
+
+    def counting_build(self, *args, **kwargs):
+        builds.append(self)
+        return original_build(self, *args, **kwargs)
+
+    monkeypatch.setattr(LexicalIndex, "build", counting_build)
+    workers = [LexicalIndex(str(tmp_path)) for _ in range(4)]
+    threads = [threading.Thread(target=worker.ensure_fresh, args=(collections,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(worker.size == 3 for worker in workers)
@@ -0,0 +1,33 @@
+"""/metrics: desligado por padrão e protegido por METRICS_TOKEN"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import Settings
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_disabled_by_default(client, monkeypatch):
+    assert Settings.model_fields["METRICS_ENABLED"].default is False
+    monkeypatch.setattr(main.settings, "METRICS_ENABLED", False)
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(main.settings, "METRICS_TOKEN", "s3cret")
+
+    missing = client.get("/metrics")
+    wrong = client.get("/metrics", headers={"Authorization": "Bearer errado"})
+    ok = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+
+    assert missing.status_code == 401
+    assert missing.headers["www-authenticate"] == "Bearer"
+    assert wrong.status_code == 401
+    assert ok.status_code == 200
+    assert ok.headers["content-type"].startswith("text/plain")
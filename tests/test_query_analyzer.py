@@ -0,0 +1,92 @@
+"""QueryAnalyzer: anos, valores com moeda/unidade e trimestres"""
+import pytest
+
+from app.services.chunk_metadata import SearchFilters
+from app.services.query_analyzer import QueryAnalyzer
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return QueryAnalyzer()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Quanto perdi em 2008?", (2008, 2008)),
+    ("O que aconteceu entre 2005 e 2009?", (2005, 2009)),
+    ("Retiradas de 2001 a 2003", (2001, 2003)),
+    ("Evolução 2008-2010 no portfolio 02", (2008, 2010)),
+    ("Desde 2005 o banco sabia?", (2005, None)),
+    ("Antes de 2008", (None, 2008)),
+    ("Explique a evolução de 1998 até hoje", (1998, None)),
+    ("Desde 2005 até agora, quanto perdi?", (2005, None)),
+    ("Como está o portfolio 02 atualmente? Comecei em 1998", (1998, None)),
+    ("Entre 2001 e 2003, e até hoje?", (2001, 2003)),
+])
+def test_years(analyzer, query, expected):
+    analysis = analyzer.analyze(query)
+    assert (analysis.year_start, analysis.year_end) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "Paguei 2000 francos de taxa",
+    "A taxa foi de 1500 CHF",
+    "Cobraram CHF 2000 por ano",
+    "Foram US$ 2005 de custódia",
+    "Um retorno de 2010% é possível?",
+    "Perdi 2000 mil na carteira",
+    "Taxas entre 2000 e 3000 francos",
+])
+def test_amounts_are_not_years(analyzer, query):
+    analysis = analyzer.analyze(query)
+    assert analysis.year_start is None and analysis.year_end is None
+    assert analysis.years == ()
+
+
+def test_amount_next_to_year(analyzer):
+    analysis = analyzer.analyze("Recebi 2000 francos em 2009")
+    assert (analysis.year_start, analysis.year_end) == (2009, 2009)
+    assert analysis.years == (2009,)
+
+    analysis = analyzer.analyze("Taxa de 1500 CHF entre 2005 e 2008")
+    assert (analysis.year_start, analysis.year_end) == (2005, 2008)
+
+
+@pytest.mark.parametrize("query, quarter", [
+    ("Performance no Q3 de 2008", 3),
+    ("q1 2009", 1),
+    ("O que houve no 3º trimestre de 2009?", 3),
+    ("no 4° trimestre", 4),
+    ("terceiro trimestre de 2008", 3),
+    ("2nd quarter 2010", 2),
+    ("Q1 e Q2 de 2010", None),
+    ("Quanto perdi em 2008?", None),
+])
+def test_quarter(analyzer, query, quarter):
+    assert analyzer.analyze(query).quarter == quarter
+
+
+@pytest.mark.parametrize("query, portfolios", [
+    ("O que aconteceu em 01 de março de 2008?", ()),
+    ("Em 02 de abril de 2009 a carteira caiu?", ()),
+    ("No dia 01 o portfolio ainda existia?", ()),
+    ("Em 01-jan-2008 o portfolio 02 tinha imóveis?", ("02",)),
+    ("Portfolios 01 e 02 em 2008", ("01", "02")),
+    ("Compare o 01 com o 02 nas carteiras", ("01", "02")),
+    ("Compare o 01 com o 02", ()),
+])
+def test_bare_portfolio_ids(analyzer, query, portfolios):
+    assert analyzer.analyze(query).portfolios == portfolios
+
+
+def test_date_does_not_become_portfolio_filter(analyzer):
+    filters = analyzer.analyze("O que aconteceu em 01 de março de 2008?").to_search_filters()
+    assert filters == SearchFilters(year_start=2008, year_end=2008)
+
+
+def test_search_filters_carry_quarter_and_portfolio(analyzer):
+    filters = analyzer.analyze("Portfolio 01 no Q3 2008").to_search_filters()
+    assert filters == SearchFilters(year_start=2008, year_end=2008, portfolio_type="01", quarter=3)
+
+
+def test_no_constraints_no_filters(analyzer):
+    assert analyzer.analyze("O banco errou comigo?").to_search_filters() is None
@@ -0,0 +1,45 @@
+"""/ready: 200 só depois de um warm-up bem-sucedido"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client():
+    # Sem o context manager o lifespan não roda (nada de Chroma/OpenAI)
+    yield TestClient(main.app)
+    main.app.state.ready = False
+    main.app.state.warmup = {}
+
+
+def test_warming_up(client):
+    main.app.state.ready = False
+    main.app.state.warmup = {}
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "warming_up"}
+
+
+def test_failed_warm_up_stays_not_ready(client, monkeypatch):
+    def fail(app):
+        raise RuntimeError("chroma indisponível")
+
+    monkeypatch.setattr(main, "_build_and_warm_up", fail)
+    asyncio.run(main.warm_up_services(main.app))
+
+    assert main.app.state.ready is False
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "failed", "error": "chroma indisponível"}
+
+
+def test_successful_warm_up(client, monkeypatch):
+    monkeypatch.setattr(main, "_build_and_warm_up", lambda app: {"agents": 8})
+    asyncio.run(main.warm_up_services(main.app))
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "warmup": {"agents": 8}}
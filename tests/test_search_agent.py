@@ -0,0 +1,56 @@
+"""SearchAgent: repete a busca sem o recorte quando ele não deixa nenhum documento"""
+import asyncio
+
+import pytest
+
+from app.agents.search import SearchAgent
+from app.services.chunk_metadata import SearchFilters
+
+
+class StubEmbeddingService:
+    """Só os documentos "sem recorte" existem; qualquer filtro esvazia a busca"""
+
+    def __init__(self):
+        self.calls = []
+
+    def search_categories(self, query, n_by_category, search_filters=None):
+        self.calls.append(search_filters)
+        documents = [] if search_filters is not None else ["doc"]
+        return {
+            category: {"ids": [f"id{i}" for i in range(len(documents))], "documents": list(documents),
+                       "metadatas": [{}] * len(documents), "distances": [0.1] * len(documents)}
+            for category in n_by_category
+        }
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.delenv("COHERE_API_KEY", raising=False)
+    return SearchAgent(StubEmbeddingService())
+
+
+def search(agent, **kwargs):
+    return asyncio.run(agent.search_hierarchical("pergunta", use_rerank=False, **kwargs))
+
+
+def test_empty_filtered_search_retries_without_filters(agent):
+    results = search(agent, search_filters=SearchFilters(year_start=2030))
+    assert agent.embedding_service.calls == [SearchFilters(year_start=2030), None]
+    assert any(r["documents"] for r in results.values())
+
+
+def test_retry_keeps_request_filters(agent):
+    request = SearchFilters(year_start=2008)
+    search(agent, search_filters=SearchFilters(year_start=2008, quarter=3), fallback_filters=request)
+    assert agent.embedding_service.calls == [SearchFilters(year_start=2008, quarter=3), request]
+
+
+def test_no_retry_when_fallback_is_the_same(agent):
+    request = SearchFilters(year_start=2008)
+    search(agent, search_filters=request, fallback_filters=request)
+    assert agent.embedding_service.calls == [request]
+
+
+def test_unfiltered_search_runs_once(agent):
+    search(agent)
+    assert agent.embedding_service.calls == [None]
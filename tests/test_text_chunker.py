@@ -0,0 +1,59 @@
+"""TextChunker: orçamento de tokens, palavras inteiras e nomes antigos do chunk_text"""
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.services.document_processor import DocumentProcessor
+from app.services.text_chunker import TextChunker, tokens_from_chars
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+from benchmark_chunker import SAMPLE_TEXT, count_broken_edges, legacy_chunk_text  # noqa: E402
+
+TEXT = SAMPLE_TEXT * 50
+
+
+@pytest.fixture(scope="module")
+def chunker():
+    return TextChunker()
+
+
+def test_defaults_do_not_increase_chunk_count(chunker):
+    assert len(chunker.chunk(TEXT)) <= len(legacy_chunk_text(TEXT))
+
+
+def test_chunks_fit_budget_and_keep_words(chunker):
+    chunks = chunker.chunk(TEXT)
+    assert all(chunker.count_tokens(chunk) <= chunker.max_tokens for chunk in chunks)
+    assert count_broken_edges(TEXT, chunks) == 0
+    assert count_broken_edges(TEXT, legacy_chunk_text(TEXT)) > 0
+
+
+def test_word_longer_than_budget_is_kept_whole():
+    chunker = TextChunker(max_tokens=8, overlap_tokens=2)
+    url = "https://" + "/".join(["segmento"] * 10)
+    chunks = chunker.chunk(f"Veja o documento em {url} para detalhes.")
+    assert url in chunks
+    assert chunker.count_tokens(url) > chunker.max_tokens
+
+
+def test_legacy_keyword_names_are_character_sizes():
+    expected = DocumentProcessor.chunk_text(
+        TEXT, max_tokens=tokens_from_chars(1000), overlap_tokens=tokens_from_chars(200)
+    )
+    assert DocumentProcessor.chunk_text(TEXT, chunk_size=1000, overlap=200) == expected
+    assert list(DocumentProcessor.iter_text_chunks(TEXT, chunk_size=1000)) == \
+        DocumentProcessor.chunk_text(TEXT, max_tokens=250)
+
+
+def test_positional_sizes_are_rejected():
+    # chunk_text(text, 1000, 200) era em caracteres: não pode virar 1000 tokens em silêncio
+    with pytest.raises(TypeError):
+        DocumentProcessor.chunk_text(TEXT, 1000, 200)
+    with pytest.raises(TypeError):
+        DocumentProcessor.iter_text_chunks(TEXT, 1000)
+
+
+def test_overlap_must_be_smaller_than_budget():
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=32, overlap_tokens=32)
@@ -0,0 +1,91 @@
+"""UBSDocsProcessor: extração serial página a página e cache de texto"""
+from concurrent.futures import ThreadPoolExecutor
+
+import PyPDF2
+import pytest
+
+from app.processors.ubs_docs_processor import UBSDocsProcessor
+
+
+class FakePage:
+    def __init__(self, number, extracted):
+        self.number = number
+        self.extracted = extracted
+
+    def extract_text(self):
+        self.extracted.append(self.number)
+        return f"Texto da página {self.number}. " * 10
+
+
+@pytest.fixture
+def fake_pdf(tmp_path, monkeypatch):
+    extracted = []
+
+    class FakeReader:
+        def __init__(self, stream):
+            self.pages = [FakePage(number, extracted) for number in range(1, 6)]
+
+    monkeypatch.setattr(PyPDF2, "PdfReader", FakeReader)
+    pdf_path = tmp_path / "docs" / "Code of Conduct.pdf"
+    pdf_path.parent.mkdir()
+    pdf_path.write_bytes(b"%PDF-1.4 fake")
+    return pdf_path, extracted
+
+
+def test_serial_extraction_is_lazy(fake_pdf, tmp_path):
+    pdf_path, extracted = fake_pdf
+    processor = UBSDocsProcessor(str(pdf_path.parent), cache_dir=str(tmp_path / "cache"))
+
+    pages = processor._iter_pdf_pages(pdf_path)
+    assert next(pages)[0] == 1
+    assert extracted == [1]
+    assert next(pages)[0] == 2
+    assert extracted == [1, 2]
+
+    assert [num for num, _ in pages] == [3, 4, 5]
+
+
+def test_cached_pages_skip_extraction(fake_pdf, tmp_path):
+    pdf_path, extracted = fake_pdf
+    processor = UBSDocsProcessor(str(pdf_path.parent), cache_dir=str(tmp_path / "cache"))
+
+    first = list(processor._iter_pdf_pages(pdf_path))
+    extracted.clear()
+    assert list(processor._iter_pdf_pages(pdf_path)) == first
+    assert extracted == []
+
+
+
+def test_only_missing_pages_are_extracted(fake_pdf, tmp_path):
+    pdf_path, extracted = fake_pdf
+    processor = UBSDocsProcessor(str(pdf_path.parent), cache_dir=str(tmp_path / "cache"))
+    first = list(processor._iter_pdf_pages(pdf_path))
+
+    page_dir = processor.cache_dir / processor._file_hash(pdf_path)
+    (page_dir / "2.txt").unlink()
+    (page_dir / "4.txt").unlink()
+    extracted.clear()
+
+    assert list(processor._iter_pdf_pages(pdf_path)) == first
+    assert extracted == [2, 4]
+    assert (page_dir / "2.txt").exists() and (page_dir / "4.txt").exists()
+
+
+def test_parallel_extraction_of_missing_pages(fake_pdf, tmp_path, monkeypatch):
+    pdf_path, extracted = fake_pdf
+    processor = UBSDocsProcessor(str(pdf_path.parent), cache_dir=str(tmp_path / "cache"))
+    first = list(processor._iter_pdf_pages(pdf_path))
+
+    page_dir = processor.cache_dir / processor._file_hash(pdf_path)
+    for num in (1, 3, 5):
+        (page_dir / f"{num}.txt").unlink()
+    extracted.clear()
+
+    # Threads no lugar de processos: o PdfReader falso só existe neste processo
+    monkeypatch.setattr(UBSDocsProcessor, "PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(UBSDocsProcessor, "PAGES_PER_TASK", 2)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor._executor = executor
+        assert list(processor._iter_pdf_pages(pdf_path)) == first
+
+    assert sorted(extracted) == [1, 3, 5]
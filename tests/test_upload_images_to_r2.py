@@ -0,0 +1,45 @@
+"""Sync de imagens para o R2: plano de upload e manifest"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+upload = pytest.importorskip("upload_images_to_r2")
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name, content in (("2008/page_1.jpg", b"a"), ("2009/page_1.jpg", b"b")):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        paths.append((path, name))
+    return paths
+
+
+def test_full_plan_records_hashes_for_mark_uploaded(tmp_path, files):
+    manifest = upload.SyncManifest(tmp_path / "manifest.json", "bucket")
+    pending = upload.plan_uploads(files, {}, manifest, full=True)
+    assert pending == files
+
+    for _, s3_key in pending:
+        manifest.mark_uploaded(s3_key)
+    manifest.save()
+
+    reloaded = upload.SyncManifest(tmp_path / "manifest.json", "bucket")
+    for path, s3_key in files:
+        etag = upload.compute_s3_etag(path, path.stat().st_size)
+        assert reloaded.is_uploaded(s3_key, etag)
+
+
+def test_incremental_plan_skips_matching_remote(tmp_path, files):
+    manifest = upload.SyncManifest(tmp_path / "manifest.json", "bucket")
+    (path, s3_key), (changed_path, changed_key) = files
+    remote = {
+        s3_key: (path.stat().st_size, upload.compute_s3_etag(path, path.stat().st_size)),
+        changed_key: (changed_path.stat().st_size, "outro"),
+    }
+    assert upload.plan_uploads(files, remote, manifest) == [(changed_path, changed_key)]
@@ -0,0 +1,59 @@
+"""Escopo de contabilidade de uso (track_usage / start_tracking)"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services import usage_tracker
+from app.services.usage_tracker import record_usage, start_tracking, stop_tracking, track_usage
+
+
+def current():
+    return usage_tracker._current_usage.get()
+
+
+def test_track_usage_accumulates_and_closes_scope():
+    with track_usage() as usage:
+        record_usage("search", "text-embedding-3-small", SimpleNamespace(prompt_tokens=1000))
+        record_usage("analysis", "gpt-4.1-mini", SimpleNamespace(prompt_tokens=100, completion_tokens=50))
+
+    assert usage.total_tokens == 1150
+    assert usage.cost_usd > 0
+    assert current() is None
+
+
+def test_stop_tracking_restores_previous_scope():
+    with track_usage() as outer:
+        inner, token = start_tracking()
+        assert current() is inner
+        stop_tracking(token)
+        assert current() is outer
+
+
+def test_streaming_scope_does_not_leak_into_the_caller():
+    async def stream():
+        usage, token = start_tracking()
+        try:
+            record_usage("search", "gpt-4.1-mini", SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+            yield usage
+        finally:
+            stop_tracking(token)
+
+    async def route():
+        events = [event async for event in stream()]
+        # Depois do stream, chamadas da rota não caem no uso do request
+        return events[0], current()
+
+    usage, after = asyncio.run(route())
+
+    assert usage.total_tokens == 15
+    assert after is None
+
+
+def test_stop_tracking_from_another_context_is_ignored():
+    _, token = start_tracking()
+
+    async def close_elsewhere():
+        stop_tracking(token)
+
+    asyncio.run(close_elsewhere())
+    stop_tracking(token)
+    assert current() is None
@@ -0,0 +1,90 @@
+"""Busca exata do LocalVectorIndex (float32, float16 e int8)"""
+import numpy as np
+import pytest
+
+from app.models.chunks import ChunkCategory
+from app.services.chunk_metadata import SearchFilters, normalize_metadata
+from app.services.vector_index import LocalVectorIndex
+
+DIMS = 32
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(7)
+    facts = rng.normal(size=(20, DIMS)).astype(np.float32)
+    forensic = rng.normal(size=(10, DIMS)).astype(np.float32)
+    return {
+        ChunkCategory.FACTS: {
+            "ids": [f"fact_{i}" for i in range(20)],
+            "embeddings": facts.tolist(),
+            "documents": [f"fato {i}" for i in range(20)],
+            "metadatas": [normalize_metadata({"year": 2000 + i % 10}) for i in range(20)],
+        },
+        ChunkCategory.FORENSIC: {
+            "ids": [f"forensic_{i}" for i in range(10)],
+            "embeddings": forensic.tolist(),
+            "documents": [f"análise {i}" for i in range(10)],
+            "metadatas": [{} for _ in range(10)],
+        },
+    }
+
+
+def build(data, dtype):
+    index = LocalVectorIndex(dtype=dtype)
+    index.build(data)
+    return index
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_search_finds_the_query_vector_itself(data, dtype):
+    index = build(data, dtype)
+    query = data[ChunkCategory.FACTS]["embeddings"][3]
+
+    results = index.search(query, {ChunkCategory.FACTS: 5, ChunkCategory.FORENSIC: 3})
+
+    assert results[ChunkCategory.FACTS]["ids"][0] == "fact_3"
+    assert results[ChunkCategory.FACTS]["distances"][0] == pytest.approx(0.0, abs=0.02)
+    assert len(results[ChunkCategory.FORENSIC]["ids"]) == 3
+    distances = results[ChunkCategory.FACTS]["distances"]
+    assert distances == sorted(distances)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_ranking_matches_float32(data, dtype):
+    query = np.random.default_rng(11).normal(size=DIMS).tolist()
+    n_by_category = {ChunkCategory.FACTS: 5}
+
+    exact = build(data, "float32").search(query, n_by_category)[ChunkCategory.FACTS]
+    quantized = build(data, dtype).search(query, n_by_category)[ChunkCategory.FACTS]
+
+    assert quantized["ids"][0] == exact["ids"][0]
+    assert len(set(quantized["ids"]) & set(exact["ids"])) >= 4
+    assert quantized["distances"] == pytest.approx(exact["distances"], abs=0.02)
+
+
+def test_search_applies_filters(data):
+    index = build(data, "float32")
+    query = data[ChunkCategory.FACTS]["embeddings"][3]
+
+    filters = SearchFilters(year_start=2003, year_end=2003)
+
+    results = index.search(query, {ChunkCategory.FACTS: 20}, search_filters=filters)
+
+    assert sorted(results[ChunkCategory.FACTS]["ids"]) == ["fact_13", "fact_3"]
+
+
+@pytest.mark.parametrize("dims", [DIMS - 8, DIMS + 8])
+def test_search_rejects_query_with_other_dimensions(data, dims):
+    index = build(data, "float32")
+
+    with pytest.raises(ValueError, match="dimensões"):
+        index.search([0.1] * dims, {ChunkCategory.FACTS: 5})
+
+
+def test_search_on_empty_index_returns_empty_results():
+    index = LocalVectorIndex()
+
+    results = index.search([0.1] * DIMS, {ChunkCategory.FACTS: 5})
+
+    assert results[ChunkCategory.FACTS]["ids"] == []